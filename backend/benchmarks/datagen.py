@@ -0,0 +1,231 @@
+"""
+Seeded synthetic bill data for the benchmarks.
+
+Bills look like the shop's: returning customers, 1-5 sarees / suits per bill
+with the odd discount, busier festival months, mostly paid by UPI or cash.
+The same size and seed always produce the same rows, dated back from a
+fixed day so runs on different dates and machines stay comparable.
+
+Datasets are bulk-loaded with Core inserts (not through the API) into a
+SQLite file migrated to the app's schema, with item catalog, sales rollups
+and search index, and cached by size/seed so they are built once:
+
+    cd backend
+    python -m benchmarks.datagen --size 100k
+"""
+from sqlalchemy import insert
+import argparse
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import migrations
+import models
+from utils.item_catalog import normalize_name
+
+# Bump when the generated rows or the schema change, so cached datasets are rebuilt
+GENERATOR_VERSION = 3
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+CACHE_DIR = os.environ.get("BENCH_CACHE_DIR", os.path.join(tempfile.gettempdir(), "billing_bench_data"))
+
+# Last day of the generated history
+ANCHOR = datetime.datetime(2025, 12, 31, 21, 0)
+
+INSERT_CHUNK = 5000
+
+FIRST_NAMES = [
+    "Aarti", "Anita", "Asha", "Bhavna", "Deepa", "Divya", "Geeta", "Jyoti", "Kavita", "Komal", "Lakshmi", "Meena",
+    "Neha", "Nisha", "Pooja", "Priya", "Radha", "Rekha", "Ritu", "Sangeeta", "Sarita", "Shalini", "Sunita", "Swati",
+    "Usha", "Vandana", "Rajesh", "Suresh", "Amit", "Vikas", "Ramesh", "Sanjay", "Manoj", "Anil", "Rahul", "Arjun",
+]
+LAST_NAMES = [
+    "Agarwal", "Bansal", "Chauhan", "Desai", "Gupta", "Iyer", "Jain", "Joshi", "Kapoor", "Khanna", "Kumar", "Mehta",
+    "Mishra", "Nair", "Patel", "Pillai", "Rao", "Reddy", "Saxena", "Shah", "Sharma", "Singh", "Srivastava", "Verma",
+]
+
+# (item, price range in rupees)
+PRODUCTS = [
+    ("Banarasi Silk Saree", (4500, 18000)),
+    ("Kanjivaram Silk Saree", (6000, 25000)),
+    ("Chanderi Saree", (1800, 6000)),
+    ("Cotton Saree", (600, 2200)),
+    ("Georgette Saree", (1200, 4500)),
+    ("Chiffon Saree", (1100, 4000)),
+    ("Bandhani Saree", (1500, 5500)),
+    ("Lehenga Choli", (5000, 30000)),
+    ("Salwar Suit", (1200, 5000)),
+    ("Anarkali Suit", (2000, 8000)),
+    ("Kurti", (450, 1800)),
+    ("Dupatta", (300, 1500)),
+    ("Blouse Piece", (250, 900)),
+]
+COLOURS = ["Red", "Maroon", "Pink", "Peach", "Yellow", "Mustard", "Green", "Teal", "Blue", "Navy", "Purple", "Cream", "Black"]
+
+# Relative bill volume per month: wedding season and Diwali are the busy months
+MONTH_WEIGHTS = [1.0, 1.1, 0.9, 1.0, 1.0, 0.7, 0.7, 0.9, 1.1, 1.6, 1.8, 1.4]
+
+def size_to_bills(size: str) -> int:
+    """'10k', '100k', '1m' or a plain number of bills."""
+    return SIZES.get(size.lower()) or int(size)
+
+def item_names() -> list:
+    return [f"{colour} {product}" for product, _ in PRODUCTS for colour in COLOURS]
+
+class BillFactory:
+    """Generates bills as dicts in the BillCreate shape, deterministic for a seed."""
+
+    def __init__(self, seed: int = 42, customers: int = 5000):
+        self.rng = random.Random(seed)
+        self.customers = [
+            (f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}", f"{self.rng.choice('6789')}{self.rng.randint(0, 999999999):09d}")
+            for _ in range(customers)
+        ]
+
+    def dates(self, count: int, years: int) -> list:
+        """`count` bill times over the `years` before ANCHOR, in shop hours, oldest first."""
+        rng = self.rng
+        start = ANCHOR - datetime.timedelta(days=365 * years)
+        days = [start + datetime.timedelta(days=offset) for offset in range((ANCHOR - start).days + 1)]
+        weights = [MONTH_WEIGHTS[day.month - 1] for day in days]
+        picked = rng.choices(days, weights=weights, k=count)
+        return sorted(
+            day.replace(hour=rng.randint(10, 20), minute=rng.randint(0, 59), second=rng.randint(0, 59))
+            for day in picked
+        )
+
+    def items(self) -> list:
+        rng = self.rng
+        items = []
+        for _ in range(rng.choices((1, 2, 3, 4, 5), weights=(40, 30, 15, 10, 5))[0]):
+            product, (low, high) = rng.choice(PRODUCTS)
+            price = float(rng.randrange(low, high, 50))
+            quantity = rng.choices((1, 2, 3), weights=(85, 12, 3))[0]
+            discount = float(round(price * rng.uniform(0.05, 0.15) / 10) * 10) if rng.random() < 0.1 else 0.0
+            items.append({
+                "item_name": f"{rng.choice(COLOURS)} {product}",
+                "price": price,
+                "quantity": quantity,
+                "discount": discount,
+                "item_total": price * quantity - discount,
+            })
+        return items
+
+    def bill(self, date: datetime.datetime = None) -> dict:
+        rng = self.rng
+        name, phone = rng.choice(self.customers)
+        items = self.items()
+        discount = float(rng.choice((100, 200, 500))) if rng.random() < 0.05 else 0.0
+        paid = rng.random() < 0.85
+        return {
+            "customer_name": name,
+            "customer_phone": phone,
+            "date": date or ANCHOR,
+            "total_amount": sum(item["item_total"] for item in items) - discount,
+            "discount": discount,
+            "status": "Paid" if paid else "Unpaid",
+            "payment_mode": rng.choices(("UPI", "Cash", "Card"), weights=(50, 35, 15))[0] if paid else None,
+            "items": items,
+        }
+
+    def payload(self, date: datetime.datetime = None) -> dict:
+        """A bill as the JSON body of POST /bills/."""
+        bill = self.bill(date)
+        return {**bill, "date": bill["date"].isoformat()}
+
+def generate(path: str, bills: int, seed: int = 42, years: int = 3, profile: str = "tuned") -> dict:
+    """
+    Writes a fresh SQLite database with `bills` generated bills to `path`.
+    The engine `profile` matters because it leaves the file in WAL mode or not.
+    """
+    started = time.perf_counter()
+    factory = BillFactory(seed, customers=max(100, bills // 4))
+    engine = database.create_db_engine(f"sqlite:///{path}", profile=profile)
+    try:
+        # Tables and indexes now; the search index (whose FTS triggers would slow the
+        # inserts down) and the rollups backfill run as the remaining migrations after the load
+        migrations.upgrade(engine, target=migrations.version_of("search_index") - 1)
+
+        names = item_names()
+        with engine.begin() as conn:
+            conn.execute(insert(models.Item.__table__), [
+                {"id": item_id, "name": name, "normalized_name": normalize_name(name), "created_at": ANCHOR}
+                for item_id, name in enumerate(names, start=1)
+            ])
+        item_ids = {name: item_id for item_id, name in enumerate(names, start=1)}
+
+        dates = factory.dates(bills, years)
+        item_count = 0
+        for offset in range(0, bills, INSERT_CHUNK):
+            bill_rows, item_rows = [], []
+            for bill_id, date in enumerate(dates[offset:offset + INSERT_CHUNK], start=offset + 1):
+                bill = factory.bill(date)
+                for item in bill.pop("items"):
+                    item_count += 1
+                    item_rows.append({**item, "id": item_count, "bill_id": bill_id, "item_id": item_ids[item["item_name"]]})
+                bill_rows.append({**bill, "id": bill_id})
+            with engine.begin() as conn:
+                conn.execute(insert(models.Bill.__table__), bill_rows)
+                conn.execute(insert(models.BillItem.__table__), item_rows)
+
+        migrations.upgrade(engine)
+        if profile == "tuned":
+            with engine.connect() as conn:
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        engine.dispose()
+
+    return {
+        "bills": bills,
+        "items": item_count,
+        "seed": seed,
+        "years": years,
+        "first_date": dates[0].isoformat() if dates else None,
+        "last_date": dates[-1].isoformat() if dates else None,
+        "generated_in_seconds": round(time.perf_counter() - started, 1),
+    }
+
+def dataset(size: str, seed: int = 42, years: int = 3, cache_dir: str = CACHE_DIR) -> str:
+    """Path of the cached dataset for size/seed/years, generating it on first use."""
+    bills = size_to_bills(size)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"bills_{bills}_s{seed}_y{years}_v{GENERATOR_VERSION}.db")
+    if not os.path.exists(path):
+        print(f"Generating {bills} bills (seed {seed}) into {path} ...")
+        work = path + ".tmp"
+        for leftover in (work, work + "-wal", work + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        info = generate(work, bills, seed, years)
+        print(f"  {info['bills']} bills, {info['items']} items in {info['generated_in_seconds']} s")
+        os.replace(work, path)
+    return path
+
+def copy_dataset(source: str, target: str):
+    """Copies a cached dataset to a working file that a benchmark may modify."""
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    shutil.copyfile(source, target)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k", help="10k, 100k, 1m or a number of bills")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=3, help="Years of history before the anchor day")
+    parser.add_argument("--out", help="Write here instead of the dataset cache")
+    args = parser.parse_args()
+
+    if args.out:
+        info = generate(args.out, size_to_bills(args.size), args.seed, args.years)
+        print(f"{info['bills']} bills, {info['items']} items in {info['generated_in_seconds']} s -> {args.out}")
+    else:
+        print(dataset(args.size, args.seed, args.years))
@@ -0,0 +1,131 @@
+"""
+Mixed read/write throughput of the SQLite engine profiles in database.py.
+
+Reader threads page through recent bills (as the listing and dashboard do)
+while writer threads save bills (as checkout does). Each profile runs on a
+fresh database file, so the numbers compare only the engine settings.
+
+    cd backend
+    python -m benchmarks.db_concurrency --seconds 10 --readers 8 --writers 2
+"""
+from sqlalchemy.orm import sessionmaker, selectinload
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import models
+import schemas
+from benchmarks import datagen
+from routers.bills import insert_bills
+
+PROFILES = ("default", "tuned")
+
+def make_bill(factory: datagen.BillFactory) -> schemas.BillCreate:
+    return schemas.BillCreate(**factory.bill())
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def run_profile(profile: str, directory: str, args) -> dict:
+    path = os.path.join(directory, f"bench_{profile}.db")
+    datagen.generate(path, args.seed_bills, profile=profile)
+    engine = database.create_db_engine(f"sqlite:///{path}", profile=profile)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {"read": [], "write": [], "errors": 0}
+
+    def reader(seed):
+        local_rng = random.Random(seed)
+        while not stop.is_set():
+            started = time.perf_counter()
+            db = Session()
+            try:
+                offset = local_rng.randint(0, max(0, args.seed_bills - 50))
+                db.query(models.Bill).options(selectinload(models.Bill.items)).order_by(
+                    models.Bill.date.desc(), models.Bill.id.desc()
+                ).offset(offset).limit(50).all()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    results["read"].append(elapsed)
+            except Exception:
+                with lock:
+                    results["errors"] += 1
+            finally:
+                db.close()
+
+    def writer(seed):
+        factory = datagen.BillFactory(seed, customers=100)
+        while not stop.is_set():
+            started = time.perf_counter()
+            db = Session()
+            try:
+                insert_bills(db, [make_bill(factory)])
+                db.commit()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    results["write"].append(elapsed)
+            except Exception:
+                db.rollback()
+                with lock:
+                    results["errors"] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads_per_sec": round(len(results["read"]) / args.seconds, 1),
+        "writes_per_sec": round(len(results["write"]) / args.seconds, 1),
+        "read_p95_ms": round(percentile(results["read"], 95) * 1000, 2),
+        "write_p95_ms": round(percentile(results["write"], 95) * 1000, 2),
+        "errors": results["errors"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seed-bills", type=int, default=2000)
+    parser.add_argument("--profile", choices=PROFILES, action="append", help="Profile to run (default: all)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profile or PROFILES:
+            row = run_profile(profile, directory, args)
+            rows.append(row)
+            print(
+                f"{row['profile']:>8}: {row['reads_per_sec']:>8} reads/s  {row['writes_per_sec']:>7} writes/s  "
+                f"read p95 {row['read_p95_ms']} ms  write p95 {row['write_p95_ms']} ms  errors {row['errors']}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "db_concurrency", "config": vars(args), "results": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Invoice raster encoding: time and size of each way of writing a rendered
+invoice, on invoices with a few to many items (drawn once per size, so only
+the encoding is timed).
+
+  png-rgb        - full-colour PNG, as invoices were written before
+  png-N          - adaptive N-colour palette, optimized PNG (png-64: default zlib level)
+  webp-lossless  - the palette image as lossless WebP
+  webp-qN        - lossy WebP from the full-colour image
+  jpeg-qN        - optimized progressive JPEG
+  default        - what the renderer writes now (invoice_encode.encode with
+                   INVOICE_PALETTE_COLORS and the INVOICE_MAX_BYTES budget)
+  thumb          - the bill list thumbnail (INVOICE_THUMB_WIDTH, WebP)
+
+Error is the mean absolute difference per channel (0-255) from the drawn image.
+
+    cd backend
+    python -m benchmarks.encoding --items 1 --items 5 --items 30 --rounds 5
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def save(img, fmt: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+def encoders() -> dict:
+    from utils import invoice_encode
+    from utils.invoice_encode import quantize
+
+    return {
+        "png-rgb": lambda img: save(img, "PNG"),
+        "png-256": lambda img: save(quantize(img, 256), "PNG", optimize=True),
+        "png-64": lambda img: save(quantize(img, 64), "PNG"),
+        "png-64-opt": lambda img: save(quantize(img, 64), "PNG", optimize=True),
+        "png-32": lambda img: save(quantize(img, 32), "PNG", optimize=True),
+        "webp-lossless": lambda img: save(quantize(img, 64), "WEBP", lossless=True),
+        "webp-q80": lambda img: save(img, "WEBP", quality=80),
+        "jpeg-q85": lambda img: save(img, "JPEG", quality=85, optimize=True, progressive=True),
+        "default": lambda img: invoice_encode.encode(img, "png"),
+        "thumb": lambda img: invoice_encode.encode(
+            invoice_encode.thumbnail(img), "webp", invoice_encode.INVOICE_THUMB_MAX_BYTES, lossless=False
+        ),
+    }
+
+def sample_bill(items: int, seed: int):
+    """A generated bill with exactly `items` lines."""
+    from benchmarks.datagen import BillFactory
+    from utils.render_pool import data_to_bill
+
+    factory = BillFactory(seed)
+    bill = factory.bill()
+    lines = []
+    while len(lines) < items:
+        lines.extend(factory.items())
+    bill["items"] = lines[:items]
+    bill["total_amount"] = sum(item["item_total"] for item in bill["items"])
+    return data_to_bill({**bill, "id": items})
+
+def mean_error(img, data: bytes):
+    from PIL import Image, ImageChops, ImageStat
+
+    with Image.open(io.BytesIO(data)) as decoded:
+        if decoded.size != img.size:
+            return None
+        diff = ImageChops.difference(img, decoded.convert("RGB"))
+    return round(statistics.mean(ImageStat.Stat(diff).mean), 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, action="append", help="Invoice line counts to try (default: 1, 5, 30)")
+    parser.add_argument("--rounds", type=int, default=5, help="Encodes per measurement (median is kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    from utils.invoice_gen import render_invoice
+
+    rows = []
+    for items in args.items or [1, 5, 30]:
+        img = render_invoice(sample_bill(items, args.seed))
+        print(f"\n{items} item(s), {img.width}x{img.height}")
+        print(f"{'encoding':<16}{'ms':>10}{'bytes':>10}{'vs png-rgb':>12}{'error':>8}")
+        baseline = None
+        for name, encode in encoders().items():
+            times = []
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                data = encode(img)
+                times.append(time.perf_counter() - started)
+            baseline = baseline or len(data)
+            row = {
+                "items": items,
+                "encoding": name,
+                "ms": round(statistics.median(times) * 1000, 1),
+                "bytes": len(data),
+                "ratio": round(len(data) / baseline, 3),
+                "error": mean_error(img, data),
+            }
+            rows.append(row)
+            error = "-" if row["error"] is None else row["error"]
+            print(f"{name:<16}{row['ms']:>10}{row['bytes']:>10}{row['ratio']:>12}{error:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "encoding", "config": vars(args), "results": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
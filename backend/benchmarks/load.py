@@ -0,0 +1,223 @@
+"""
+HTTP load test of the multi-worker serving mode: starts a real uvicorn
+server with 1, 2, 4 ... worker processes on a copy of a generated dataset
+(benchmarks/datagen.py) and drives it from several client processes with a
+mix of reads and bill creations, reporting throughput and latency per
+worker count.
+
+    cd backend
+    python -m benchmarks.load --workers 1 --workers 2 --workers 4 --clients 8 --seconds 20
+
+Throughput can only scale up to the number of CPUs, which the client
+processes share with the server. At the end of each run the `leases` table
+is read, to show the single process holding the outbox lease.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, weight): what each client request is drawn from
+MIX = [
+    ("list_bills", 35),
+    ("filter_year", 15),
+    ("filter_name", 15),
+    ("get_bill", 15),
+    ("stats", 5),
+    ("create_bill", 15),
+]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_ready(url: str, timeout: float = 60):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout} s")
+
+def client(base_url: str, seconds: float, seed: int, dataset: dict, results):
+    """One client process: sends requests back to back until the time is up."""
+    import datetime
+    import httpx
+    from benchmarks.datagen import BillFactory, LAST_NAMES
+
+    rng = random.Random(seed)
+    factory = BillFactory(seed)
+    names, weights = zip(*MIX)
+    years = list(range(dataset["first_year"], dataset["last_year"] + 1))
+    latencies = {name: [] for name in names}
+    errors = 0
+
+    with httpx.Client(base_url=base_url, timeout=60) as http:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                if name == "list_bills":
+                    response = http.get("/bills/", params={"limit": 100})
+                elif name == "filter_year":
+                    response = http.get("/bills/filter", params={"year": rng.choice(years), "limit": 100})
+                elif name == "filter_name":
+                    response = http.get("/bills/filter", params={"customer_name": rng.choice(LAST_NAMES), "limit": 100})
+                elif name == "get_bill":
+                    response = http.get(f"/bills/{rng.randint(1, dataset['bills'])}")
+                elif name == "stats":
+                    response = http.get("/bills/stats")
+                else:
+                    response = http.post("/bills/", json=factory.payload(datetime.datetime.now().replace(microsecond=0)))
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies[name].append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    results.put({"latencies": latencies, "errors": errors})
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+def run(workers: int, args, source: str, dataset: dict, work: str) -> dict:
+    db_path = os.path.join(work, f"load_{workers}.db")
+    from benchmarks import datagen
+
+    datagen.copy_dataset(source, db_path)
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "INVOICES_DIR": os.path.join(work, "invoices"),
+        "RESPONSE_CACHE_STAMP": os.path.join(work, f"cache_{workers}.stamp"),
+        "MESSAGE_TRANSPORT": "fake",
+        "WEB_CONCURRENCY": str(workers),
+    }
+    if not args.response_cache:
+        env["RESPONSE_CACHE_SIZE"] = "0"
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_ready(base_url + "/")
+        # The other workers may still be importing the app; give them a moment
+        time.sleep(1 + workers * 0.5)
+
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(target=client, args=(base_url, args.seconds, args.seed + i, dataset, results))
+            for i in range(args.clients)
+        ]
+        started = time.perf_counter()
+        for process in clients:
+            process.start()
+        outcomes = [results.get() for _ in clients]
+        elapsed = time.perf_counter() - started
+        for process in clients:
+            process.join()
+
+        import sqlite3
+
+        with sqlite3.connect(db_path) as conn:
+            holders = dict(conn.execute("SELECT name, holder FROM leases").fetchall())
+            sent = conn.execute("SELECT count(*) FROM outbox WHERE status = 'sent'").fetchone()[0]
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    per_scenario = {}
+    everything = []
+    for name, _ in MIX:
+        values = [value for outcome in outcomes for value in outcome["latencies"][name]]
+        everything.extend(values)
+        per_scenario[name] = {
+            "requests": len(values),
+            "p50_ms": round(statistics.median(values) * 1000, 2) if values else None,
+            "p95_ms": round(percentile(values, 95) * 1000, 2) if values else None,
+        }
+    return {
+        "workers": workers,
+        "requests": len(everything),
+        "errors": sum(outcome["errors"] for outcome in outcomes),
+        "requests_per_second": round(len(everything) / elapsed, 1),
+        "p50_ms": round(statistics.median(everything) * 1000, 2) if everything else None,
+        "p95_ms": round(percentile(everything, 95) * 1000, 2) if everything else None,
+        "scenarios": per_scenario,
+        "outbox_sent": sent,
+        "lease_holders": holders,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k", help="Dataset size: 10k, 100k, 1m or a number of bills")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, action="append", help="Worker process counts to compare (default: 1, 2, 4)")
+    parser.add_argument("--clients", type=int, default=8, help="Client processes sending requests")
+    parser.add_argument("--seconds", type=float, default=20, help="Duration of each run")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the bill response cache on")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    from benchmarks import datagen
+
+    source = datagen.dataset(args.size, args.seed)
+    import sqlite3
+
+    with sqlite3.connect(source) as conn:
+        bills, first_date, last_date = conn.execute("SELECT count(*), min(date), max(date) FROM bills").fetchone()
+    dataset = {"size": args.size, "bills": bills, "first_year": int(first_date[:4]), "last_year": int(last_date[:4])}
+
+    cpus = os.cpu_count() or 1
+    rows = []
+    work = tempfile.mkdtemp(prefix="billing_load_")
+    try:
+        for workers in args.workers or [1, 2, 4]:
+            if workers > cpus:
+                print(f"Note: {workers} workers on {cpus} CPU(s); throughput cannot scale past the CPU count")
+            row = run(workers, args, source, dataset, work)
+            rows.append(row)
+            print(
+                f"{workers} worker(s): {row['requests_per_second']:>8} req/s  p50 {row['p50_ms']:>8} ms  "
+                f"p95 {row['p95_ms']:>8} ms  errors {row['errors']}  outbox sent {row['outbox_sent']}"
+            )
+            print(f"  lease holders: {row['lease_holders']}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if rows and rows[0]["requests_per_second"]:
+        base = rows[0]["requests_per_second"]
+        print("\nspeedup: " + ", ".join(f"{row['workers']}w x{row['requests_per_second'] / base:.2f}" for row in rows))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "load", "config": vars(args), "cpus": cpus, "dataset": dataset, "results": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
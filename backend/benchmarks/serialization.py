@@ -0,0 +1,104 @@
+"""
+Per-bill cost of turning a page of bills into a JSON body, for both read paths:
+
+  orm   - Bill + selectinload(items) ORM objects, validated into schemas.Bill
+          (from_attributes) and dumped by pydantic, as the listings used to do
+  lean  - column tuples from utils/bill_rows.py assembled into dicts and
+          dumped with orjson, as the listings do now
+
+Each path is timed for the query alone, the serialization alone and both
+together, on the same seeded database; the bodies are checked to be equal.
+
+    cd backend
+    python -m benchmarks.serialization --bills 2000 --page 500 --rounds 20
+"""
+from sqlalchemy.orm import sessionmaker, selectinload
+from typing import List
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import models
+import schemas
+from benchmarks import datagen
+from routers.bills import keyset_page
+from utils import bill_rows
+from utils.response_cache import adapter_for, dumps
+
+def orm_load(db, limit):
+    return keyset_page(db.query(models.Bill).options(selectinload(models.Bill.items)), limit).all()
+
+def orm_dump(bills) -> bytes:
+    adapter = adapter_for(List[schemas.Bill])
+    return adapter.dump_json(adapter.validate_python(bills, from_attributes=True))
+
+def lean_load(db, limit):
+    return bill_rows.fetch(db, keyset_page(bill_rows.bills_select(), limit))
+
+PATHS = {"orm": (orm_load, orm_dump), "lean": (lean_load, dumps)}
+
+def best_of(rounds: int, fn) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=2000, help="Bills to seed")
+    parser.add_argument("--page", type=int, default=500, help="Bills per serialized page")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed rounds per measurement (best is kept)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        datagen.generate(path, args.bills)
+        engine = database.create_db_engine(f"sqlite:///{path}")
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = Session()
+
+        bodies = {}
+        for name, (load, dump) in PATHS.items():
+            def query_only():
+                load(db, args.page)
+                db.expunge_all()
+
+            page = load(db, args.page)
+            bodies[name] = dump(page)
+            per_bill = 1e6 / len(page)
+            row = {
+                "path": name,
+                "bills": len(page),
+                "query_us_per_bill": round(best_of(args.rounds, query_only) * per_bill, 2),
+                "serialize_us_per_bill": round(best_of(args.rounds, lambda: dump(page)) * per_bill, 2),
+                "total_us_per_bill": round(best_of(args.rounds, lambda: (dump(load(db, args.page)), db.expunge_all())) * per_bill, 2),
+                "bytes_per_bill": round(len(bodies[name]) / len(page), 1),
+            }
+            db.expunge_all()
+            rows.append(row)
+            print(
+                f"{name:>5}: query {row['query_us_per_bill']:>7} us/bill  serialize {row['serialize_us_per_bill']:>6} us/bill  "
+                f"total {row['total_us_per_bill']:>7} us/bill  ({row['bytes_per_bill']} bytes/bill)"
+            )
+        db.close()
+        engine.dispose()
+
+    identical = len(set(bodies.values())) == 1
+    print("bodies identical" if identical else "WARNING: bodies differ")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "serialization", "config": vars(args), "identical": identical, "results": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
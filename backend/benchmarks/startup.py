@@ -0,0 +1,131 @@
+"""
+Cold start of the API: how long `import main` takes, which modules the time
+goes to, and how long a fresh process needs to answer its first request.
+
+Each round runs in a new interpreter:
+
+  import  - `python -X importtime -c "import main"`, parsed into the total
+            and the slowest modules (cumulative, including their imports)
+  first   - process start to the first GET / answered through the ASGI
+            test client, i.e. import, app startup (schema check) and one request
+
+It also reports which heavy optional modules (Pillow, openpyxl, reportlab,
+the WhatsApp automation, uvicorn) were loaded by the import; none should be.
+
+    cd backend
+    python -m benchmarks.startup --rounds 10 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("PIL", "openpyxl", "reportlab", "pyautogui", "win32clipboard", "uvicorn")
+
+FIRST_REQUEST = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    client.get("/").raise_for_status()
+    answered = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - started,
+    "startup_s": ready - imported,
+    "first_request_s": answered - ready,
+    "heavy": sorted({{name.split(".")[0] for name in sys.modules}} & set({HEAVY_MODULES!r})),
+}}))
+"""
+
+def parse_importtime(stderr: str) -> dict:
+    """{module: (self us, cumulative us)} from -X importtime output (first import of each module)."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return modules
+
+def run(env: dict, args: list) -> subprocess.CompletedProcess:
+    result = subprocess.run([sys.executable, *args], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10, help="Fresh interpreters per measurement (median is kept)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'billing.db')}",
+            "INVOICES_DIR": os.path.join(directory, "invoices"),
+            "MESSAGE_TRANSPORT": "fake",
+        }
+        run(env, ["-m", "migrations"])
+
+        imports = []
+        for _ in range(args.rounds):
+            imports.append(parse_importtime(run(env, ["-X", "importtime", "-c", "import main"]).stderr))
+        firsts = [json.loads(run(env, ["-c", FIRST_REQUEST]).stdout.strip().splitlines()[-1]) for _ in range(args.rounds)]
+
+    def median_ms(values):
+        return round(statistics.median(values) * 1000, 1)
+
+    import_ms = round(statistics.median(modules["main"][1] for modules in imports) / 1000, 1)
+    names = set.intersection(*(set(modules) for modules in imports))
+    slowest = sorted(
+        (
+            {
+                "module": name,
+                "cumulative_ms": round(statistics.median(modules[name][1] for modules in imports) / 1000, 1),
+                "self_ms": round(statistics.median(modules[name][0] for modules in imports) / 1000, 1),
+            }
+            for name in names if name != "main"
+        ),
+        key=lambda row: row["cumulative_ms"], reverse=True
+    )[:args.top]
+    first = {
+        "import_ms": median_ms([row["import_s"] for row in firsts]),
+        "startup_ms": median_ms([row["startup_s"] for row in firsts]),
+        "first_request_ms": median_ms([row["first_request_s"] for row in firsts]),
+    }
+    first["total_ms"] = round(first["import_ms"] + first["startup_ms"] + first["first_request_ms"], 1)
+    heavy = sorted({name for row in firsts for name in row["heavy"]})
+
+    print(f"import main (-X importtime): {import_ms} ms, median of {args.rounds}")
+    print(f"\n{'module':<40}{'cumulative ms':>15}{'self ms':>10}")
+    for row in slowest:
+        print(f"{row['module']:<40}{row['cumulative_ms']:>15}{row['self_ms']:>10}")
+    print(
+        f"\nfirst request: import {first['import_ms']} ms + startup {first['startup_ms']} ms + "
+        f"request {first['first_request_ms']} ms = {first['total_ms']} ms"
+    )
+    print(f"heavy modules loaded: {', '.join(heavy)}" if heavy else "heavy modules loaded: none")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "benchmark": "startup",
+                "config": vars(args),
+                "import_ms": import_ms,
+                "slowest_modules": slowest,
+                "first_request": first,
+                "heavy_modules": heavy,
+            }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+End-to-end benchmark suite. Runs the API's hot paths in-process through the
+ASGI test client against a generated dataset (benchmarks/datagen.py) and
+writes the timings as JSON, optionally compared against a stored baseline.
+
+    cd backend
+    python -m benchmarks.suite --size 10k --json baseline.json
+    python -m benchmarks.suite --size 10k --baseline baseline.json --max-regression 25
+    python -m benchmarks.suite --size 100k --scenario filter_year --scenario export_csv
+
+Each run works on a fresh copy of the cached dataset, with invoices and
+archives in a temporary directory, so the repository's files are never
+touched. The response cache is off unless --response-cache is given, so the
+read scenarios measure the handlers rather than cache hits.
+"""
+import argparse
+import calendar
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Scenarios in run order: reads first, then writes, the destructive cleanup last
+SCENARIOS = {} # name -> (function(ctx, iteration), default iterations)
+
+def scenario(iterations: int):
+    def register(fn):
+        SCENARIOS[fn.__name__] = (fn, iterations)
+        return fn
+    return register
+
+# Days of the oldest bills each cleanup iteration deletes
+CLEANUP_STEP_DAYS = 7
+
+class Context:
+    def __init__(self, client, factory, dataset: dict, seed: int):
+        self.client = client
+        self.factory = factory
+        self.dataset = dataset
+        self.rng = random.Random(seed)
+        self.first_date = datetime.datetime.fromisoformat(dataset["first_date"])
+        self.last_date = datetime.datetime.fromisoformat(dataset["last_date"])
+        self.years = list(range(self.first_date.year, self.last_date.year + 1))
+        self.state = {}
+
+def check(response, status: int = 200):
+    if response.status_code != status:
+        request = response.request
+        raise RuntimeError(f"{request.method} {request.url} -> {response.status_code}: {response.text[:200]}")
+    return response
+
+@scenario(50)
+def list_bills(ctx: Context, i: int):
+    """Pages of 100 through GET /bills/, following X-Next-Cursor for 20 pages, then from the top."""
+    params = {"limit": 100}
+    if i % 20 and ctx.state.get("cursor"):
+        params["cursor"] = ctx.state["cursor"]
+    response = check(ctx.client.get("/bills/", params=params))
+    ctx.state["cursor"] = response.headers.get("x-next-cursor")
+
+@scenario(20)
+def filter_year(ctx: Context, i: int):
+    check(ctx.client.get("/bills/filter", params={"year": ctx.years[i % len(ctx.years)], "limit": 500}))
+
+@scenario(20)
+def filter_month(ctx: Context, i: int):
+    params = {"year": ctx.years[i % len(ctx.years)], "month": calendar.month_name[i % 12 + 1], "limit": 500}
+    check(ctx.client.get("/bills/filter", params=params))
+
+@scenario(20)
+def filter_name(ctx: Context, i: int):
+    from benchmarks.datagen import LAST_NAMES
+
+    check(ctx.client.get("/bills/filter", params={"customer_name": ctx.rng.choice(LAST_NAMES), "limit": 500}))
+
+@scenario(3)
+def export_csv(ctx: Context, i: int):
+    """The most recent year as CSV, read to the end of the stream."""
+    check(ctx.client.get("/bills/export", params={"year": ctx.last_date.year, "format": "csv"})).content
+
+@scenario(3)
+def export_xlsx(ctx: Context, i: int):
+    check(ctx.client.get("/bills/export", params={"year": ctx.last_date.year, "format": "xlsx"})).content
+
+@scenario(20)
+def render_invoice(ctx: Context, i: int):
+    """GET /bills/{id}/invoice for bills never rendered before, so each one is a full render."""
+    rendered = ctx.state.setdefault("rendered", set())
+    bill_id = ctx.rng.randint(1, ctx.dataset["bills"])
+    while bill_id in rendered:
+        bill_id = ctx.rng.randint(1, ctx.dataset["bills"])
+    rendered.add(bill_id)
+    check(ctx.client.get(f"/bills/{bill_id}/invoice"))
+
+@scenario(100)
+def create_bill(ctx: Context, i: int):
+    check(ctx.client.post("/bills/", json=ctx.factory.payload(datetime.datetime.now().replace(microsecond=0))))
+
+@scenario(5)
+def cleanup(ctx: Context, i: int):
+    """DELETE /bills/cleanup removing the next CLEANUP_STEP_DAYS of the oldest bills."""
+    cutoff = ctx.first_date + datetime.timedelta(days=CLEANUP_STEP_DAYS * (i + 1))
+    retention_days = (datetime.datetime.now() - cutoff).days
+    check(ctx.client.delete("/bills/cleanup", params={"retention_days": retention_days}))
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def summarize(name: str, timings: list) -> dict:
+    mean = statistics.fmean(timings)
+    return {
+        "scenario": name,
+        "iterations": len(timings),
+        "mean_ms": round(mean * 1000, 3),
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(percentile(timings, 95) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+        "per_second": round(1 / mean, 2) if mean else None,
+    }
+
+def run_scenario(ctx: Context, name: str, iterations: int, warmup: int) -> dict:
+    fn = SCENARIOS[name][0]
+    timings = []
+    for i in range(warmup + iterations):
+        started = time.perf_counter()
+        fn(ctx, i)
+        if i >= warmup:
+            timings.append(time.perf_counter() - started)
+    return summarize(name, timings)
+
+def compare(results: list, dataset: dict, baseline: dict, max_regression: float) -> list:
+    """Prints the p50 change against `baseline` per scenario; returns the scenarios slower than max_regression %."""
+    if baseline.get("dataset", {}).get("bills") != dataset["bills"]:
+        print("Warning: the baseline was run on a different dataset size")
+    base = {row["scenario"]: row for row in baseline.get("results", [])}
+    regressions = []
+    print(f"\n{'scenario':<16}{'p50 ms':>12}{'baseline':>12}{'change':>10}")
+    for row in results:
+        before = base.get(row["scenario"])
+        if not before or not before["p50_ms"]:
+            print(f"{row['scenario']:<16}{row['p50_ms']:>12}{'-':>12}{'-':>10}")
+            continue
+        change = (row["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+        flag = ""
+        if max_regression is not None and change > max_regression:
+            regressions.append(row["scenario"])
+            flag = "  REGRESSION"
+        print(f"{row['scenario']:<16}{row['p50_ms']:>12}{before['p50_ms']:>12}{change:>+9.1f}%{flag}")
+    return regressions
+
+def environment() -> dict:
+    import fastapi
+    import sqlalchemy
+    import sqlite3
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "fastapi": fastapi.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k", help="Dataset size: 10k, 100k, 1m or a number of bills")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=3, help="Years of history in the dataset")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append", help="Scenario to run (default: all)")
+    parser.add_argument("--iterations", type=int, help="Timed iterations per scenario (default: per scenario)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed iterations before each scenario")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the bill response cache on")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, help="Exit 1 when a scenario's p50 is this many %% slower than the baseline")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="billing_bench_")
+    db_path = os.path.join(work, "billing.db")
+
+    # The app reads these at import time, so they are set before any backend module is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["INVOICES_DIR"] = os.path.join(work, "invoices")
+    os.environ["ARCHIVE_DIR"] = os.path.join(work, "archive")
+    os.environ["ARCHIVE_CACHE_DIR"] = os.path.join(work, "archive_cache")
+    os.environ["CLEANUP_RETENTION_DAYS"] = "0"
+    os.environ["INVOICE_RENDER_WAIT"] = "300"
+    os.environ.setdefault("MESSAGE_TRANSPORT", "fake")
+    if not args.response_cache:
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+
+    from benchmarks import datagen
+
+    source = datagen.dataset(args.size, args.seed, args.years)
+    datagen.copy_dataset(source, db_path)
+
+    from fastapi.testclient import TestClient
+    import sqlite3
+    import main as app_module
+    from utils.messaging import outbox_worker
+
+    with sqlite3.connect(db_path) as conn:
+        bills, first_date, last_date = conn.execute("SELECT count(*), min(date), max(date) FROM bills").fetchone()
+        items = conn.execute("SELECT count(*) FROM bill_items").fetchone()[0]
+    dataset = {
+        "size": args.size, "seed": args.seed, "years": args.years, "bills": bills, "items": items,
+        "first_date": first_date, "last_date": last_date,
+    }
+
+    results = []
+    with TestClient(app_module.app) as client:
+        # Outbox delivery renders invoices in the background; keep it out of the request timings
+        outbox_worker.stop()
+        ctx = Context(client, datagen.BillFactory(args.seed + 1), dataset, args.seed)
+        for name, (_, iterations) in SCENARIOS.items():
+            if args.scenario and name not in args.scenario:
+                continue
+            row = run_scenario(ctx, name, args.iterations or iterations, args.warmup)
+            results.append(row)
+            print(
+                f"{name:<16} p50 {row['p50_ms']:>10} ms  p95 {row['p95_ms']:>10} ms  "
+                f"mean {row['mean_ms']:>10} ms  ({row['iterations']} runs)"
+            )
+
+    output = {
+        "benchmark": "suite",
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "baseline")},
+        "dataset": dataset,
+        "environment": environment(),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, dataset, json.load(f), args.max_regression)
+
+    shutil.rmtree(work, ignore_errors=True)
+
+    if regressions:
+        print(f"\nSlower than the baseline by more than {args.max_regression}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
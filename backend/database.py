@@ -1,19 +1,156 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+import os
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./billing.db"
+from utils import metrics
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def normalize_database_url(url: str) -> str:
+    """Accepts postgres:// URLs (as hosting providers print them) and picks the psycopg 3 driver."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        url = "postgresql+psycopg://" + url[len("postgresql://"):]
+    return url
+
+def async_database_url(url: str) -> str:
+    """The same database through an asyncio driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    raise ValueError(f"No async driver known for {url}")
+
+# Local SQLite file by default; set DATABASE_URL to use PostgreSQL, e.g.
+# postgresql://billing:secret@db:5432/billing
+SQLALCHEMY_DATABASE_URL = normalize_database_url(os.environ.get("DATABASE_URL", "sqlite:///./billing.db"))
+
+# Optional asyncio engine for the native async routes (routers/bills_async.py)
+DB_ASYNC = os.environ.get("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL")
+
+# Worker processes serving the app (uvicorn --workers and gunicorn read the
+# same variable). Per-process pools are sized down when there are several.
+WEB_CONCURRENCY = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+
+# SQLite engine profile, applied to every new connection. "tuned" runs in WAL
+# mode so readers (listing, export) never wait on a writer and a commit only
+# appends to the log; "default" leaves SQLite's own settings (rollback journal,
+# synchronous=FULL), mainly for comparing the two. WAL and the busy timeout
+# work the same across worker processes: writers from all of them queue on
+# the file's write lock, and readers in any process never block.
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "tuned")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    # NORMAL is durable against application crashes in WAL mode; only an OS crash can lose the last commits
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Negative values are KiB: 64 MB page cache per connection
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64000)),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+    # Milliseconds a writer waits for the write lock before "database is locked"
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+}
+
+# Connection pool. SQLite connections are cheap but each carries its own page
+# cache, so keep enough for the request threadpool plus background workers.
+# The overflow is shared out between worker processes, so several workers
+# stay within PostgreSQL's default max_connections of 100.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", max(5, 20 // WEB_CONCURRENCY)))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+
+def apply_sqlite_pragmas(engine, pragmas: dict):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = SQLITE_PROFILE, asynchronous: bool = False, **options):
+    """
+    Engine for `url` with the pool settings above and, for SQLite, the pragma
+    profile. With asynchronous=True an AsyncEngine is returned instead.
+    Statement times and pool waits are recorded in utils/metrics.py.
+    """
+    factory = create_engine
+    if asynchronous:
+        from sqlalchemy.ext.asyncio import create_async_engine as factory
+
+    label = "async" if asynchronous else "sync"
+    options.setdefault("pool_size", DB_POOL_SIZE)
+    options.setdefault("max_overflow", DB_MAX_OVERFLOW)
+    options.setdefault("pool_timeout", DB_POOL_TIMEOUT)
+    if metrics.METRICS_ENABLED:
+        options.setdefault("poolclass", metrics.timed_pool(AsyncAdaptedQueuePool if asynchronous else QueuePool, label))
+
+    if url.startswith("sqlite"):
+        connect_args = {} if asynchronous else {"check_same_thread": False}
+        if profile == "tuned":
+            connect_args["timeout"] = SQLITE_PRAGMAS["busy_timeout"] / 1000
+        engine = factory(url, connect_args=connect_args, **options)
+        if profile == "tuned":
+            apply_sqlite_pragmas(engine.sync_engine if asynchronous else engine, SQLITE_PRAGMAS)
+        elif profile != "default":
+            raise ValueError(f"Unknown SQLITE_PROFILE: {profile}")
+    else:
+        options.setdefault("pool_pre_ping", True)
+        engine = factory(url, **options)
+
+    if metrics.METRICS_ENABLED:
+        metrics.instrument_engine(engine.sync_engine if asynchronous else engine, label)
+    return engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def dialect_insert(db):
+    """insert() of the session's dialect, which supports ON CONFLICT upserts (SQLite and PostgreSQL)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+# Created on first use, so the async drivers are only needed when DB_ASYNC is on
+async_engine = None
+AsyncSessionLocal = None
+
+def get_async_engine():
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        url = ASYNC_DATABASE_URL or async_database_url(SQLALCHEMY_DATABASE_URL)
+        async_engine = create_db_engine(url, asynchronous=True)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return async_engine
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+
+def pool_checked_out() -> dict:
+    engines = {("sync",): engine, ("async",): async_engine}
+    return {label: e.pool.checkedout() for label, e in engines.items() if e is not None}
+
+metrics.gauge("db_pool_checked_out", "Connections currently checked out of the pool.", pool_checked_out, ("engine",))
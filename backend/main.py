@@ -1,13 +1,46 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import bills
-import uvicorn
+from starlette.middleware.gzip import GZipMiddleware, DEFAULT_EXCLUDED_CONTENT_TYPES
+from database import engine, DB_ASYNC, dispose_async_engine
+from routers import bills, items, outbox
+from utils import search_index
+from utils.render_pool import render_service
+from utils.messaging import outbox_worker
+from utils.retention import cleanup_service
+from utils.response_cache import response_cache
+from utils import metrics
+import migrations
+import os
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Responses smaller than this many bytes go out uncompressed
+GZIP_MIN_SIZE = int(os.environ.get("GZIP_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
 
-app = FastAPI(title="Billing Management System")
+# The schema is managed by `python -m migrations`; with this set, pending
+# migrations are applied on startup instead of refusing to start. Not for
+# multi-worker mode, where every worker process would run them at once.
+MIGRATE_ON_STARTUP = os.environ.get("MIGRATE_ON_STARTUP", "0").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIGRATE_ON_STARTUP:
+        migrations.upgrade(engine)
+    else:
+        migrations.check(engine)
+    search_index.detect(engine)
+    # Deliver queued customer messages (including any left over from the last run)
+    outbox_worker.start()
+    # Periodic retention cleanup, when CLEANUP_RETENTION_DAYS is set
+    cleanup_service.start_schedule()
+    yield
+    cleanup_service.stop_schedule()
+    outbox_worker.stop()
+    await dispose_async_engine()
+    # Stop the invoice render worker processes
+    render_service.shutdown()
+
+app = FastAPI(title="Billing Management System", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -16,13 +49,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Content-Location"],
+)
+
+# Compresses JSON and CSV exports. Images and xlsx (already a zip) are left
+# alone, as are range responses, so invoice downloads stay seekable.
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=GZIP_MIN_SIZE,
+    compresslevel=GZIP_LEVEL,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
 )
 
+# Outermost, so latencies include compression and the other middleware
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+if DB_ASYNC:
+    from routers import bills_async
+
+    # Must come first: it overrides some routes of bills.router with async handlers
+    app.include_router(bills_async.router)
 app.include_router(bills.router)
+app.include_router(items.router)
+app.include_router(outbox.router)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Billing Management API"}
 
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus text format: route latencies, SQL timings, pool waits, renders, exports and queue depths.
+    With several worker processes, each reports its own counters.
+    """
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters of the bill response cache."""
+    return response_cache.stats()
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
+    # python main.py [--reload]   (reloading on code changes is for development only)
+    # WEB_CONCURRENCY=4 python main.py   runs 4 worker processes (as does uvicorn --workers 4)
+    import sys
+    import uvicorn
+
+    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload="--reload" in sys.argv[1:])
@@ -0,0 +1,192 @@
+from sqlalchemy import MetaData, func, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+import argparse
+import sys
+
+import database
+import models
+
+# Versioned schema changes, applied by an explicit command rather than on
+# every start of the app:
+#
+#     cd backend
+#     python -m migrations            # apply pending migrations
+#     python -m migrations status
+#
+# Applied versions are recorded in `schema_migrations`. Every step is
+# idempotent, so a billing.db created by an older version (which built its
+# schema at startup and has no such table) is brought up to date by running
+# all of them. Migration 1 creates the tables of the current models.py; a
+# table or column added later needs its own migration for existing databases.
+
+MIGRATIONS = [] # (version, name, function(engine)), in order
+
+def migration(version: int, name: str):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+class SchemaOutOfDate(Exception):
+    pass
+
+@migration(1, "tables")
+def create_tables(engine):
+    database.Base.metadata.create_all(bind=engine)
+
+@migration(2, "item_catalog")
+def link_item_catalog(engine):
+    # Adds bill_items.item_id to an older billing.db and links its rows to the item catalog
+    from utils.item_catalog import ensure_item_catalog
+
+    ensure_item_catalog(engine)
+
+@migration(3, "indexes")
+def create_indexes(engine):
+    # create_all only builds indexes along with new tables, so add any new ones to an existing billing.db
+    for table in database.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+@migration(4, "search_index")
+def create_search_index(engine):
+    # Customer name/phone search index (SQLite FTS5, falls back to ILIKE elsewhere)
+    from utils.search_index import ensure_search_index
+
+    ensure_search_index(engine)
+
+@migration(5, "rollups")
+def backfill_rollups(engine):
+    # Sales rollups behind /bills/stats, backfilled once from existing bills
+    from utils.rollups import ensure_rollups
+
+    ensure_rollups(engine)
+
+@migration(6, "leases")
+def create_leases(engine):
+    # Lets one worker process at a time run the outbox sender and the retention cleanup
+    models.Lease.__table__.create(bind=engine, checkfirst=True)
+
+@migration(7, "bill_items_bill_id")
+def index_bill_items_bill_id(engine):
+    # Item loads by bill_id scanned the whole of bill_items; migration 3 has already run on existing databases
+    index = next(index for index in models.BillItem.__table__.indexes if index.name == "ix_bill_items_bill_id")
+    index.create(bind=engine, checkfirst=True)
+
+@migration(8, "bills_autoincrement")
+def bills_autoincrement(engine):
+    # SQLite hands out max(id) + 1, so the id of the newest bill came back after it was archived or
+    # deleted. AUTOINCREMENT stops that but needs the table rebuilt; PostgreSQL sequences never go back.
+    if engine.dialect.name != "sqlite":
+        return
+    from utils.archive import max_archived_id
+    from utils.search_index import ensure_search_index
+
+    table = models.Bill.__table__
+    columns = ", ".join(column.name for column in table.columns)
+    with engine.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'bills'")).scalar()
+        if "AUTOINCREMENT" not in ddl.upper():
+            conn.execute(text("DROP TABLE IF EXISTS bills_rebuild"))
+            conn.execute(CreateTable(table.to_metadata(MetaData(), name="bills_rebuild")))
+            conn.execute(text(f"INSERT INTO bills_rebuild ({columns}) SELECT {columns} FROM bills"))
+            conn.execute(text("DROP TABLE bills"))
+            conn.execute(text("ALTER TABLE bills_rebuild RENAME TO bills"))
+            for index in table.indexes:
+                index.create(bind=conn)
+        # Start after the highest id ever used, including bills archived before this migration
+        highest = max(conn.execute(select(func.max(table.c.id))).scalar() or 0, max_archived_id())
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'bills'"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('bills', :seq)"), {"seq": highest})
+    # The search index triggers went with the old table
+    ensure_search_index(engine)
+
+@migration(9, "jobs")
+def create_jobs(engine):
+    # Render and cleanup job status, readable from every worker process
+    models.Job.__table__.create(bind=engine, checkfirst=True)
+
+@migration(10, "outbox_claims")
+def add_outbox_claims(engine):
+    # Who is sending an outbox row and since when, so a new outbox leader only retries abandoned sends
+    from sqlalchemy import inspect
+
+    existing = {column["name"] for column in inspect(engine).get_columns("outbox")}
+    with engine.begin() as conn:
+        for name in ("claimed_by", "claimed_at"):
+            if name not in existing:
+                column_type = models.OutboundMessage.__table__.c[name].type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE outbox ADD COLUMN {name} {column_type}"))
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def version_of(name: str) -> int:
+    return next(version for version, migration_name, _ in MIGRATIONS if migration_name == name)
+
+def applied_versions(engine) -> set:
+    """Versions recorded in schema_migrations (empty when the table does not exist yet)."""
+    from sqlalchemy import inspect
+
+    if not inspect(engine).has_table(models.SchemaMigration.__tablename__):
+        return set()
+    with Session(engine) as db:
+        return {row[0] for row in db.query(models.SchemaMigration.version)}
+
+def pending(engine) -> list:
+    applied = applied_versions(engine)
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+def upgrade(engine=None, target: int = None) -> list:
+    """Applies the pending migrations up to `target` (default: all), in order. Returns the names applied."""
+    engine = engine or database.engine
+    models.SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+    applied = applied_versions(engine)
+
+    done = []
+    for version, name, fn in MIGRATIONS:
+        if version in applied or (target is not None and version > target):
+            continue
+        print(f"Applying migration {version}: {name}")
+        fn(engine)
+        with Session(engine) as db:
+            db.add(models.SchemaMigration(version=version, name=name))
+            db.commit()
+        done.append(name)
+    return done
+
+def check(engine=None):
+    """
+    Raises SchemaOutOfDate when migrations are pending, or when the database
+    has been migrated by newer code than this (called on app startup).
+    """
+    engine = engine or database.engine
+    applied = applied_versions(engine)
+    if applied and max(applied) > LATEST_VERSION:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {max(applied)}, newer than this code's {LATEST_VERSION}. "
+            f"Deploy the backend that migrated it, or a later one."
+        )
+    missing = pending(engine)
+    if missing:
+        names = ", ".join(f"{version} {name}" for version, name in missing)
+        raise SchemaOutOfDate(
+            f"Database schema is out of date (pending migrations: {names}). "
+            f"Run `python -m migrations` from backend/ first."
+        )
+
+if __name__ == "__main__":
+    # python -m migrations [upgrade|status]   (run from backend/)
+    parser = argparse.ArgumentParser(description="Apply or list database schema migrations")
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    parser.add_argument("--target", type=int, help="Stop after this version")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        applied = applied_versions(database.engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:>3} {name:<20} {'applied' if version in applied else 'pending'}")
+        sys.exit(0)
+
+    done = upgrade(database.engine, args.target)
+    print(f"Applied {len(done)} migration(s)" if done else "Schema is up to date")
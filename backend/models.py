@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -17,6 +17,13 @@ class Bill(Base):
 
     items = relationship("BillItem", back_populates="bill", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Backs the (date, id) keyset pagination and date range filters
+        Index("ix_bills_date_id", "date", "id"),
+        # Ids of deleted or archived bills are never handed out again on SQLite
+        {"sqlite_autoincrement": True},
+    )
+
 class BillItem(Base):
     __tablename__ = "bill_items"
 
@@ -27,5 +34,114 @@ class BillItem(Base):
     quantity = Column(Integer)
     discount = Column(Float, default=0.0)
     item_total = Column(Float)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=True)
 
     bill = relationship("Bill", back_populates="items")
+    item = relationship("Item")
+
+    __table_args__ = (
+        # Per-item sales read as a range scan on one item's rows
+        Index("ix_bill_items_item_bill", "item_id", "bill_id"),
+        # Items of a page of bills, and the read-back after inserting bills
+        Index("ix_bill_items_bill_id", "bill_id"),
+    )
+
+class Item(Base):
+    """
+    Catalog of item names. Bill items reference it by integer id; names are
+    interned by utils.item_catalog so spacing/case variants share one row.
+    """
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    normalized_name = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class OutboundMessage(Base):
+    """
+    Durable outbox of customer messages. One row per (bill, channel), which
+    doubles as the idempotency key: a bill can never be messaged twice on the
+    same channel. Rows are drained by utils.messaging.OutboxWorker.
+    """
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bill_id = Column(Integer, ForeignKey("bills.id"), nullable=False)
+    channel = Column(String, nullable=False, default="whatsapp")
+    phone = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending") # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    # Process sending the row (status "sending") and when it last confirmed that it still is
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("bill_id", "channel", name="uq_outbox_bill_channel"),
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+class SalesRollup(Base):
+    """
+    Pre-aggregated bill totals per day and per month, split by status and
+    payment mode. Kept up to date by utils.rollups on every write to bills.
+    """
+    __tablename__ = "sales_rollup"
+
+    grain = Column(String, primary_key=True) # day, month
+    period = Column(Date, primary_key=True) # the day, or the first of the month
+    status = Column(String, primary_key=True)
+    payment_mode = Column(String, primary_key=True) # "" when not set
+    bill_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    discount = Column(Float, nullable=False, default=0.0)
+
+class ItemSalesRollup(Base):
+    """Pre-aggregated item sales per day and per month, for top item queries."""
+    __tablename__ = "item_sales_rollup"
+
+    grain = Column(String, primary_key=True) # day, month
+    period = Column(Date, primary_key=True)
+    item_name = Column(String, primary_key=True)
+    line_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+class Lease(Base):
+    """
+    Named lease held by one process at a time (utils.leases), so background
+    work runs once per deployment rather than once per worker process.
+    """
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    acquired_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+class Job(Base):
+    """
+    Status of a background job (utils.jobs), so it can be polled from every
+    worker process, not only the one running it.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False) # render, cleanup
+    status = Column(String, nullable=False)
+    state = Column(Text, nullable=False) # the job's to_dict() as JSON
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    finished_at = Column(DateTime, nullable=True, index=True)
+
+class SchemaMigration(Base):
+    """Migrations from migrations.py applied to this database, one row per version."""
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.datetime.utcnow)
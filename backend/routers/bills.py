@@ -1,203 +1,187 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from PIL import Image
-from sqlalchemy import func, extract
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, extract, insert, select, tuple_, or_
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 import database
 import models
 import schemas
 import datetime
+import calendar
+import itertools
 import csv
 import io
-from fastapi.responses import StreamingResponse
+import base64
+import tempfile
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 router = APIRouter(
     prefix="/bills",
     tags=["bills"]
 )
 
-from fastapi import BackgroundTasks
-import sys
-import os
+# Upper bound on bills returned by a single listing request
+MAX_PAGE_SIZE = 500
 
-# Ensure we can import from utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.invoice_gen import create_invoice_image
+# Years the year filter accepts; the filters work on [year, year + 1) datetimes, which 9999 overflows
+MIN_YEAR, MAX_YEAR = 1, 9998
 
-def send_whatsapp_task(bill_id: int, phone: str, message: str, bill_obj=None):
-    try:
-        import time
-        import webbrowser
-        import pyautogui
-        import win32clipboard
-        from PIL import Image
-        from io import BytesIO
-        from io import BytesIO
-        from urllib.parse import quote
-        import subprocess
-
-        def focus_whatsapp_window():
-            """
-            Attempts to bring the WhatsApp Web browser window to the foreground using PowerShell.
-            Checks for common browser processes with 'WhatsApp' in the title.
-            """
-            try:
-                print("Attempting to focus WhatsApp window...")
-                ps_script = """
-                $w = New-Object -ComObject WScript.Shell
-                $proc = Get-Process | Where-Object { $_.MainWindowTitle -like '*WhatsApp*' } | Select-Object -First 1
-                if ($proc) { 
-                    $w.AppActivate($proc.Id) 
-                    Write-Output "FOCUSED_PID:$($proc.Id)"
-                } else {
-                    Write-Output "WhatsApp window not found"
-                }
-                """
-                result = subprocess.run(["powershell", "-Command", ps_script], capture_output=True, text=True)
-                output = result.stdout.strip()
-                print(f"Focus Result: {output}")
-                
-                if "FOCUSED_PID" in output:
-                    time.sleep(1) # Allow transition
-                    return True
-                return False
-            except Exception as e:
-                print(f"Focus Script Error: {e}")
-                return False
-
-        # Phone must have country code. Standardizing to +91 if missing
-        phone = phone.strip()
-        if not phone.startswith("+"):
-            phone = "+91" + phone
-            
-        # Clean phone (remove + for whatsapp url usually expects digits, but + works too mostly. 
-        # Standard: https://web.whatsapp.com/send?phone=919611...
-        phone_digits = phone.replace("+", "").replace(" ", "")
-
-        # Generate Invoice Image
-        image_path = None
-        if bill_obj:
-            print(f"Generating invoice for bill {bill_id}...")
-            image_path, _ = create_invoice_image(bill_obj)
-            
-        if image_path and os.path.exists(image_path):
-            abs_image_path = os.path.abspath(image_path)
-            
-            # 1. Copy Image to Clipboard (Reliable Method)
-            try:
-                image = Image.open(abs_image_path)
-                output = BytesIO()
-                image.convert("RGB").save(output, "BMP")
-                data = output.getvalue()[14:]
-                output.close()
-                
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardData(win32clipboard.CF_DIB, data)
-                win32clipboard.CloseClipboard()
-                print("Image copied to clipboard.")
-            except Exception as e:
-                 print(f"Clipboard Error: {e}")
-                 return # Exit if we can't copy image (user requirement)
-
-            # 2. Open WhatsApp Web
-            # Encode message
-            encoded_message = quote(message)
-            url = f"https://web.whatsapp.com/send?phone={phone_digits}&text={encoded_message}"
-            
-            print(f"Opening WhatsApp for {phone}...")
-            webbrowser.open(url)
-            
-            # 3. Wait for Load (Critical Step)
-            # 20 seconds to be safe for network
-            time.sleep(20)
-            
-            # 4. Paste Image
-            print("Pasting image...")
-            
-            # FORCE FOCUS BEFORE PASTING
-            focus_whatsapp_window()
-            
-            # Click to ensure focus on the message box
-            # We assume the chat box is focused by default on load, but a click helps.
-            # Clicking center of screen usually hits the chat window or background (safe)
-            try:
-                width, height = pyautogui.size()
-                pyautogui.click(width / 2, height / 2)
-            except:
-                pass
-                
-            time.sleep(1)
-            pyautogui.hotkey('ctrl', 'v')
-            
-            # 5. Wait for Image Preview
-            time.sleep(3)
-            
-            # 6. Send
-            print("Sending...")
-            pyautogui.press('enter')
-            
-            # 7. Close Tab (Safely)
-            time.sleep(8)
-            
-            print("Attempting to close WhatsApp tab...")
-            # Verify focus AGAIN before closing
-            is_focused = focus_whatsapp_window()
-            
-            if is_focused:
-                print("WhatsApp verified in focus. Closing tab...")
-                pyautogui.hotkey('ctrl', 'w')
-            else:
-                print("WARNING: Could not verify WhatsApp focus. SKIPPING CLOSE to protect other tabs.")
-            
-        else:
-            print("No image to send.")
-            
-    except Exception as e:
-        print(f"WhatsApp Automation Error: {e}")
-        import traceback
-        traceback.print_exc()
+import os
+
+from utils.invoice_gen import render_key, cached_render_key, invoice_path
+from utils import invoice_encode
+from utils.render_pool import render_service, bill_to_data, data_to_bill, RenderQueueFull
+
+# Seconds GET /bills/{bill_id}/invoice waits for a render before answering 202
+INVOICE_RENDER_WAIT = float(os.environ.get("INVOICE_RENDER_WAIT", 10))
+
+# Versioned invoice URLs never change content, so browsers and nginx may keep them for a year
+INVOICE_IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+from utils import search_index
+from utils import messaging
+from utils import rollups
+from utils.item_catalog import intern_items
+from utils import retention
+from utils import archive
+from utils import bill_rows
+from utils import metrics
+from utils.response_cache import response_cache, json_response, etag_matches
+from utils.retention import cleanup_service
+from utils.messaging import outbox_worker
+
+def insert_bills(db: Session, bills: List[schemas.BillCreate]) -> List[schemas.Bill]:
+    """
+    Inserts bills and their items inside the caller's transaction.
+    Items for every bill go in as one executemany, and the response is
+    built from the inserted values plus a single lookup of the item ids,
+    so the cost does not grow with a round-trip per item.
+    """
+    db_bills = [
+        models.Bill(
+            customer_name=bill.customer_name,
+            customer_phone=bill.customer_phone,
+            date=bill.date,
+            total_amount=bill.total_amount,
+            discount=bill.discount,
+            status=bill.status,
+            payment_mode=bill.payment_mode
+        )
+        for bill in bills
+    ]
+    db.add_all(db_bills)
+    db.flush()
+
+    item_ids = intern_items(db, [item.item_name for bill in bills for item in bill.items])
+    item_rows = [
+        {
+            "bill_id": db_bill.id,
+            "item_id": item_ids[item.item_name],
+            "item_name": item.item_name,
+            "price": item.price,
+            "quantity": item.quantity,
+            "discount": item.discount,
+            "item_total": item.item_total
+        }
+        for db_bill, bill in zip(db_bills, bills)
+        for item in bill.items
+    ]
+    items_by_bill = {db_bill.id: [] for db_bill in db_bills}
+    if item_rows:
+        db.execute(insert(models.BillItem), item_rows)
+        item_table = models.BillItem.__table__
+        rows = db.execute(
+            select(item_table)
+            .where(item_table.c.bill_id.between(min(items_by_bill), max(items_by_bill)))
+            .order_by(item_table.c.id)
+        ).mappings()
+        for row in rows:
+            if row["bill_id"] in items_by_bill:
+                items_by_bill[row["bill_id"]].append(schemas.BillItem.model_validate(row))
+
+    results = [
+        schemas.Bill(id=db_bill.id, items=items_by_bill[db_bill.id], **bill.model_dump(exclude={"items"}))
+        for db_bill, bill in zip(db_bills, bills)
+    ]
+    rollups.record_bills(db, results)
+    return results
 
 @router.post("/", response_model=schemas.Bill)
 def create_bill(
     bill: schemas.BillCreate, 
-    background_tasks: BackgroundTasks,
     db: Session = Depends(database.get_db)
 ):
-    db_bill = models.Bill(
-        customer_name=bill.customer_name,
-        customer_phone=bill.customer_phone,
-        date=bill.date,
-        total_amount=bill.total_amount,
-        discount=bill.discount,
-        status=bill.status,
-        payment_mode=bill.payment_mode
-    )
-    db.add(db_bill)
-    db.commit()
-    db.refresh(db_bill)
-
-    for item in bill.items:
-        db_item = models.BillItem(
-            bill_id=db_bill.id,
-            item_name=item.item_name,
-            price=item.price,
-            quantity=item.quantity,
-            discount=item.discount,
-            item_total=item.item_total
-        )
-        db.add(db_item)
-    
-    db.commit()
-    db.refresh(db_bill)
+    try:
+        result = insert_bills(db, [bill])[0]
+        # Queued in the same transaction, so a saved paid bill always gets its message
+        queued = result.status == "Paid" and result.customer_phone
+        if queued:
+            messaging.enqueue(db, result)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
 
-    if db_bill.status == "Paid" and db_bill.customer_phone:
-        message = f"Dear Mr/Mrs {db_bill.customer_name}, here is your invoice for Rs {db_bill.total_amount}. Thanks for shopping with us. We hope this saree adds beauty to your special moments (Bill ID: {db_bill.id})"
-        background_tasks.add_task(send_whatsapp_task, db_bill.id, db_bill.customer_phone, message, db_bill)
+    response_cache.bump()
+    if queued:
+        outbox_worker.notify()
 
-    return db_bill
+    return result
 
-    return db_bill
+@router.post("/batch", response_model=List[schemas.Bill])
+def create_bills_batch(
+    bills: List[schemas.BillCreate],
+    db: Session = Depends(database.get_db)
+):
+    """
+    Inserts many bills (e.g. queued offline at a counter) in one transaction.
+    Either every bill is saved or none is. Invoices are not sent for synced
+    bills; use /bills/{bill_id}/send-whatsapp for those that need one.
+    """
+    try:
+        result = insert_bills(db, bills)
+        db.commit()
+    except IntegrityError as e:
+        # Bad data the schema let through; anything else (e.g. a locked database) is a server error
+        db.rollback()
+        print(f"Batch Insert Error: {e}")
+        raise HTTPException(status_code=400, detail="Bills could not be saved: they break a database constraint")
+    except Exception:
+        db.rollback()
+        raise
+
+    response_cache.bump()
+    return result
+
+MONTH_MAP = {
+    "January": 1, "February": 2, "March": 3, "April": 4,
+    "May": 5, "June": 6, "July": 7, "August": 8,
+    "September": 9, "October": 10, "November": 11, "December": 12
+}
+
+def parse_month(month: str) -> Optional[int]:
+    month_int = MONTH_MAP.get(month)
+    if month_int:
+        return month_int
+    try:
+        m = int(month)
+    except ValueError:
+        return None
+    return m if 1 <= m <= 12 else None
+
+def parse_date_bound(value: str, name: str):
+    """
+    Parses a 'YYYY-MM-DD' or ISO datetime query value.
+    Returns the datetime and whether only a day was given.
+    """
+    try:
+        if len(value) == 10:
+            return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time.min), True
+        return datetime.datetime.fromisoformat(value), False
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value}")
 
 def apply_bill_filters(
     query, 
@@ -205,147 +189,301 @@ def apply_bill_filters(
     month: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    customer_name: Optional[str] = None
+    customer_name: Optional[str] = None,
+    use_search_index: bool = True
 ):
-    if year:
-        query = query.filter(extract('year', models.Bill.date) == year)
-        
-    if month:
-        month_map = {
-            "January": 1, "February": 2, "March": 3, "April": 4,
-            "May": 5, "June": 6, "July": 7, "August": 8,
-            "September": 9, "October": 10, "November": 11, "December": 12
-        }
-        month_int = month_map.get(month)
-        if month_int:
-            query = query.filter(extract('month', models.Bill.date) == month_int)
+    # Dates are filtered as half-open ranges on the raw column so that
+    # ix_bills_date_id can be used; wrapping Bill.date in extract() cannot.
+    month_int = parse_month(month) if month else None
+
+    if year and month_int:
+        period_start = datetime.datetime(year, month_int, 1)
+        if month_int == 12:
+            period_end = datetime.datetime(year + 1, 1, 1)
         else:
-            try:
-                m = int(month)
-                query = query.filter(extract('month', models.Bill.date) == m)
-            except:
-                pass
+            period_end = datetime.datetime(year, month_int + 1, 1)
+        query = query.filter(models.Bill.date >= period_start, models.Bill.date < period_end)
+    elif year:
+        query = query.filter(models.Bill.date >= datetime.datetime(year, 1, 1), models.Bill.date < datetime.datetime(year + 1, 1, 1))
+    elif month_int:
+        # A month across every year is not a single range, so this one still scans
+        query = query.filter(extract('month', models.Bill.date) == month_int)
 
     if start_date:
-        # Assuming format 'YYYY-MM-DD'
-        # Compare as strings is fine for ISO format, but to be safe against time components:
-        # If we want exact day matching
-        query = query.filter(models.Bill.date >= start_date)
+        start, _ = parse_date_bound(start_date, "start_date")
+        query = query.filter(models.Bill.date >= start)
         
     if end_date:
-        # Append time to end of day to make it inclusive for that day
-        # If input is '2025-01-01', we check <= '2025-01-01 23:59:59'
-        if len(end_date) == 10: # simple check for YYYY-MM-DD
-             query = query.filter(models.Bill.date <= f"{end_date} 23:59:59")
+        # A bare day is inclusive of the whole day: everything before the next midnight
+        end, day_only = parse_date_bound(end_date, "end_date")
+        if day_only:
+            query = query.filter(models.Bill.date < end + datetime.timedelta(days=1))
         else:
-             query = query.filter(models.Bill.date <= end_date)
+            query = query.filter(models.Bill.date <= end)
 
     if customer_name:
-        query = query.filter(models.Bill.customer_name.ilike(f"%{customer_name}%"))
+        # Archive partitions have no FTS table, so they always take the ILIKE path
+        if use_search_index and search_index.can_search(customer_name):
+            query = query.filter(models.Bill.id.in_(search_index.matching_ids(customer_name)))
+        else:
+            query = query.filter(models.Bill.customer_name.ilike(f"%{customer_name}%"))
 
     return query
 
-@router.get("/", response_model=List[schemas.Bill])
-def get_bills(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    bills = db.query(models.Bill).order_by(models.Bill.date.desc()).offset(skip).limit(limit).all()
+def bill_range(
+    year: Optional[int] = None,
+    month: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+):
+    """The [start, end) datetimes the filters can match, None when unbounded; used to pick archive partitions."""
+    start = end = None
+    month_int = parse_month(month) if month else None
+    if year:
+        start = datetime.datetime(year, month_int or 1, 1)
+        end = archive.next_month(start) if month_int else datetime.datetime(year + 1, 1, 1)
+    if start_date:
+        day = parse_date_bound(start_date, "start_date")[0]
+        start = max(start, day) if start else day
+    if end_date:
+        day, day_only = parse_date_bound(end_date, "end_date")
+        day = day + datetime.timedelta(days=1) if day_only else day + datetime.timedelta(microseconds=1)
+        end = min(end, day) if end else day
+    return start, end
+
+def add_archived_page(bills: list, build, limit: int, cursor: Optional[str], start, end) -> list:
+    """
+    Merges matching archived bills into a page of hot bill dicts (both already
+    in keyset order). Partitions are read newest first and skipped once the
+    page is full of bills newer than the partition's month.
+    """
+    for period, archive_db in archive.iter_sessions(start, end):
+        if len(bills) > limit and bills[limit]["date"] and bills[limit]["date"] >= archive.next_month(period):
+            break
+        bills = bills + bill_rows.fetch(archive_db, keyset_page(build(archive_db), limit, cursor))
+        bills.sort(key=lambda bill: (bill["date"] or datetime.datetime.min, bill["id"]), reverse=True)
+        bills = bills[:limit + 1]
     return bills
 
-@router.get("/export")
-def export_bills(
-    year: Optional[int] = Query(None),
-    month: Optional[str] = Query(None),
-    start_date: Optional[str] = Query(None),
-    end_date: Optional[str] = Query(None),
-    customer_name: Optional[str] = Query(None),
+def archive_sources(build, start, end, db: Optional[Session] = None):
+    """
+    Yields build(session) for the hot database, then for each archive
+    partition overlapping [start, end), newest first. Without `db` a session
+    of its own is opened, for generators that outlive the request.
+    """
+    own = db is None
+    db = db or database.SessionLocal()
+    try:
+        yield build(db, True)
+    finally:
+        if own:
+            db.close()
+    for _, archive_db in archive.iter_sessions(start, end):
+        yield build(archive_db, False)
+
+def encode_cursor(bill: dict) -> str:
+    raw = f"{bill['date'].isoformat()}|{bill['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_str, bill_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(date_str), int(bill_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_page(query, limit: int, cursor: Optional[str] = None, skip: int = 0):
+    """Applies the cursor, order and limit of a page; works on a Query or a select()."""
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        query = query.filter(tuple_(models.Bill.date, models.Bill.id) < tuple_(cursor_date, cursor_id))
+    # One extra row tells whether another page exists
+    query = query.order_by(models.Bill.date.desc(), models.Bill.id.desc()).limit(limit + 1)
+    if skip and not cursor:
+        # Kept for older clients; deep offsets still scan, prefer the cursor
+        query = query.offset(skip)
+    return query
+
+def finish_page(bills: list, response: Response, limit: int) -> list:
+    if len(bills) > limit:
+        bills = bills[:limit]
+        if bills[-1]["date"] is not None:
+            response.headers["X-Next-Cursor"] = encode_cursor(bills[-1])
+    return bills
+
+def paginate_bills(db: Session, query, response: Response, limit: int, cursor: Optional[str] = None, skip: int = 0):
+    """
+    Keyset pagination on (date, id), newest first, backed by ix_bills_date_id.
+    When more rows remain, the cursor for the next page is returned in the
+    X-Next-Cursor header so the body stays a plain list of bills.
+    """
+    return finish_page(bill_rows.fetch(db, keyset_page(query, limit, cursor, skip)), response, limit)
+
+@router.get("/", response_model=List[schemas.Bill])
+def get_bills(
+    request: Request,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(database.get_db)
 ):
+    def compute(response):
+        return paginate_bills(db, bill_rows.bills_select(), response, limit, cursor, skip)
+
+    return response_cache.respond(request, compute)
+
+EXPORT_HEADERS = ['Bill ID', 'Date', 'Customer Name', 'Phone', 'Item Name', 'Quantity', 'Price', 'Item Total', 'Bill Total', 'Status', 'Payment Mode']
+
+EXPORT_COLUMN_WIDTHS = {
+    'A': 10, # Bill ID
+    'B': 20, # Date - THIS FIXES THE ### ISSUE
+    'C': 25, # Customer Name
+    'D': 15, # Phone
+    'E': 30, # Item Name
+    'F': 10, # Qty
+    'G': 10, # Price
+    'H': 12, # Item Total
+    'I': 12, # Bill Total
+    'J': 10, # Status
+    'K': 15  # Payment Mode
+}
+
+# Rows fetched from the database (and CSV rows buffered) per round
+EXPORT_CHUNK_SIZE = 1000
+
+export_rows_total = metrics.counter("export_rows_total", "Rows written to bill exports, by format.", ("format",))
+export_seconds = metrics.histogram("export_duration_seconds", "Time to produce a bill export, by format.", ("format",))
+
+def export_query(db: Session):
+    """One row per bill item, bills without items included, as plain column tuples."""
+    return db.query(
+        models.Bill.id,
+        models.Bill.date,
+        models.Bill.customer_name,
+        models.Bill.customer_phone,
+        models.BillItem.id.label("item_id"),
+        models.BillItem.item_name,
+        models.BillItem.quantity,
+        models.BillItem.price,
+        models.BillItem.item_total,
+        models.Bill.total_amount,
+        models.Bill.status,
+        models.Bill.payment_mode
+    ).outerjoin(models.BillItem, models.BillItem.bill_id == models.Bill.id)
+
+def export_rows(query):
+    """Streams export rows in chunks of EXPORT_CHUNK_SIZE instead of loading them all."""
+    query = query.order_by(models.Bill.date.desc(), models.Bill.id.desc(), models.BillItem.id).yield_per(EXPORT_CHUNK_SIZE)
+    for row in query:
+        # Phone - ensure it's treated as string
+        phone_val = str(row.customer_phone) if row.customer_phone else ""
+        date_val = row.date.strftime("%Y-%m-%d") if row.date else ""
+
+        if row.item_id is None:
+            item_vals = ["", "", "", ""]
+        else:
+            item_vals = [row.item_name, row.quantity, row.price, row.item_total]
+
+        yield [row.id, date_val, row.customer_name, phone_val, *item_vals, row.total_amount, row.status, row.payment_mode]
+
+def source_rows(queries):
+    """Export rows of each query in turn (hot database first, then archive partitions)."""
+    for query in queries:
+        yield from export_rows(query)
+
+def stream_csv(queries):
+    # Runs after the endpoint has returned, so `queries` opens its own sessions
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADERS)
+    started, count = time.perf_counter(), 0
+    try:
+        for count, row in enumerate(source_rows(queries), start=1):
+            writer.writerow(row)
+            if count % EXPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue().encode("utf-8")
+    finally:
+        export_rows_total.inc("csv", amount=count)
+        export_seconds.observe(time.perf_counter() - started, "csv")
+
+def build_xlsx(queries, output):
+    """
+    Writes the export with openpyxl's write-only mode, which streams rows to
+    a temporary file instead of keeping every cell object in memory.
+    """
     import openpyxl
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import Font, Alignment
 
-    query = db.query(models.Bill)
-    query = apply_bill_filters(query, year, month, start_date, end_date, customer_name)
-    bills = query.order_by(models.Bill.date.desc()).all()
-    
-    # Create Workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Bills Export"
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Bills Export")
 
-    # Headers
-    headers = ['Bill ID', 'Date', 'Customer Name', 'Phone', 'Item Name', 'Quantity', 'Price', 'Item Total', 'Bill Total', 'Status', 'Payment Mode']
-    ws.append(headers)
+    # Column widths must be set before the first row in write-only mode
+    for col, width in EXPORT_COLUMN_WIDTHS.items():
+        ws.column_dimensions[col].width = width
 
-    # Style Header
-    for cell in ws[1]:
+    # Styled header
+    header_cells = []
+    for header in EXPORT_HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
         cell.font = Font(bold=True)
         cell.alignment = Alignment(horizontal='center')
+        header_cells.append(cell)
+    ws.append(header_cells)
 
-    # Data
-    for bill in bills:
-        # Format date
-        date_val = bill.date
-        if isinstance(date_val, str):
-            # Try parsing if it's a string, or just keep as is
-            pass
-        
-        # Phone - ensure it's treated as string
-        phone_val = str(bill.customer_phone) if bill.customer_phone else ""
-
-        if bill.items:
-            for item in bill.items:
-                ws.append([
-                    bill.id,
-                    date_val.strftime("%Y-%m-%d") if date_val else "",
-                    bill.customer_name,
-                    phone_val,
-                    item.item_name,
-                    item.quantity,
-                    item.price,
-                    item.item_total,
-                    bill.total_amount,
-                    bill.status,
-                    bill.payment_mode
-                ])
-        else:
-             ws.append([
-                bill.id,
-                date_val.strftime("%Y-%m-%d") if date_val else "",
-                bill.customer_name,
-                phone_val,
-                "",
-                "",
-                "",
-                "",
-                bill.total_amount,
-                bill.status,
-                bill.payment_mode
-            ])
-
-    # Adjust Column Widths
-    # A=1, B=2, ...
-    column_widths = {
-        'A': 10, # Bill ID
-        'B': 20, # Date - THIS FIXES THE ### ISSUE
-        'C': 25, # Customer Name
-        'D': 15, # Phone
-        'E': 30, # Item Name
-        'F': 10, # Qty
-        'G': 10, # Price
-        'H': 12, # Item Total
-        'I': 12, # Bill Total
-        'J': 10, # Status
-        'K': 15  # Payment Mode
-    }
-    
-    for col, width in column_widths.items():
-        ws.column_dimensions[col].width = width
+    started, count = time.perf_counter(), 0
+    for count, row in enumerate(source_rows(queries), start=1):
+        ws.append(row)
 
-    output = io.BytesIO()
     wb.save(output)
-    output.seek(0)
-    
+    export_rows_total.inc("xlsx", amount=count)
+    export_seconds.observe(time.perf_counter() - started, "xlsx")
+
+def stream_file(file, chunk_size: int = 64 * 1024):
+    try:
+        file.seek(0)
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+@router.get("/export")
+def export_bills(
+    year: Optional[int] = Query(None, ge=MIN_YEAR, le=MAX_YEAR),
+    month: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    customer_name: Optional[str] = Query(None),
+    format: str = Query("xlsx", pattern="^(xlsx|csv)$"),
+    db: Session = Depends(database.get_db)
+):
+    def build(session, hot):
+        return apply_bill_filters(export_query(session), year, month, start_date, end_date, customer_name, use_search_index=hot)
+
+    start, end = bill_range(year, month, start_date, end_date)
+
+    if format == "csv":
+        response = StreamingResponse(stream_csv(archive_sources(build, start, end)), media_type="text/csv; charset=utf-8")
+        response.headers["Content-Disposition"] = "attachment; filename=bills_export.csv"
+        return response
+
+    # The xlsx zip container can only be finalized once every row is written,
+    # so it is built in a spooled temp file and then streamed out in chunks.
+    output = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    try:
+        build_xlsx(archive_sources(build, start, end, db), output)
+    except Exception:
+        output.close()
+        raise
+
     response = StreamingResponse(
-        iter([output.getvalue()]),
+        stream_file(output),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
     response.headers["Content-Disposition"] = "attachment; filename=bills_export.xlsx"
@@ -353,29 +491,335 @@ def export_bills(
 
 @router.get("/filter", response_model=List[schemas.Bill])
 def filter_bills(
-    year: Optional[int] = Query(None),
+    request: Request,
+    year: Optional[int] = Query(None, ge=MIN_YEAR, le=MAX_YEAR),
+    month: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    customer_name: Optional[str] = Query(None),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(database.get_db)
+):
+    def build(session, hot=False):
+        return apply_bill_filters(bill_rows.bills_select(), year, month, start_date, end_date, customer_name, use_search_index=hot)
+
+    def compute(response):
+        bills = bill_rows.fetch(db, keyset_page(build(db, True), limit, cursor))
+        bills = add_archived_page(bills, build, limit, cursor, *bill_range(year, month, start_date, end_date))
+        return finish_page(bills, response, limit)
+
+    return response_cache.respond(request, compute)
+
+@router.get("/search", response_model=List[schemas.Bill])
+def search_bills(
+    q: str = Query(..., min_length=1, description="Part of a customer name or phone number"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Looks up bills by customer name or phone, best matches first.
+    Uses the FTS5 trigram index when available, otherwise a prefix/substring scan.
+    """
+    term = q.strip()
+    if search_index.can_search(term):
+        ids = search_index.ranked_ids(db, term, limit)
+        by_id = {bill["id"]: bill for bill in bill_rows.fetch(db, bill_rows.bills_select().where(models.Bill.id.in_(ids)))}
+        return json_response([by_id[bill_id] for bill_id in ids if bill_id in by_id])
+
+    pattern = f"%{term}%"
+    query = (
+        bill_rows.bills_select()
+        .where(or_(models.Bill.customer_name.ilike(pattern), models.Bill.customer_phone.like(pattern)))
+        .order_by(models.Bill.customer_name.ilike(f"{term}%").desc(), models.Bill.date.desc())
+        .limit(limit)
+    )
+    return json_response(bill_rows.fetch(db, query))
+
+def stats_range(year: Optional[int], month: Optional[str], start_date: Optional[str], end_date: Optional[str]):
+    """Inclusive (start, end) days for /bills/stats; either may be None for an open range."""
+    start = end = None
+    month_int = parse_month(month) if month else None
+    if month and not month_int:
+        raise HTTPException(status_code=400, detail=f"Invalid month: {month}")
+    if month_int and not year:
+        raise HTTPException(status_code=400, detail="month requires year")
+
+    if year and month_int:
+        start = datetime.date(year, month_int, 1)
+        end = datetime.date(year, month_int, calendar.monthrange(year, month_int)[1])
+    elif year:
+        start, end = datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+
+    if start_date:
+        day = parse_date_bound(start_date, "start_date")[0].date()
+        start = max(start, day) if start else day
+    if end_date:
+        day = parse_date_bound(end_date, "end_date")[0].date()
+        end = min(end, day) if end else day
+
+    return start, end
+
+@router.get("/stats")
+def bills_stats(
+    request: Request,
+    year: Optional[int] = Query(None, ge=MIN_YEAR, le=MAX_YEAR),
+    month: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    top: int = Query(5, ge=1, le=50),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Revenue, bill count, average ticket, status/payment mode breakdowns and
+    top items for a period, read from the pre-aggregated rollup tables.
+    Ranges are whole days; a time part in start_date/end_date is ignored.
+    """
+    start, end = stats_range(year, month, start_date, end_date)
+    return response_cache.respond(request, lambda response: rollups.summarize(db, start, end, top))
+
+def iter_bill_data(query):
+    """Yields bill_to_data snapshots in chunks; runs on the render feeder thread with its own session."""
+    db = database.SessionLocal()
+    try:
+        for bill in query.with_session(db).options(selectinload(models.Bill.items)).yield_per(200):
+            yield bill_to_data(bill)
+    finally:
+        db.close()
+
+@router.post("/render", status_code=202)
+def render_invoices(
+    request: schemas.InvoiceRenderRequest,
+    db: Session = Depends(database.get_db)
+):
+    """
+    Re-renders the invoice of every bill in a date range on the render pool.
+    Returns a job whose progress can be polled at /bills/render/{job_id}.
+    """
+    query = apply_bill_filters(db.query(models.Bill), start_date=request.start_date, end_date=request.end_date)
+    query = query.order_by(models.Bill.date, models.Bill.id)
+    job = render_service.submit_many(iter_bill_data(query))
+    return render_service.get_job(job.id)
+
+@router.get("/render/{job_id}")
+def get_render_job(job_id: str):
+    job = render_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    return job
+
+@router.get("/statement")
+def bills_statement(
+    year: Optional[int] = Query(None, ge=MIN_YEAR, le=MAX_YEAR),
     month: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     customer_name: Optional[str] = Query(None),
     db: Session = Depends(database.get_db)
 ):
-    query = db.query(models.Bill)
-    query = apply_bill_filters(query, year, month, start_date, end_date, customer_name)
-    return query.order_by(models.Bill.date.desc()).all()
+    """
+    Multi-page PDF statement for a customer and/or period: a summary of every
+    matching bill followed by each invoice as a vector page.
+    """
+    from utils.invoice_pdf import write_statement_pdf
+
+    if not (year or start_date or end_date or customer_name):
+        raise HTTPException(status_code=400, detail="Choose a customer or a period for the statement")
+
+    filters = (year, month, start_date, end_date, customer_name)
+    start, end = bill_range(year, month, start_date, end_date)
+
+    def build_summary(session, hot):
+        query = session.query(models.Bill.id, models.Bill.date, models.Bill.customer_name, models.Bill.status, models.Bill.total_amount)
+        return apply_bill_filters(query, *filters, use_search_index=hot).all()
+
+    def build_bills(session, hot):
+        query = apply_bill_filters(session.query(models.Bill).options(selectinload(models.Bill.items)), *filters, use_search_index=hot)
+        return query.order_by(models.Bill.date, models.Bill.id).yield_per(100)
+
+    # Archived bills are included; the summary is in date order, invoice pages hot first
+    summary_rows = sorted(
+        itertools.chain.from_iterable(archive_sources(build_summary, start, end, db)),
+        key=lambda row: (row.date or datetime.datetime.min, row.id)
+    )
+    bills = itertools.chain.from_iterable(archive_sources(build_bills, start, end, db))
+
+    title_parts = ["Statement"]
+    if customer_name:
+        title_parts.append(customer_name)
+    if month:
+        title_parts.append(f"{month} {year or ''}".strip())
+    elif year:
+        title_parts.append(str(year))
+    if start_date or end_date:
+        title_parts.append(f"{start_date or '...'} to {end_date or '...'}")
+
+    output = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    try:
+        write_statement_pdf(output, " - ".join(title_parts), summary_rows, bills)
+    except Exception:
+        output.close()
+        raise
+
+    response = StreamingResponse(stream_file(output), media_type="application/pdf")
+    response.headers["Content-Disposition"] = "attachment; filename=statement.pdf"
+    return response
+
+@router.get("/archive")
+def list_archive_partitions():
+    """Monthly archive partition files and their sizes."""
+    return archive.describe_partitions()
+
+@router.post("/archive")
+def archive_old_bills(
+    older_than_days: int = Query(..., ge=1, description="Bills older than this many days move to the archive"),
+    dry_run: bool = Query(False, description="Only count what would be archived")
+):
+    """
+    Moves old bills and their items out of the live database into compressed
+    monthly partitions. Archived bills still appear in filters, statements,
+    exports and stats.
+    """
+    try:
+        return archive.archive_bills(older_than_days, dry_run)
+    except archive.ArchiveInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"Archive Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def archived_bill(bill_id: int) -> list:
+    """The archived bill with this id as a one-item list of bill dicts, or an empty list."""
+    for _, archive_db in archive.sessions_for_id(bill_id):
+        bills = bill_rows.fetch(archive_db, bill_rows.bills_select().where(models.Bill.id == bill_id))
+        if bills:
+            return bills
+    return []
 
 @router.get("/{bill_id}", response_model=schemas.Bill)
-def get_bill(bill_id: int, db: Session = Depends(database.get_db)):
-    db_bill = db.query(models.Bill).filter(models.Bill.id == bill_id).first()
+def get_bill(bill_id: int, request: Request, db: Session = Depends(database.get_db)):
+    def compute(response):
+        bills = bill_rows.fetch(db, bill_rows.bills_select().where(models.Bill.id == bill_id))
+        if not bills:
+            # Bills listed from the archive open the same way
+            bills = archived_bill(bill_id)
+        if not bills:
+            raise HTTPException(status_code=404, detail="Bill not found")
+        return bills[0]
+
+    return response_cache.respond(request, compute)
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if request.headers.get("if-none-match"):
+        return etag_matches(request, etag)
+    since = request.headers.get("if-modified-since")
+    if since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def invoice_file_response(request: Request, path: str, etag: str, cache_control: str, headers: dict = None,
+                          media_type: str = "image/png"):
+    """
+    The invoice file with ETag / Last-Modified validators: 304 when the client's
+    copy is current, otherwise the file (or the requested byte ranges).
+    """
+    stat_result = os.stat(path)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        **(headers or {}),
+    }
+    if not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path), headers=headers, stat_result=stat_result)
+
+@router.get("/{bill_id}/invoice")
+def get_bill_invoice(
+    bill_id: int,
+    request: Request,
+    format: str = Query("png", pattern="^(png|webp|jpeg|pdf)$"),
+    thumbnail: bool = False,
+    db: Session = Depends(database.get_db)
+):
+    """
+    Returns the invoice as a PNG, rendering it on the pool first if it is
+    missing or out of date. Answers 202 with the job if rendering takes longer
+    than INVOICE_RENDER_WAIT seconds, and 503 when the render queue is full.
+    The PNG carries its render key as ETag and, in Content-Location, the
+    versioned URL it can be cached under for good.
+    format=webp/jpeg return the same invoice in that format and thumbnail=true
+    the small WebP preview used by the bill list; both are derived from the PNG.
+    format=pdf returns the vector PDF instead, which is cheap enough to write inline.
+    """
+    db_bill = db.query(models.Bill).options(selectinload(models.Bill.items)).filter(models.Bill.id == bill_id).first()
     if db_bill is None:
         raise HTTPException(status_code=404, detail="Bill not found")
-    return db_bill
+
+    if format == "pdf":
+        from utils.invoice_pdf import create_invoice_pdf
+
+        pdf_path, _ = create_invoice_pdf(db_bill)
+        if not pdf_path:
+            raise HTTPException(status_code=500, detail="Invoice PDF generation failed")
+        return FileResponse(pdf_path, media_type="application/pdf", filename=f"invoice_{bill_id}.pdf")
+
+    variant = "thumb" if thumbnail else (None if format == "png" else format)
+    data = bill_to_data(db_bill)
+    path = invoice_path(bill_id)
+    key = render_key(data_to_bill(data))
+    if cached_render_key(path) != key or (variant and not invoice_encode.is_fresh(path, variant)):
+        try:
+            job, future = render_service.submit(data, (variant,) if variant else ())
+        except RenderQueueFull:
+            raise HTTPException(status_code=503, detail="Invoice render queue is full", headers={"Retry-After": "5"})
+
+        try:
+            path = future.result(timeout=INVOICE_RENDER_WAIT)
+        except FutureTimeoutError:
+            # The client may poll /bills/render/{job_id} on any worker process
+            render_service.publish(job)
+            return JSONResponse(status_code=202, content=render_service.get_job(job.id))
+        except Exception as e:
+            print(f"Invoice Render Error: {e}")
+            raise HTTPException(status_code=500, detail="Invoice rendering failed")
+
+    if variant:
+        return invoice_file_response(
+            request, invoice_encode.variant_path(path, variant), f'"{key}-{variant}"', "no-cache",
+            media_type=invoice_encode.media_type(variant)
+        )
+    # Relative, so it also resolves under nginx's /api/ prefix
+    location = {"Content-Location": f"invoice/{key}.png"}
+    return invoice_file_response(request, path, f'"{key}"', "no-cache", location)
+
+@router.get("/{bill_id}/invoice/{version}.png")
+def download_invoice(bill_id: int, version: str, request: Request):
+    """
+    One rendered version of the invoice PNG, as linked from /bills/{bill_id}/invoice.
+    The URL changes whenever the invoice does, so it is served as immutable
+    with range support and never touches the database; 404 once superseded.
+    """
+    etag = f'"{version}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": INVOICE_IMMUTABLE_CACHE})
+    path = invoice_path(bill_id)
+    if cached_render_key(path) != version:
+        raise HTTPException(status_code=404, detail="Invoice version not found")
+    return invoice_file_response(request, path, etag, INVOICE_IMMUTABLE_CACHE)
+
 @router.post("/{bill_id}/send-whatsapp")
 def send_whatsapp_message(
     bill_id: int, 
-    background_tasks: BackgroundTasks,
     db: Session = Depends(database.get_db)
 ):
+    """
+    Queues the invoice for WhatsApp delivery. Repeated calls for the same bill
+    return the existing outbox entry instead of sending again.
+    """
     db_bill = db.query(models.Bill).filter(models.Bill.id == bill_id).first()
     if db_bill is None:
         raise HTTPException(status_code=404, detail="Bill not found")
@@ -383,64 +827,92 @@ def send_whatsapp_message(
     if not db_bill.customer_phone:
         raise HTTPException(status_code=400, detail="Customer phone number missing")
         
-    message = f"Dear Mr/Mrs {db_bill.customer_name}, here is your invoice for Rs {db_bill.total_amount}. Thanks for shopping with us. We hope this saree adds beauty to your special moments (Bill ID: {db_bill.id})"
-    
-    background_tasks.add_task(send_whatsapp_task, db_bill.id, db_bill.customer_phone, message, db_bill)
-    
-    background_tasks.add_task(send_whatsapp_task, db_bill.id, db_bill.customer_phone, message, db_bill)
+    message = messaging.enqueue(db, db_bill)
+    db.commit()
+    outbox_worker.notify()
     
-    return {"status": "success", "detail": "Message scheduled in background"}
+    return {
+        "status": "success",
+        "detail": "Message already sent" if message.status == "sent" else "Message queued for sending",
+        "message": schemas.OutboundMessage.model_validate(message)
+    }
+
+@router.get("/{bill_id}/messages", response_model=List[schemas.OutboundMessage])
+def get_bill_messages(bill_id: int, db: Session = Depends(database.get_db)):
+    return db.query(models.OutboundMessage).filter(models.OutboundMessage.bill_id == bill_id).order_by(models.OutboundMessage.id).all()
+
+
+@router.patch("/{bill_id}/status", response_model=schemas.Bill)
+def update_bill_status(
+    bill_id: int,
+    update: schemas.BillStatusUpdate,
+    db: Session = Depends(database.get_db)
+):
+    db_bill = db.query(models.Bill).options(selectinload(models.Bill.items)).filter(models.Bill.id == bill_id).first()
+    if db_bill is None:
+        raise HTTPException(status_code=404, detail="Bill not found")
+
+    try:
+        # Item rollups do not depend on status, so only the bill totals move
+        rollups.record_bills(db, [db_bill], sign=-1, items=False)
+        db_bill.status = update.status
+        if update.payment_mode is not None:
+            db_bill.payment_mode = update.payment_mode
+        rollups.record_bills(db, [db_bill], items=False)
+
+        queued = db_bill.status == "Paid" and db_bill.customer_phone
+        if queued:
+            messaging.enqueue(db, db_bill)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    response_cache.bump()
+    if queued:
+        outbox_worker.notify()
 
+    return db_bill
 
 @router.delete("/cleanup")
 def cleanup_old_data(
     retention_days: int = Query(..., description="Number of days of data to keep. Older data will be deleted."),
-    db: Session = Depends(database.get_db)
+    dry_run: bool = Query(False, description="Only count what would be deleted"),
+    background: bool = Query(False, description="Run as a background job and return its id")
 ):
     """
     Deletes bills and associated invoice images older than the specified retention period.
+    Works through the old bills in chunks, committing each, so it never holds
+    the write lock for long. With background=true, poll /bills/cleanup/{job_id}.
     """
-    try:
-        # Calculate cutoff date
-        cutoff_date = datetime.datetime.now() - datetime.timedelta(days=retention_days)
-        print(f"Cleanup Started. Deleting data older than: {cutoff_date}")
-
-        # Find bills to delete
-        bills_to_delete = db.query(models.Bill).filter(models.Bill.date < cutoff_date).all()
-        
-        deleted_bills_count = 0
-        deleted_images_count = 0
-        
-        # Base directory for images
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        invoices_dir = os.path.join(base_dir, "invoices")
-
-        for bill in bills_to_delete:
-            # 1. Delete Image File
-            try:
-                filename = f"invoice_{bill.id}.png"
-                file_path = os.path.join(invoices_dir, filename)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    deleted_images_count += 1
-            except Exception as e:
-                print(f"Error deleting image for bill {bill.id}: {e}")
-
-            # 2. Delete Bill Record (Cascade deletes items)
-            db.delete(bill)
-            deleted_bills_count += 1
-            
-        db.commit()
-        
-        return {
-            "status": "success", 
-            "message": f"Cleanup complete. Deleted {deleted_bills_count} bills and {deleted_images_count} images.",
-            "deleted_bills": deleted_bills_count,
-            "deleted_images": deleted_images_count
-        }
+    if background and not dry_run:
+        job = cleanup_service.start(retention_days)
+        return JSONResponse(status_code=202, content=job.to_dict())
+
+    job = cleanup_service.new_job(retention_days, dry_run)
+    print(f"Cleanup Started{' (dry run)' if dry_run else ''}. Deleting data older than: {job.cutoff}")
+    job = retention.run_cleanup(job)
+    if job.status == "skipped":
+        raise HTTPException(status_code=409, detail=job.error)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+
+    if dry_run:
+        message = f"Dry run: would delete {job.deleted_bills} bills and {job.deleted_images} images."
+    else:
+        message = f"Cleanup complete. Deleted {job.deleted_bills} bills and {job.deleted_images} images."
+    return {
+        "status": "success",
+        "message": message,
+        "dry_run": dry_run,
+        "deleted_bills": job.deleted_bills,
+        "deleted_items": job.deleted_items,
+        "deleted_images": job.deleted_images
+    }
 
-    except Exception as e:
-        print(f"Cleanup Error: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get("/cleanup/{job_id}")
+def get_cleanup_job(job_id: str):
+    job = cleanup_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Cleanup job not found")
+    return job
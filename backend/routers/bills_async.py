@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import database
+import models
+import schemas
+from routers.bills import MAX_PAGE_SIZE, MIN_YEAR, MAX_YEAR, apply_bill_filters, keyset_page, finish_page, stats_range, bill_range, add_archived_page, archived_bill
+from utils import bill_rows
+from utils import rollups
+from utils.response_cache import response_cache
+
+# Native async versions of the hot read-only /bills routes, on an AsyncSession
+# instead of a threadpool worker each. Only mounted when DB_ASYNC is on, in
+# front of routers/bills.py, so these paths take precedence over the sync ones.
+
+router = APIRouter(
+    prefix="/bills",
+    tags=["bills"]
+)
+
+async def fetch_bills(db: AsyncSession, query) -> list:
+    """bill_rows.fetch() on the async session: the page, then its items, then assembled."""
+    rows = (await db.execute(query)).all()
+    if not rows:
+        return []
+    items = (await db.execute(bill_rows.items_select([row.id for row in rows]))).all()
+    return bill_rows.assemble(rows, items)
+
+@router.get("/", response_model=List[schemas.Bill])
+async def get_bills(
+    request: Request,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    async def compute(response):
+        query = keyset_page(bill_rows.bills_select(), limit, cursor, skip)
+        return finish_page(await fetch_bills(db, query), response, limit)
+
+    return await response_cache.respond_async(request, compute)
+
+@router.get("/filter", response_model=List[schemas.Bill])
+async def filter_bills(
+    request: Request,
+    year: Optional[int] = Query(None, ge=MIN_YEAR, le=MAX_YEAR),
+    month: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    customer_name: Optional[str] = Query(None),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    # Archive partitions are plain SQLite files read through sync sessions
+    def build(session):
+        return apply_bill_filters(bill_rows.bills_select(), year, month, start_date, end_date, customer_name, use_search_index=False)
+
+    async def compute(response):
+        query = apply_bill_filters(bill_rows.bills_select(), year, month, start_date, end_date, customer_name)
+        bills = await fetch_bills(db, keyset_page(query, limit, cursor))
+        bills = await run_in_threadpool(
+            add_archived_page, bills, build, limit, cursor, *bill_range(year, month, start_date, end_date)
+        )
+        return finish_page(bills, response, limit)
+
+    return await response_cache.respond_async(request, compute)
+
+@router.get("/stats")
+async def bills_stats(
+    request: Request,
+    year: Optional[int] = Query(None, ge=MIN_YEAR, le=MAX_YEAR),
+    month: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    top: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    start, end = stats_range(year, month, start_date, end_date)
+    return await response_cache.respond_async(request, lambda response: db.run_sync(rollups.summarize, start, end, top))
+
+# :int keeps this from shadowing /bills/export, /bills/search and the other static paths
+@router.get("/{bill_id:int}", response_model=schemas.Bill)
+async def get_bill(bill_id: int, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    async def compute(response):
+        bills = await fetch_bills(db, bill_rows.bills_select().where(models.Bill.id == bill_id))
+        if not bills:
+            bills = await run_in_threadpool(archived_bill, bill_id)
+        if not bills:
+            raise HTTPException(status_code=404, detail="Bill not found")
+        return bills[0]
+
+    return await response_cache.respond_async(request, compute)
@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func, extract, distinct
+from typing import List, Optional
+import database
+import datetime
+import models
+import schemas
+from routers.bills import parse_date_bound
+
+router = APIRouter(
+    prefix="/items",
+    tags=["items"]
+)
+
+@router.get("/", response_model=List[schemas.Item])
+def list_items(
+    q: Optional[str] = Query(None, description="Part of an item name"),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(database.get_db)
+):
+    query = db.query(models.Item)
+    if q:
+        query = query.filter(models.Item.normalized_name.contains(" ".join(q.split()).lower()))
+    return query.order_by(models.Item.name).limit(limit).all()
+
+@router.get("/{item_id}", response_model=schemas.Item)
+def get_item(item_id: int, db: Session = Depends(database.get_db)):
+    item = db.query(models.Item).filter(models.Item.id == item_id).first()
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
+
+@router.get("/{item_id}/sales")
+def get_item_sales(
+    item_id: int,
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Quantity, revenue and bill count for one item, in total and per month.
+    Reads only this item's rows through ix_bill_items_item_bill.
+    """
+    item = db.query(models.Item).filter(models.Item.id == item_id).first()
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    year = extract("year", models.Bill.date)
+    month = extract("month", models.Bill.date)
+    query = db.query(
+        year, month,
+        func.count(distinct(models.BillItem.bill_id)),
+        func.sum(models.BillItem.quantity),
+        func.sum(models.BillItem.item_total)
+    ).join(models.BillItem.bill).filter(models.BillItem.item_id == item_id)
+
+    if start_date:
+        start, _ = parse_date_bound(start_date, "start_date")
+        query = query.filter(models.Bill.date >= start)
+    if end_date:
+        end, day_only = parse_date_bound(end_date, "end_date")
+        if day_only:
+            query = query.filter(models.Bill.date < end + datetime.timedelta(days=1))
+        else:
+            query = query.filter(models.Bill.date <= end)
+
+    by_month = [
+        {"year": int(y), "month": int(m), "bill_count": bills, "quantity": quantity or 0, "revenue": round(revenue or 0, 2)}
+        for y, m, bills, quantity, revenue in query.group_by(year, month).order_by(year, month).all()
+    ]
+
+    return {
+        "item": schemas.Item.model_validate(item),
+        "bill_count": sum(row["bill_count"] for row in by_month),
+        "quantity": sum(row["quantity"] for row in by_month),
+        "revenue": round(sum(row["revenue"] for row in by_month), 2),
+        "by_month": by_month,
+    }
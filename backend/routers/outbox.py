@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import List, Optional
+import database
+import models
+import schemas
+
+router = APIRouter(
+    prefix="/outbox",
+    tags=["outbox"]
+)
+
+@router.get("/", response_model=List[schemas.OutboundMessage])
+def list_messages(
+    status: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(database.get_db)
+):
+    query = db.query(models.OutboundMessage)
+    if status:
+        query = query.filter(models.OutboundMessage.status == status)
+    return query.order_by(models.OutboundMessage.id.desc()).limit(limit).all()
+
+@router.get("/stats")
+def outbox_stats(db: Session = Depends(database.get_db)):
+    """Message counts per status (pending, sending, sent, failed)."""
+    rows = db.query(models.OutboundMessage.status, func.count(models.OutboundMessage.id)).group_by(
+        models.OutboundMessage.status
+    ).all()
+    return {status: count for status, count in rows}
+
+@router.get("/{message_id}", response_model=schemas.OutboundMessage)
+def get_message(message_id: int, db: Session = Depends(database.get_db)):
+    message = db.query(models.OutboundMessage).filter(models.OutboundMessage.id == message_id).first()
+    if message is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return message
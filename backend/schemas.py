@@ -15,6 +15,7 @@ class BillItemCreate(BillItemBase):
 class BillItem(BillItemBase):
     id: int
     bill_id: int
+    item_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -41,3 +42,29 @@ class Bill(BillBase):
 class BillStatusUpdate(BaseModel):
     status: str
     payment_mode: Optional[str] = None
+
+class InvoiceRenderRequest(BaseModel):
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
+class OutboundMessage(BaseModel):
+    id: int
+    bill_id: int
+    channel: str
+    phone: str
+    status: str
+    attempts: int
+    next_attempt_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    sent_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
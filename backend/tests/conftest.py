@@ -0,0 +1,90 @@
+import datetime
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# The backend reads its configuration at import time, so the test database,
+# invoice folder and archive are pointed at a scratch directory before any
+# backend module is imported.
+TEST_DIR = tempfile.mkdtemp(prefix="billing_tests_")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(TEST_DIR, 'billing.db')}",
+    "INVOICES_DIR": os.path.join(TEST_DIR, "invoices"),
+    "ARCHIVE_DIR": os.path.join(TEST_DIR, "archive"),
+    "ARCHIVE_CACHE_DIR": os.path.join(TEST_DIR, "archive_cache"),
+    "RESPONSE_CACHE_STAMP": os.path.join(TEST_DIR, "cache.stamp"),
+    # Every request reaches the database, so statement counts are not hidden by cached responses
+    "RESPONSE_CACHE_SIZE": "0",
+    "MESSAGE_TRANSPORT": "fake",
+    # The app's outbox worker only wakes on enqueue, so tests that drive a worker themselves don't race it
+    "OUTBOX_POLL_INTERVAL": "3600",
+})
+
+import database
+import migrations
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+# Tables emptied between tests, children first
+TABLES = ("outbox", "bill_items", "bills", "items", "sales_rollup", "item_sales_rollup", "leases", "jobs")
+
+@pytest.fixture(scope="session")
+def app():
+    migrations.upgrade(database.engine)
+    import main
+
+    return main.app
+
+@pytest.fixture(scope="session")
+def session_client(app):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def client(session_client):
+    yield session_client
+    from sqlalchemy import text
+
+    with database.engine.begin() as conn:
+        for table in TABLES:
+            conn.execute(text(f"DELETE FROM {table}"))
+
+@pytest.fixture
+def statements():
+    """SQL statements sent on the app's engine while the test runs."""
+    from sqlalchemy import event
+
+    sent = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    yield sent
+    event.remove(database.engine, "before_cursor_execute", record)
+
+def bill_payload(name: str = "Asha Rao", phone: str = "9876543210", items: int = 2,
+                 date: datetime.datetime = None, status: str = "Unpaid") -> dict:
+    """A bill as the JSON body of POST /bills/."""
+    lines = [
+        {"item_name": f"Silk Saree {i}", "price": 1000.0, "quantity": 1, "discount": 0.0, "item_total": 1000.0}
+        for i in range(items)
+    ]
+    return {
+        "customer_name": name,
+        "customer_phone": phone,
+        "date": (date or datetime.datetime(2025, 3, 4, 11, 30)).isoformat(),
+        "total_amount": 1000.0 * items,
+        "status": status,
+        "items": lines,
+    }
+
+def create_bills(client, count: int, **kwargs) -> list:
+    response = client.post("/bills/batch", json=[bill_payload(**kwargs) for _ in range(count)])
+    assert response.status_code == 200, response.text
+    return response.json()
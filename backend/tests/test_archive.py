@@ -0,0 +1,143 @@
+import datetime
+import shutil
+
+import pytest
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+import database
+import migrations
+import models
+from conftest import create_bills
+from utils import archive, leases
+
+@pytest.fixture
+def archive_dir():
+    yield archive.ARCHIVE_DIR
+    shutil.rmtree(archive.ARCHIVE_DIR, ignore_errors=True)
+
+def archived_count() -> int:
+    return sum(db.query(models.Bill).count() for _, db in archive.iter_sessions())
+
+def test_archived_bill_ids_are_not_reused(client, archive_dir):
+    old = create_bills(client, 3, date=datetime.datetime(2020, 1, 5))
+
+    assert archive.archive_bills(365)["archived_bills"] == 3
+    new = create_bills(client, 1)
+
+    assert new[0]["id"] > max(bill["id"] for bill in old)
+    assert archive.max_archived_id() == max(bill["id"] for bill in old)
+
+def archived_bills() -> dict:
+    return {
+        bill.id: bill.status
+        for _, db in archive.iter_sessions()
+        for bill in db.query(models.Bill)
+    }
+
+def hot_bill_ids() -> list:
+    with database.SessionLocal() as db:
+        return sorted(row.id for row in db.query(models.Bill.id))
+
+def while_writing_partition(monkeypatch, action):
+    """Runs action() once, right after the first partition has been written."""
+    write = archive._write_partition
+    calls = []
+
+    def write_then_act(*args, **kwargs):
+        write(*args, **kwargs)
+        if not calls:
+            calls.append(1)
+            action()
+
+    monkeypatch.setattr(archive, "_write_partition", write_then_act)
+
+def test_bill_added_to_the_month_while_archiving_is_kept(client, archive_dir, monkeypatch):
+    old = create_bills(client, 2, date=datetime.datetime(2020, 1, 5))
+    late = []
+    while_writing_partition(monkeypatch, lambda: late.extend(create_bills(client, 1, date=datetime.datetime(2020, 1, 20))))
+
+    assert archive.archive_bills(365)["archived_bills"] == 2
+
+    assert sorted(archived_bills()) == [bill["id"] for bill in old]
+    # Neither archived nor lost: it waits for the next run
+    assert hot_bill_ids() == [late[0]["id"]]
+    assert archive.archive_bills(365)["archived_bills"] == 1
+    assert hot_bill_ids() == []
+
+def test_status_change_while_archiving_is_archived(client, archive_dir, monkeypatch):
+    # Paid to Unpaid, which queues no message
+    old = create_bills(client, 2, date=datetime.datetime(2020, 1, 5), status="Paid")
+    flipped = old[0]["id"]
+    while_writing_partition(monkeypatch, lambda: client.patch(f"/bills/{flipped}/status", json={"status": "Unpaid"}).raise_for_status())
+
+    assert archive.archive_bills(365)["archived_bills"] == 2
+
+    assert archived_bills() == {flipped: "Unpaid", old[1]["id"]: "Paid"}
+    assert hot_bill_ids() == []
+
+def test_archived_bill_opens_by_id(client, archive_dir):
+    old = create_bills(client, 2, items=3, date=datetime.datetime(2020, 1, 5))
+    expected = client.get(f"/bills/{old[0]['id']}").json()
+    archive.archive_bills(365)
+
+    listed = client.get("/bills/filter?year=2020").json()
+    assert sorted(bill["id"] for bill in listed) == sorted(bill["id"] for bill in old)
+    assert client.get(f"/bills/{old[0]['id']}").json() == expected
+    # Past every partition's id range, so no partition is searched
+    assert client.get(f"/bills/{old[-1]['id'] + 1000}").status_code == 404
+
+def test_partition_skips_rows_already_archived_and_rejects_id_clashes(archive_dir):
+    period = datetime.datetime(2020, 1, 1)
+    bill = {column.name: None for column in models.Bill.__table__.columns}
+    bill.update(id=7, customer_name="Asha Rao", date=datetime.datetime(2020, 1, 5))
+
+    archive._write_partition(period, [bill], [])
+    # As after a run interrupted between writing the partition and deleting the hot rows
+    archive._write_partition(period, [bill], [])
+    assert archived_count() == 1
+
+    with pytest.raises(IntegrityError):
+        archive._write_partition(period, [{**bill, "customer_name": "Someone Else"}], [])
+    assert archived_count() == 1
+
+def test_archive_runs_one_at_a_time(client, archive_dir):
+    create_bills(client, 2, date=datetime.datetime(2020, 1, 5))
+    assert leases.acquire(archive.ARCHIVE_LEASE, holder="another-run")
+
+    assert client.post("/bills/archive?older_than_days=365").status_code == 409
+    # A dry run only reads, so it goes ahead
+    response = client.post("/bills/archive?older_than_days=365&dry_run=true")
+    assert response.status_code == 200
+    assert response.json()["archived_bills"] == 2
+    assert archive.list_partitions() == []
+
+def test_migration_rebuilds_bills_with_autoincrement(tmp_path, archive_dir):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    # The schema of an older billing.db, where bills has no AUTOINCREMENT
+    metadata = MetaData()
+    for table in database.Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    metadata.tables["bills"].dialect_options["sqlite"]["autoincrement"] = False
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(metadata.tables["bills"].insert(), [
+            {"customer_name": f"Customer {i}", "customer_phone": "9876543210", "date": datetime.datetime(2025, 1, i + 1)}
+            for i in range(3)
+        ])
+
+    try:
+        migrations.upgrade(engine)
+
+        with engine.begin() as conn:
+            assert "AUTOINCREMENT" in conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'bills'")).scalar()
+            assert [row[0] for row in conn.execute(text("SELECT id FROM bills ORDER BY id"))] == [1, 2, 3]
+            conn.execute(text("DELETE FROM bills WHERE id = 3"))
+            conn.execute(text("INSERT INTO bills (customer_name, customer_phone) VALUES ('Zubin Mehta', '9000000000')"))
+            assert conn.execute(text("SELECT max(id) FROM bills")).scalar() == 4
+            # The search index triggers were recreated with the table
+            assert conn.execute(text("SELECT rowid FROM bills_fts WHERE bills_fts MATCH 'zubin'")).scalar() == 4
+
+        assert {index["name"] for index in inspect(engine).get_indexes("bills")} >= {"ix_bills_date_id", "ix_bills_customer_name"}
+    finally:
+        engine.dispose()
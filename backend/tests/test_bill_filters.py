@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import text
+
+import database
+from conftest import create_bills
+from routers.bills import apply_bill_filters
+from utils import bill_rows
+
+def query_plan(query) -> str:
+    sql = query.compile(database.engine, compile_kwargs={"literal_binds": True})
+    with database.engine.connect() as conn:
+        return " | ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+@pytest.mark.parametrize("filters", [
+    {"year": 2025},
+    {"year": 2025, "month": "March"},
+    {"year": 2025, "month": "3"},
+    {"start_date": "2025-03-01", "end_date": "2025-03-31"},
+    {"start_date": "2025-03-01"},
+    {"end_date": "2025-03-31T18:00:00"},
+])
+def test_date_filters_search_the_date_index(app, filters):
+    plan = query_plan(apply_bill_filters(bill_rows.bills_select(), **filters))
+    assert "SEARCH bills USING INDEX ix_bills_date_id (date" in plan, plan
+
+def test_customer_name_filter_does_not_match_phones(client):
+    create_bills(client, 3, name="Asha Rao", phone="9876543210")
+    create_bills(client, 2, name="Meena Iyer", phone="9123456780")
+
+    def names(**params):
+        response = client.get("/bills/filter", params=params)
+        assert response.status_code == 200, response.text
+        return sorted(bill["customer_name"] for bill in response.json())
+
+    assert names(customer_name="98765") == []
+    assert names(customer_name="sha R") == ["Asha Rao"] * 3
+    assert names(customer_name="Iyer", year=2025) == ["Meena Iyer"] * 2
+
+def test_search_matches_name_or_phone(client):
+    create_bills(client, 2, name="Asha Rao", phone="9876543210")
+
+    assert len(client.get("/bills/search", params={"q": "98765"}).json()) == 2
+    assert len(client.get("/bills/search", params={"q": "Asha"}).json()) == 2
+
+@pytest.mark.parametrize("path", ["/bills/filter", "/bills/export", "/bills/stats", "/bills/statement"])
+@pytest.mark.parametrize("params", [{"year": -5}, {"year": 9999, "month": "December"}])
+def test_out_of_range_years_are_rejected(client, path, params):
+    response = client.get(path, params=params)
+    assert response.status_code == 422, response.text
+
+def test_last_accepted_year_filters_to_nothing(client):
+    create_bills(client, 1)
+    response = client.get("/bills/filter", params={"year": 9998, "month": "December"})
+    assert response.status_code == 200, response.text
+    assert response.json() == []
@@ -0,0 +1,37 @@
+from sqlalchemy import text
+
+import database
+from conftest import create_bills
+from utils import bill_rows
+
+def page_statements(client, statements, url: str) -> list:
+    statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    # Only reads of bills, so a background worker polling the outbox or its lease is not counted
+    return [statement for statement in statements if statement.lstrip().upper().startswith("SELECT") and "FROM bill" in statement]
+
+def test_bill_pages_load_items_in_one_query(client, statements):
+    create_bills(client, 30, items=3)
+
+    small = page_statements(client, statements, "/bills/?limit=5")
+    large = page_statements(client, statements, "/bills/?limit=30")
+    # One query for the bills and one for all their items, whatever the page size
+    assert len(small) == len(large) == 2
+
+    bills = client.get("/bills/?limit=30").json()
+    assert len(bills) == 30
+    assert all(len(bill["items"]) == 3 for bill in bills)
+
+def test_filter_and_single_bill_load_items_in_one_query(client, statements):
+    bills = create_bills(client, 12, items=4)
+
+    assert len(page_statements(client, statements, "/bills/filter?year=2025")) == 2
+    assert len(page_statements(client, statements, f"/bills/{bills[0]['id']}")) == 2
+
+def test_item_load_uses_bill_id_index(client):
+    query = bill_rows.items_select([1, 2, 3]).compile(database.engine, compile_kwargs={"literal_binds": True})
+    with database.engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+    assert "USING INDEX ix_bill_items_bill_id" in plan
+    assert "SCAN bill_items" not in plan
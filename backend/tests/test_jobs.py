@@ -0,0 +1,48 @@
+import datetime
+import time
+
+from conftest import create_bills
+from utils import jobs, render_pool, retention
+
+def wait_for(get, timeout: float = 5.0) -> dict:
+    """Polls get() until it returns a finished job."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get()
+        if (job and job["finished_at"]) or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+def test_cleanup_job_can_be_polled_from_another_process(client):
+    create_bills(client, 3, date=datetime.datetime(2020, 1, 1))
+
+    response = client.delete("/bills/cleanup?retention_days=365&background=true")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    # A service of its own, as in another worker process, knows the job from the table
+    job = wait_for(lambda: retention.CleanupService().get_job(job_id))
+    assert job["status"] == "done"
+    assert job["deleted_bills"] == 3
+    assert client.get(f"/bills/cleanup/{job_id}").json() == job
+
+def test_render_job_can_be_polled_from_another_process(client):
+    job = render_pool.render_service.submit_many(iter([]))
+
+    other = render_pool.RenderService()
+    state = wait_for(lambda: other.get_job(job.id))
+    assert state["status"] == "done"
+    assert state["job_id"] == job.id
+    assert client.get("/bills/render/unknown").status_code == 404
+
+def test_finished_jobs_are_pruned(client):
+    long_ago = datetime.datetime.now() - datetime.timedelta(days=jobs.JOB_HISTORY_DAYS + 1)
+    jobs.save("cleanup", {"job_id": "c-old", "status": "done", "finished_at": long_ago.isoformat()})
+    jobs.save("cleanup", {"job_id": "c-running", "status": "running", "finished_at": None})
+    jobs.save("cleanup", {"job_id": "c-new", "status": "done", "finished_at": datetime.datetime.now().isoformat()})
+
+    assert jobs.load("cleanup", "c-old") is None
+    assert jobs.load("cleanup", "c-running")["status"] == "running"
+    assert jobs.load("cleanup", "c-new")["status"] == "done"
+    # Ids are looked up per kind
+    assert jobs.load("render", "c-new") is None
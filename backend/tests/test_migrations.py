@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy.orm import Session
+
+import database
+import migrations
+import models
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'billing.db'}")
+    yield engine
+    engine.dispose()
+
+def test_check_requires_pending_migrations(engine):
+    migrations.upgrade(engine, target=migrations.LATEST_VERSION - 1)
+    with pytest.raises(migrations.SchemaOutOfDate, match="pending migrations"):
+        migrations.check(engine)
+
+    migrations.upgrade(engine)
+    migrations.check(engine)
+
+def test_check_rejects_a_schema_from_newer_code(engine):
+    migrations.upgrade(engine)
+    with Session(engine) as db:
+        db.add(models.SchemaMigration(version=migrations.LATEST_VERSION + 1, name="from_the_future"))
+        db.commit()
+
+    with pytest.raises(migrations.SchemaOutOfDate, match="newer than this code"):
+        migrations.check(engine)
@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+
+import database
+import models
+from conftest import create_bills
+from utils import leases, messaging
+from utils.render_pool import render_service
+
+def add_message(bill_id: int, **values) -> int:
+    with database.SessionLocal() as db:
+        message = models.OutboundMessage(bill_id=bill_id, phone="9876543210", message="Invoice", **values)
+        db.add(message)
+        db.commit()
+        return message.id
+
+def message_row(message_id: int):
+    with database.SessionLocal() as db:
+        return db.get(models.OutboundMessage, message_id)
+
+def take_lease_elsewhere():
+    """Hands the outbox lease to another process, as after this one stalled past LEASE_TTL."""
+    with database.SessionLocal() as db:
+        db.query(models.Lease).filter(models.Lease.name == messaging.OUTBOX_LEASE).update({
+            "holder": "other-host:1",
+            "expires_at": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+        })
+        db.commit()
+
+@pytest.fixture
+def worker(client):
+    transport = messaging.FakeTransport()
+    worker = messaging.OutboxWorker(transport=transport)
+    assert worker._lead()
+    return worker
+
+def render_then(monkeypatch, action):
+    """Stands in for invoice rendering (no render process pool) and runs action() during it."""
+    def render(data, timeout=None):
+        action()
+        return None
+
+    monkeypatch.setattr(render_service, "render", render)
+
+def test_message_is_sent_and_its_claim_cleared(client, worker, monkeypatch):
+    (bill,) = create_bills(client, 1)
+    message_id = add_message(bill["id"])
+    render_then(monkeypatch, lambda: None)
+
+    assert worker.process_next() is True
+
+    row = message_row(message_id)
+    assert (row.status, row.claimed_by, row.claimed_at) == ("sent", None, None)
+    assert len(worker.transport.sent) == 1
+
+def test_sender_that_lost_the_lease_does_not_send(client, worker, monkeypatch):
+    (bill,) = create_bills(client, 1)
+    message_id = add_message(bill["id"])
+    render_then(monkeypatch, take_lease_elsewhere)
+
+    assert worker.process_next() is False
+
+    assert worker.transport.sent == []
+    # Handed back for the new leader
+    row = message_row(message_id)
+    assert (row.status, row.claimed_by) == ("pending", None)
+
+def test_sender_whose_row_was_taken_over_does_not_send(client, worker, monkeypatch):
+    (bill,) = create_bills(client, 1)
+    message_id = add_message(bill["id"])
+
+    def claim_elsewhere():
+        with database.SessionLocal() as db:
+            db.query(models.OutboundMessage).update({"claimed_by": "other-host:1"})
+            db.commit()
+
+    render_then(monkeypatch, claim_elsewhere)
+
+    assert worker.process_next() is False
+    assert worker.transport.sent == []
+    row = message_row(message_id)
+    assert (row.status, row.claimed_by) == ("sending", "other-host:1")
+
+def test_leader_retries_only_abandoned_sends(client, worker):
+    bills = create_bills(client, 3)
+    now = datetime.datetime.utcnow()
+    live = add_message(bills[0]["id"], status="sending", claimed_by="other-host:1", claimed_at=now)
+    abandoned = add_message(
+        bills[1]["id"], status="sending", claimed_by="other-host:1",
+        claimed_at=now - datetime.timedelta(seconds=leases.LEASE_TTL + 10)
+    )
+    # Claimed before claims were recorded
+    unknown = add_message(bills[2]["id"], status="sending")
+
+    assert worker._lead()
+
+    assert message_row(live).status == "sending"
+    assert message_row(abandoned).status == "pending"
+    assert message_row(unknown).status == "pending"
@@ -0,0 +1,36 @@
+import datetime
+
+from conftest import bill_payload
+
+def create_dated_bills(client, count: int) -> list:
+    """`count` bills a day apart; returns their ids newest first."""
+    start = datetime.datetime(2025, 1, 1, 10)
+    payload = [bill_payload(date=start + datetime.timedelta(days=i)) for i in range(count)]
+    response = client.post("/bills/batch", json=payload)
+    assert response.status_code == 200, response.text
+    return [bill["id"] for bill in reversed(response.json())]
+
+def test_cursor_walks_every_bill_once(client):
+    ids = create_dated_bills(client, 25)
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/bills/", params={"limit": 10, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        seen += [bill["id"] for bill in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ids
+
+def test_skip_offsets_the_ordered_page(client):
+    ids = create_dated_bills(client, 25)
+
+    response = client.get("/bills/", params={"skip": 10, "limit": 5})
+    assert response.status_code == 200, response.text
+    assert [bill["id"] for bill in response.json()] == ids[10:15]
+    assert "X-Next-Cursor" in response.headers
+
+    last = client.get("/bills/", params={"skip": 20, "limit": 10})
+    assert [bill["id"] for bill in last.json()] == ids[20:]
+    assert "X-Next-Cursor" not in last.headers
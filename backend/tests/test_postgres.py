@@ -0,0 +1,157 @@
+import asyncio
+import datetime
+import os
+import shutil
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+import database
+import migrations
+import models
+import schemas
+from conftest import bill_payload
+from routers import bills_async
+from routers.bills import apply_bill_filters, insert_bills, keyset_page, encode_cursor
+from utils import archive, bill_rows, jobs, leases, rollups
+
+# Runs against a real PostgreSQL server when TEST_DATABASE_URL points at one,
+# e.g. a local instance or a throwaway container:
+#
+#     TEST_DATABASE_URL=postgresql://postgres@localhost/postgres python -m pytest tests/test_postgres.py
+#
+# Everything happens in a schema of its own, dropped at the end. Without
+# TEST_DATABASE_URL the tests that need the server are skipped.
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+TABLES = ("outbox", "bill_items", "bills", "items", "sales_rollup", "item_sales_rollup", "leases", "jobs")
+
+@pytest.fixture(scope="module")
+def pg_schema():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    url = database.normalize_database_url(TEST_DATABASE_URL)
+    schema = f"billing_test_{uuid.uuid4().hex[:8]}"
+    admin = database.create_db_engine(url, pool_size=1, max_overflow=0)
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    yield url, schema
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    admin.dispose()
+
+@pytest.fixture(scope="module")
+def pg_engine(pg_schema):
+    url, schema = pg_schema
+    engine = database.create_db_engine(
+        url, pool_size=2, max_overflow=1, connect_args={"options": f"-csearch_path={schema}"}
+    )
+    migrations.upgrade(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def pg_session(pg_engine):
+    factory = sessionmaker(bind=pg_engine, autoflush=False)
+    yield factory
+    with pg_engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"))
+
+def add_bills(factory, count: int, **kwargs) -> list:
+    start = datetime.datetime(2025, 1, 1, 10)
+    bills = [
+        schemas.BillCreate(**bill_payload(date=start + datetime.timedelta(days=i), **kwargs))
+        for i in range(count)
+    ]
+    with factory() as db:
+        created = insert_bills(db, bills)
+        db.commit()
+    return created
+
+def test_url_normalization():
+    assert database.normalize_database_url("postgres://u:p@db/billing") == "postgresql+psycopg://u:p@db/billing"
+    assert database.async_database_url("postgresql+psycopg://u:p@db/billing") == "postgresql+asyncpg://u:p@db/billing"
+
+def test_engine_pool_settings(pg_engine):
+    assert pg_engine.dialect.name == "postgresql"
+    assert pg_engine.dialect.driver == "psycopg"
+    assert pg_engine.pool.size() == 2
+    assert pg_engine.pool._max_overflow == 1
+    assert pg_engine.pool._pre_ping
+
+def test_migrations_apply_cleanly(pg_engine):
+    assert migrations.pending(pg_engine) == []
+    # Nothing left to do on a second run
+    assert migrations.upgrade(pg_engine) == []
+
+def test_insert_and_page_bills(pg_session):
+    created = add_bills(pg_session, 25, items=2)
+    assert [len(bill.items) for bill in created] == [2] * 25
+
+    with pg_session() as db:
+        seen, cursor = [], None
+        while True:
+            page = bill_rows.fetch(db, keyset_page(bill_rows.bills_select(), 10, cursor))
+            seen += [bill["id"] for bill in page[:10]]
+            if len(page) <= 10:
+                break
+            cursor = encode_cursor(page[9])
+        assert seen == [bill.id for bill in reversed(created)]
+
+        query = apply_bill_filters(
+            bill_rows.bills_select(), year=2025, month="January", customer_name="asha", use_search_index=False
+        )
+        assert len(bill_rows.fetch(db, query)) == 25
+
+        summary = rollups.summarize(db, datetime.date(2025, 1, 1), datetime.date(2025, 1, 31))
+        assert summary["bill_count"] == 25
+
+def test_async_reads_match_sync(pg_schema, pg_engine, pg_session):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    url, schema = pg_schema
+    add_bills(pg_session, 8, items=3)
+    with pg_session() as db:
+        expected = bill_rows.fetch(db, keyset_page(bill_rows.bills_select(), 5))
+
+    async def read():
+        engine = database.create_db_engine(
+            database.async_database_url(url), asynchronous=True, pool_size=2, max_overflow=0,
+            connect_args={"server_settings": {"search_path": schema}}
+        )
+        try:
+            async with AsyncSession(engine) as db:
+                return await bills_async.fetch_bills(db, keyset_page(bill_rows.bills_select(), 5))
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(read()) == expected
+
+def test_lease_has_one_holder(pg_session):
+    assert leases.acquire("test", holder="a", session_factory=pg_session)
+    assert not leases.acquire("test", holder="b", session_factory=pg_session)
+    # The holder renews it
+    assert leases.acquire("test", holder="a", session_factory=pg_session)
+    leases.release("test", holder="a", session_factory=pg_session)
+    assert leases.acquire("test", holder="b", session_factory=pg_session)
+
+def test_job_status_upsert(pg_session):
+    jobs.save("render", {"job_id": "r1", "status": "running", "finished_at": None}, pg_session)
+    finished = datetime.datetime.now().isoformat()
+    jobs.save("render", {"job_id": "r1", "status": "done", "finished_at": finished}, pg_session)
+    assert jobs.load("render", "r1", pg_session) == {"job_id": "r1", "status": "done", "finished_at": finished}
+
+def test_archive_moves_bills_out(pg_session):
+    created = add_bills(pg_session, 3, items=2)
+    try:
+        # add_bills dates them from January 2025
+        summary = archive.archive_bills(365, session_factory=pg_session)
+        assert (summary["archived_bills"], summary["archived_items"]) == (3, 6)
+        assert archive.max_archived_id() == max(bill.id for bill in created)
+        with pg_session() as db:
+            assert db.query(models.Bill).count() == 0
+    finally:
+        shutil.rmtree(archive.ARCHIVE_DIR, ignore_errors=True)
@@ -0,0 +1,66 @@
+import datetime
+import os
+
+import database
+import models
+from conftest import create_bills
+from utils import messaging, retention
+
+def add_message(bill_id: int, status: str):
+    with database.SessionLocal() as db:
+        db.add(models.OutboundMessage(bill_id=bill_id, phone="9876543210", message="Invoice", status=status))
+        db.commit()
+
+def remaining_bill_ids() -> list:
+    with database.SessionLocal() as db:
+        return sorted(row.id for row in db.query(models.Bill.id))
+
+def test_cleanup_deletes_old_bills_their_rows_and_files(client):
+    old = create_bills(client, 5, date=datetime.datetime(2020, 1, 1))
+    new = create_bills(client, 2, date=datetime.datetime.now())
+    add_message(old[0]["id"], "sent")
+    os.makedirs(retention.INVOICES_DIR, exist_ok=True)
+    for name in (f"invoice_{old[1]['id']}.png", f"invoice_{old[1]['id']}_thumb.webp", f"invoice_{new[0]['id']}.png"):
+        open(os.path.join(retention.INVOICES_DIR, name), "wb").close()
+
+    job = retention.run_cleanup(retention.CleanupJob("t1", retention.cutoff_for(365)), chunk_size=2)
+
+    assert job.status == "done", job.error
+    assert (job.deleted_bills, job.deleted_items, job.deleted_images, job.chunks) == (5, 10, 2, 3)
+    assert remaining_bill_ids() == sorted(bill["id"] for bill in new)
+    assert sorted(os.listdir(retention.INVOICES_DIR)) == [f"invoice_{new[0]['id']}.png"]
+    with database.SessionLocal() as db:
+        assert db.query(models.OutboundMessage).count() == 0
+
+def test_cleanup_skips_bills_whose_message_is_being_sent(client):
+    old = create_bills(client, 3, date=datetime.datetime(2020, 1, 1))
+    add_message(old[1]["id"], "sending")
+
+    job = retention.run_cleanup(retention.CleanupJob("t2", retention.cutoff_for(365)))
+
+    assert job.status == "done", job.error
+    assert job.deleted_bills == 2
+    assert remaining_bill_ids() == [old[1]["id"]]
+    with database.SessionLocal() as db:
+        assert db.query(models.OutboundMessage.status).scalar() == "sending"
+
+def test_outbox_worker_survives_its_message_being_deleted(client, monkeypatch):
+    from utils.render_pool import render_service
+
+    (bill,) = create_bills(client, 1)
+    add_message(bill["id"], "pending")
+
+    class DeletingTransport:
+        """Sends by deleting the message row, as an archive run during the send would."""
+        def send(self, phone, message, image_path):
+            with database.SessionLocal() as db:
+                db.query(models.OutboundMessage).delete()
+                db.commit()
+
+    # No invoice rendering (and no render process pool) for this test
+    monkeypatch.setattr(render_service, "render", lambda data, timeout=None: None)
+    worker = messaging.OutboxWorker(transport=DeletingTransport())
+
+    assert worker.process_next() is True
+    with database.SessionLocal() as db:
+        assert db.query(models.OutboundMessage).count() == 0
@@ -0,0 +1,126 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+import database
+from utils import retention
+
+ITEM_NAMES = ("Silk Saree", "Cotton Kurta", "Dupatta", "Lehenga")
+PAYMENT_MODES = (None, "Cash", "UPI")
+
+# (query params, first day, last day): whole months, partial months at either edge, single days, open ends
+RANGES = [
+    ({}, None, None),
+    ({"year": 2025}, datetime.date(2025, 1, 1), datetime.date(2025, 12, 31)),
+    ({"year": 2025, "month": "February"}, datetime.date(2025, 2, 1), datetime.date(2025, 2, 28)),
+    ({"start_date": "2025-01-15", "end_date": "2025-03-10"}, datetime.date(2025, 1, 15), datetime.date(2025, 3, 10)),
+    ({"start_date": "2025-02-03", "end_date": "2025-02-20"}, datetime.date(2025, 2, 3), datetime.date(2025, 2, 20)),
+    ({"start_date": "2025-03-27", "end_date": "2025-04-01"}, datetime.date(2025, 3, 27), datetime.date(2025, 4, 1)),
+    ({"start_date": "2025-02-07", "end_date": "2025-02-07"}, datetime.date(2025, 2, 7), datetime.date(2025, 2, 7)),
+    ({"start_date": "2025-02-08"}, datetime.date(2025, 2, 8), None),
+    ({"end_date": "2025-02-07"}, None, datetime.date(2025, 2, 7)),
+]
+
+def varied_bill(i: int) -> dict:
+    """
+    Bill i of a spread over January to April 2025, two a day every 5.3 days
+    (e.g. 2025-02-07 at 11:24 and 17:24), with mixed statuses, payment
+    modes, discounts and items.
+    """
+    items = [
+        {
+            "item_name": ITEM_NAMES[(i + j) % len(ITEM_NAMES)],
+            "price": 500.0 + 50 * i,
+            "quantity": 1 + (i + j) % 2,
+            "discount": 0.0,
+            "item_total": (500.0 + 50 * i) * (1 + (i + j) % 2),
+        }
+        for j in range(1 + i % 3)
+    ]
+    discount = 10.0 * (i % 3)
+    return {
+        "customer_name": f"Customer {i}",
+        # No phone, so marking a bill Paid queues no message
+        "customer_phone": None,
+        "date": (datetime.datetime(2025, 1, 1, 9) + datetime.timedelta(days=(i // 2) * 5.3, hours=(i % 2) * 6)).isoformat(),
+        "total_amount": sum(item["item_total"] for item in items) - discount,
+        "discount": discount,
+        "status": "Paid" if i % 2 else "Unpaid",
+        "payment_mode": PAYMENT_MODES[i % 3],
+        "items": items,
+    }
+
+def expected_stats(start: datetime.date, end: datetime.date, top: int = 5) -> dict:
+    """What /bills/stats should answer, computed with plain SQL over bills and bill_items."""
+    params = {"start": (start or datetime.date.min).isoformat(), "end": (end or datetime.date.max).isoformat(), "top": top}
+    in_range = "date(bills.date) BETWEEN :start AND :end"
+    with database.engine.connect() as conn:
+        groups = conn.execute(text(
+            f"SELECT status, payment_mode, count(*), sum(total_amount), sum(discount) FROM bills "
+            f"WHERE {in_range} GROUP BY status, payment_mode"
+        ), params).all()
+        top_items = conn.execute(text(
+            f"SELECT item_name, sum(quantity), sum(item_total) FROM bill_items JOIN bills ON bills.id = bill_items.bill_id "
+            f"WHERE {in_range} GROUP BY item_name ORDER BY sum(item_total) DESC, item_name LIMIT :top"
+        ), params).all()
+
+    bill_count = sum(row[2] for row in groups)
+    revenue = sum(row[3] for row in groups)
+    by_status, by_payment_mode = {}, {}
+    for status, payment_mode, count, total, _ in groups:
+        for breakdown, key in ((by_status, status or ""), (by_payment_mode, payment_mode or "Unspecified")):
+            group = breakdown.setdefault(key, {"bill_count": 0, "revenue": 0.0})
+            group["bill_count"] += count
+            group["revenue"] = round(group["revenue"] + total, 2)
+    return {
+        "start_date": start.isoformat() if start else None,
+        "end_date": end.isoformat() if end else None,
+        "revenue": round(revenue, 2),
+        "bill_count": bill_count,
+        "average_ticket": round(revenue / bill_count, 2) if bill_count else 0.0,
+        "discount": round(sum(row[4] for row in groups), 2),
+        "by_status": by_status,
+        "by_payment_mode": by_payment_mode,
+        "top_items": [{"item_name": name, "quantity": quantity, "revenue": round(total, 2)} for name, quantity, total in top_items],
+    }
+
+def assert_stats_match(client):
+    for params, start, end in RANGES:
+        response = client.get("/bills/stats", params=params)
+        assert response.status_code == 200, response.text
+        assert response.json() == expected_stats(start, end), params
+
+@pytest.fixture
+def bills(client):
+    """Bills created through both write paths: one at a time and in a batch."""
+    created = []
+    for i in range(20):
+        response = client.post("/bills/", json=varied_bill(i))
+        assert response.status_code == 200, response.text
+        created.append(response.json())
+    response = client.post("/bills/batch", json=[varied_bill(i) for i in range(20, 45)])
+    assert response.status_code == 200, response.text
+    return created + response.json()
+
+def test_stats_match_the_bills(client, bills):
+    assert expected_stats(None, None)["bill_count"] == 45
+    assert_stats_match(client)
+
+def test_stats_follow_status_changes(client, bills):
+    for bill in bills[::4]:
+        flipped = "Unpaid" if bill["status"] == "Paid" else "Paid"
+        response = client.patch(f"/bills/{bill['id']}/status", json={"status": flipped, "payment_mode": "Card"})
+        assert response.status_code == 200, response.text
+
+    assert_stats_match(client)
+
+def test_stats_follow_cleanup(client, bills):
+    # Between the two bills of 2025-02-07, so that day's rollup loses only one of them
+    job = retention.CleanupJob("rollups", datetime.datetime(2025, 2, 7, 14))
+    job = retention.run_cleanup(job, chunk_size=4)
+    assert job.status == "done", job.error
+    assert job.deleted_bills == 15
+    assert expected_stats(datetime.date(2025, 2, 7), datetime.date(2025, 2, 7))["bill_count"] == 1
+
+    assert_stats_match(client)
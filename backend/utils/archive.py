@@ -0,0 +1,346 @@
+from sqlalchemy import create_engine, delete, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+import argparse
+import datetime
+import gzip
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+
+import database
+import models
+from utils import leases
+from utils.response_cache import response_cache
+
+# Archive tier. Bills older than a cutoff move out of the hot database into
+# one gzip-compressed SQLite file per month (archive/bills_YYYY_MM.sqlite.gz)
+# with the same bills / bill_items schema and ids. Readers decompress a
+# partition once into ARCHIVE_CACHE_DIR and query it read-only with the same
+# ORM models, so filters, statements and exports can include archived bills.
+# The sales rollups keep archived bills, so /bills/stats still covers them.
+# A lease keeps it to one archive run at a time across all worker processes.
+
+ARCHIVE_DIR = os.environ.get(
+    "ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive")
+)
+ARCHIVE_CACHE_DIR = os.environ.get("ARCHIVE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "billing_archive_cache"))
+
+ARCHIVE_TABLES = [models.Bill.__table__, models.BillItem.__table__]
+
+ARCHIVE_LEASE = "archive"
+
+# Times a month is written again when its bills change while the partition is being written
+ARCHIVE_ATTEMPTS = 3
+
+# Ids per IN list, well under SQLite's variable limit
+ID_CHUNK_SIZE = 500
+
+class ArchiveInProgress(Exception):
+    pass
+
+PARTITION_RE = re.compile(r"^bills_(\d{4})_(\d{2})\.sqlite\.gz$")
+
+def partition_name(period: datetime.date) -> str:
+    return f"bills_{period.year:04d}_{period.month:02d}.sqlite.gz"
+
+def month_start(value) -> datetime.datetime:
+    return datetime.datetime(value.year, value.month, 1)
+
+def next_month(value) -> datetime.datetime:
+    return datetime.datetime(value.year + 1, 1, 1) if value.month == 12 else datetime.datetime(value.year, value.month + 1, 1)
+
+def list_partitions() -> list:
+    """[(month start, path)] of every archive partition, oldest first."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    partitions = []
+    for name in os.listdir(ARCHIVE_DIR):
+        match = PARTITION_RE.match(name)
+        if match:
+            period = datetime.datetime(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append((period, os.path.join(ARCHIVE_DIR, name)))
+    return sorted(partitions)
+
+def partitions_for(start: datetime.datetime = None, end: datetime.datetime = None) -> list:
+    """Partitions whose month overlaps [start, end), newest first. Open bounds match everything."""
+    return [
+        (period, path) for period, path in reversed(list_partitions())
+        if (start is None or next_month(period) > start) and (end is None or period < end)
+    ]
+
+# --- READING ---
+
+_lock = threading.Lock()
+_readers = {} # path -> (file stamp, engine, sessionmaker)
+_id_ranges = {} # path -> (file stamp, lowest bill id, highest bill id)
+
+def _reader(path: str):
+    """Sessionmaker over the decompressed copy of `path`, refreshed when the partition is rewritten."""
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _readers.get(path)
+        if cached and cached[0] == stamp:
+            return cached[2]
+
+        os.makedirs(ARCHIVE_CACHE_DIR, exist_ok=True)
+        base = os.path.basename(path)[:-len(".gz")]
+        plain = os.path.join(ARCHIVE_CACHE_DIR, f"{base}.{stat.st_mtime_ns}")
+        if not os.path.exists(plain):
+            with gzip.open(path, "rb") as src, open(plain + ".tmp", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(plain + ".tmp", plain)
+
+        engine = create_engine(
+            f"sqlite:///file:{plain}?mode=ro&uri=true",
+            connect_args={"check_same_thread": False},
+            poolclass=NullPool
+        )
+        if cached:
+            cached[1].dispose()
+            _remove_stale_copies(base, keep=plain)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        _readers[path] = (stamp, engine, Session)
+        return Session
+
+def _remove_stale_copies(base: str, keep: str):
+    for name in os.listdir(ARCHIVE_CACHE_DIR):
+        path = os.path.join(ARCHIVE_CACHE_DIR, name)
+        if name.startswith(base + ".") and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def iter_sessions(start: datetime.datetime = None, end: datetime.datetime = None):
+    """
+    Yields a read-only session per partition overlapping [start, end), newest
+    first. Each session is closed when the caller moves on to the next one;
+    objects already loaded from it stay readable.
+    """
+    for period, path in partitions_for(start, end):
+        try:
+            db = _reader(path)()
+        except (OSError, EOFError) as e:
+            print(f"Archive Read Error ({os.path.basename(path)}): {e}")
+            continue
+        try:
+            yield period, db
+        finally:
+            db.close()
+
+def _id_range(path: str) -> tuple:
+    """(lowest, highest) bill id in partition `path`, (0, 0) when it has none."""
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _id_ranges.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1:]
+    with _reader(path)() as db:
+        low, high = db.query(func.min(models.Bill.id), func.max(models.Bill.id)).one()
+    _id_ranges[path] = (stamp, low or 0, high or 0)
+    return low or 0, high or 0
+
+def max_archived_id() -> int:
+    """Highest bill id in any partition (0 when nothing is archived)."""
+    return max((_id_range(path)[1] for _, path in list_partitions()), default=0)
+
+def sessions_for_id(bill_id: int):
+    """
+    Like iter_sessions, over only the partitions whose id range covers
+    `bill_id`. Ranges are cached per partition file, so an id outside all
+    of them costs a directory listing.
+    """
+    for period, path in reversed(list_partitions()):
+        try:
+            low, high = _id_range(path)
+            if not low <= bill_id <= high:
+                continue
+            db = _reader(path)()
+        except (OSError, EOFError) as e:
+            print(f"Archive Read Error ({os.path.basename(path)}): {e}")
+            continue
+        try:
+            yield period, db
+        finally:
+            db.close()
+
+# --- WRITING ---
+
+def _chunks(ids: list):
+    for i in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[i:i + ID_CHUNK_SIZE]
+
+def _write_partition(period: datetime.datetime, bills: list, items: list, replace: set = frozenset()):
+    """
+    Adds rows to the month's partition file. Rows already there unchanged (left
+    by an interrupted run) are skipped, and bills in `replace` (written earlier
+    by the same run) are overwritten; any other id clash fails the insert.
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, partition_name(period))
+    work = tempfile.NamedTemporaryFile(dir=ARCHIVE_DIR, suffix=".sqlite", delete=False)
+    work.close()
+    try:
+        if os.path.exists(path):
+            with gzip.open(path, "rb") as src, open(work.name, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+        engine = create_engine(f"sqlite:///{work.name}", poolclass=NullPool)
+        try:
+            database.Base.metadata.create_all(bind=engine, tables=ARCHIVE_TABLES)
+            with engine.begin() as conn:
+                bill_table = models.Bill.__table__
+                for chunk in _chunks([bill["id"] for bill in bills if bill["id"] in replace]):
+                    conn.execute(delete(bill_table).where(bill_table.c.id.in_(chunk)))
+                for table, rows in zip(ARCHIVE_TABLES, (bills, items)):
+                    rows = _new_rows(conn, table, rows)
+                    if rows:
+                        conn.execute(insert(table), rows)
+            with engine.connect() as conn:
+                conn.exec_driver_sql("VACUUM")
+        finally:
+            engine.dispose()
+
+        with open(work.name, "rb") as src, gzip.open(path + ".tmp", "wb", compresslevel=9) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(path + ".tmp", path)
+    finally:
+        os.remove(work.name)
+
+def _new_rows(conn, table, rows: list) -> list:
+    """`rows` without those already in the partition exactly as given."""
+    if not rows:
+        return rows
+    ids = [row["id"] for row in rows]
+    # An id range rather than IN, which would run into SQLite's variable limit on a large month
+    existing = {
+        row["id"]: dict(row)
+        for row in conn.execute(select(table).where(table.c.id.between(min(ids), max(ids)))).mappings()
+    }
+    return [row for row in rows if existing.get(row["id"]) != row]
+
+def _locked_bills(db, ids: list) -> dict:
+    """
+    Current rows of bills `ids` by id, which cannot change until the
+    transaction ends: SQLite takes the database write lock, PostgreSQL locks the rows.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(text("BEGIN IMMEDIATE"))
+    bill_table = models.Bill.__table__
+    return {
+        row["id"]: dict(row)
+        for chunk in _chunks(ids)
+        for row in db.execute(select(bill_table).where(bill_table.c.id.in_(chunk)).with_for_update()).mappings()
+    }
+
+def _archive_month(db, period: datetime.datetime, in_month: tuple, dry_run: bool) -> tuple:
+    """
+    Archives the bills of one month, returning (bills, items) counts. The
+    partition is written without holding any lock; then, in a short write
+    transaction, exactly the bills written are deleted, provided they are
+    unchanged. Bills added to the month meanwhile stay for the next run; a
+    bill changed meanwhile (its status) has the month written again.
+    """
+    Bill, BillItem = models.Bill, models.BillItem
+    bill_table, item_table = Bill.__table__, BillItem.__table__
+    written = set()
+    for _ in range(ARCHIVE_ATTEMPTS):
+        bills = [dict(row) for row in db.execute(select(bill_table).where(*in_month)).mappings()]
+        ids = [bill["id"] for bill in bills]
+        items = [
+            dict(row)
+            for chunk in _chunks(ids)
+            for row in db.execute(select(item_table).where(item_table.c.bill_id.in_(chunk))).mappings()
+        ]
+        if not bills or dry_run:
+            return len(bills), len(items)
+
+        _write_partition(period, bills, items, replace=written)
+        written.update(ids)
+
+        current = _locked_bills(db, ids)
+        if any(current[bill["id"]] != bill for bill in bills if bill["id"] in current):
+            db.rollback()
+            continue
+        for chunk in _chunks(ids):
+            db.query(BillItem).filter(BillItem.bill_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(models.OutboundMessage).filter(models.OutboundMessage.bill_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(Bill).filter(Bill.id.in_(chunk)).delete(synchronize_session=False)
+        db.commit()
+        return len(bills), len(items)
+    raise RuntimeError(f"Bills of {period.strftime('%Y-%m')} kept changing while they were being archived")
+
+def archive_bills(older_than_days: int, dry_run: bool = False, session_factory=None) -> dict:
+    """
+    Moves every bill dated before now - older_than_days (and its items) into
+    the monthly partitions, one month at a time: the partition is written
+    first, then the bills written are deleted from the hot database. Re-running
+    after an interruption is safe, the rows already archived are skipped.
+    Raises ArchiveInProgress when another run holds the archive lease.
+    """
+    session_factory = session_factory or database.SessionLocal
+    Bill = models.Bill
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=older_than_days)
+
+    holder = None
+    if not dry_run:
+        holder = f"{leases.process_id()}/{uuid.uuid4().hex[:8]}"
+        if not leases.acquire(ARCHIVE_LEASE, holder, session_factory=session_factory):
+            raise ArchiveInProgress("Another archive run is already in progress")
+
+    summary = {"cutoff": cutoff.isoformat(), "dry_run": dry_run, "archived_bills": 0, "archived_items": 0, "months": []}
+    db = session_factory()
+    try:
+        oldest = db.query(Bill.date).filter(Bill.date < cutoff).order_by(Bill.date).first()
+        period = month_start(oldest.date) if oldest else None
+        while period is not None and period < cutoff:
+            in_month = (Bill.date >= period, Bill.date < min(next_month(period), cutoff))
+            bills, items = _archive_month(db, period, in_month, dry_run)
+            if bills:
+                if not dry_run:
+                    # Archived bills read the same, but their list pages and ETags change
+                    response_cache.bump()
+                    # Renewed per month, so a long run keeps it
+                    if not leases.acquire(ARCHIVE_LEASE, holder, session_factory=session_factory):
+                        raise RuntimeError("Lost the archive lease to another process")
+                summary["archived_bills"] += bills
+                summary["archived_items"] += items
+                summary["months"].append({"month": period.strftime("%Y-%m"), "bills": bills, "items": items})
+            period = next_month(period)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        if holder:
+            leases.release(ARCHIVE_LEASE, holder, session_factory=session_factory)
+
+    return summary
+
+def describe_partitions() -> list:
+    return [
+        {"month": period.strftime("%Y-%m"), "file": os.path.basename(path), "bytes": os.path.getsize(path)}
+        for period, path in list_partitions()
+    ]
+
+if __name__ == "__main__":
+    # python -m utils.archive --older-than-days 730 [--dry-run]   (run from backend/)
+    parser = argparse.ArgumentParser(description="Move old bills into monthly archive partitions")
+    parser.add_argument("--older-than-days", type=int, required=True)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        result = archive_bills(args.older_than_days, args.dry_run)
+    except ArchiveInProgress as e:
+        sys.exit(str(e))
+    for month in result["months"]:
+        print(f"{month['month']}: {month['bills']} bills, {month['items']} items")
+    action = "Would archive" if args.dry_run else "Archived"
+    print(f"{action} {result['archived_bills']} bills older than {result['cutoff']}")
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from sqlalchemy import select
+import models
+
+# Lean read path for the bill listings. Instead of hydrating Bill / BillItem
+# ORM objects and validating them through schemas.Bill, pages are read as
+# plain column tuples (one query for the bills, one for all their items) and
+# assembled into dicts that serialize exactly as schemas.Bill does: same keys,
+# same order, same types. The dicts go straight to orjson.
+
+Bill, BillItem = models.Bill, models.BillItem
+
+BILL_COLUMNS = (
+    Bill.customer_name, Bill.customer_phone, Bill.date, Bill.total_amount,
+    Bill.discount, Bill.status, Bill.payment_mode, Bill.id
+)
+
+ITEM_COLUMNS = (
+    BillItem.item_name, BillItem.price, BillItem.quantity, BillItem.item_total,
+    BillItem.discount, BillItem.id, BillItem.bill_id, BillItem.item_id
+)
+
+def bills_select():
+    """select() of the bill columns; filters and keyset_page() apply as on the ORM query."""
+    return select(*BILL_COLUMNS)
+
+def items_select(bill_ids):
+    return select(*ITEM_COLUMNS).where(BillItem.bill_id.in_(bill_ids)).order_by(BillItem.bill_id, BillItem.id)
+
+def _float(value):
+    # schemas.Bill coerces ints (and defaults a missing discount) to float
+    return float(value) if value is not None else 0.0
+
+def item_dict(row) -> dict:
+    item_name, price, quantity, item_total, discount, item_id, bill_id, catalog_id = row
+    return {
+        "item_name": item_name,
+        "price": _float(price),
+        "quantity": quantity,
+        "item_total": _float(item_total),
+        "discount": _float(discount),
+        "id": item_id,
+        "bill_id": bill_id,
+        "item_id": catalog_id,
+    }
+
+def assemble(bill_rows, item_rows) -> list:
+    """Bill dicts in the order of `bill_rows`, each with its items from `item_rows`."""
+    items = defaultdict(list)
+    for row in item_rows:
+        items[row[6]].append(item_dict(row))
+    return [
+        {
+            "customer_name": customer_name,
+            "customer_phone": customer_phone,
+            "date": date,
+            "total_amount": _float(total_amount),
+            "discount": _float(discount),
+            "status": status,
+            "payment_mode": payment_mode,
+            "id": bill_id,
+            "items": items.get(bill_id, []),
+        }
+        for customer_name, customer_phone, date, total_amount, discount, status, payment_mode, bill_id in bill_rows
+    ]
+
+def load(session, bill_rows) -> list:
+    """assemble() with the items fetched from `session` in one query."""
+    bill_rows = list(bill_rows)
+    if not bill_rows:
+        return []
+    return assemble(bill_rows, session.execute(items_select([row[7] for row in bill_rows])).all())
+
+def fetch(session, query) -> list:
+    """Runs a bills_select() based query on `session` and returns its bill dicts."""
+    return load(session, session.execute(query).all())
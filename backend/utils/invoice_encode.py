@@ -0,0 +1,139 @@
+import io
+import os
+
+# Encoding stage of the invoice renderer. An invoice is a few flat colours
+# plus anti-aliased text and the logo, so it is quantized to a small adaptive
+# palette before being written as PNG, which shrinks the file (and the time to
+# deflate it) several times over with no visible change. Full-size WebP/JPEG
+# copies and a small WebP thumbnail for the bill list are derived from it.
+#
+# Every encode can be held to a byte budget: each format has a ladder of ever
+# smaller settings (fewer colours, lower quality) that is walked until the
+# output fits. If nothing fits, the smallest attempt is kept.
+
+# Colours in the adaptive palette; 0 keeps full colour
+INVOICE_PALETTE_COLORS = int(os.environ.get("INVOICE_PALETTE_COLORS", 64))
+# Fewest colours the PNG ladder goes down to
+MIN_PALETTE_COLORS = 16
+
+# Byte budget for full-size invoices (0 for none)
+INVOICE_MAX_BYTES = int(os.environ.get("INVOICE_MAX_BYTES", 256 * 1024))
+
+INVOICE_THUMB_WIDTH = int(os.environ.get("INVOICE_THUMB_WIDTH", 300))
+INVOICE_THUMB_MAX_BYTES = int(os.environ.get("INVOICE_THUMB_MAX_BYTES", 16 * 1024))
+
+LOSSY_QUALITIES = (90, 80, 70, 60, 50, 40)
+
+# format -> (Pillow format, media type, file extension)
+FORMATS = {
+    "png": ("PNG", "image/png", "png"),
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+}
+
+# Files derived from the invoice PNG: name -> (format, width or None for full size)
+VARIANTS = {
+    "webp": ("webp", None),
+    "jpeg": ("jpeg", None),
+    "thumb": ("webp", INVOICE_THUMB_WIDTH),
+}
+
+# Written along with every render
+DEFAULT_VARIANTS = ("thumb",)
+
+def quantize(img, colors: int):
+    """`img` reduced to an adaptive palette of `colors` colours, without dithering (which would only blur the text)."""
+    from PIL import Image
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img.quantize(colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+def attempts(img, fmt: str, lossless: bool = True):
+    """(image, save options) to try for `fmt`, largest output first."""
+    rgb = img if img.mode == "RGB" else img.convert("RGB")
+    if fmt == "png":
+        # optimize (zlib level 9) saves about a tenth for twice the time, so only when over budget
+        colors = INVOICE_PALETTE_COLORS
+        if not colors:
+            yield rgb, {}
+            colors = 256
+        else:
+            yield quantize(rgb, colors), {}
+        while colors >= MIN_PALETTE_COLORS:
+            yield quantize(rgb, colors), {"optimize": True}
+            colors //= 2
+    elif fmt == "webp":
+        if lossless:
+            yield (quantize(rgb, INVOICE_PALETTE_COLORS) if INVOICE_PALETTE_COLORS else rgb), {"lossless": True}
+        for quality in LOSSY_QUALITIES:
+            yield rgb, {"quality": quality}
+    elif fmt == "jpeg":
+        for quality in LOSSY_QUALITIES:
+            yield rgb, {"quality": quality, "optimize": True, "progressive": True}
+    else:
+        raise ValueError(f"Unknown invoice format: {fmt}")
+
+def encode(img, fmt: str = "png", max_bytes: int = INVOICE_MAX_BYTES, lossless: bool = True, **options) -> bytes:
+    """
+    `img` encoded as `fmt` within `max_bytes` (0: no budget). Extra options,
+    such as pnginfo, are passed to every save.
+    """
+    data = None
+    for image, settings in attempts(img, fmt, lossless):
+        buffer = io.BytesIO()
+        image.save(buffer, FORMATS[fmt][0], **settings, **options)
+        if data is None or buffer.tell() < len(data):
+            data = buffer.getvalue()
+        if not max_bytes or len(data) <= max_bytes:
+            break
+    return data
+
+def thumbnail(img, width: int = INVOICE_THUMB_WIDTH):
+    from PIL import Image
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+def write_file(path: str, data: bytes):
+    """
+    Writes aside and renames into place, so a reader (or another worker
+    process writing the same invoice) never sees a half-written file.
+    """
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(data)
+    os.replace(partial, path)
+
+def variant_path(png_path: str, name: str) -> str:
+    fmt, width = VARIANTS[name]
+    base = os.path.splitext(png_path)[0]
+    return f"{base}{'_' + name if width else ''}.{FORMATS[fmt][2]}"
+
+def media_type(name: str) -> str:
+    return FORMATS[VARIANTS[name][0]][1]
+
+def is_fresh(png_path: str, name: str) -> bool:
+    """Whether the variant exists and was written after the invoice PNG it comes from."""
+    try:
+        return os.stat(variant_path(png_path, name)).st_mtime_ns >= os.stat(png_path).st_mtime_ns
+    except OSError:
+        return False
+
+def write_variant(png_path: str, name: str, img=None) -> str:
+    """Encodes variant `name` from `img` (the rendered RGB image) or, when not given, the PNG on disk."""
+    from PIL import Image
+
+    fmt, width = VARIANTS[name]
+    if img is None:
+        with Image.open(png_path) as existing:
+            img = existing.convert("RGB")
+    if width:
+        data = encode(thumbnail(img, width), fmt, INVOICE_THUMB_MAX_BYTES, lossless=False)
+    else:
+        data = encode(img, fmt)
+    path = variant_path(png_path, name)
+    write_file(path, data)
+    return path
@@ -1,282 +1,438 @@
-from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+import hashlib
+import json
 import os
 import datetime
+import time
+
+from utils import invoice_encode
+
+# Pillow is imported inside the drawing functions: the API process imports this
+# module for render_key/invoice_path, and only the render workers draw.
+
+# Rendered invoices (and their PDFs) are written here
+INVOICES_DIR = os.environ.get(
+    "INVOICES_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "invoices")
+)
+
+# Bump when the layout changes so previously cached invoices are re-rendered
+RENDER_VERSION = "2"
+
+# PNG text chunk holding the hash of the fields an invoice was rendered from
+RENDER_HASH_KEY = "render-hash"
+
+# Shop details, terms and footer text drawn on every invoice
+TEMPLATE_PATH = os.environ.get(
+    "INVOICE_TEMPLATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "invoice_template.json")
+)
+
+# --- CONFIGURATION ---
+width = 1200
+padding = 80
+center_x = width // 2
+
+# Colors (RGB)
+color_white = (255, 255, 255)
+color_black = (17, 24, 39)       # gray-900
+color_amber_dark = (146, 64, 14) # text-amber-800
+color_amber_bg = (255, 251, 235) # bg-amber-50
+color_amber_border = (254, 243, 199) # border-amber-100/200
+color_gray_text = (55, 65, 81)   # gray-700
+color_gray_light = (107, 114, 128)# gray-500
+color_header_bg = (31, 41, 55)   # gray-800
+color_header_text = (255, 255, 255)
+color_row_alt = (249, 250, 251)  # gray-50
+color_highlight = (251, 191, 36) # text-amber-400
+
+# Layout
+info_y = 260
+box_height = 160
+table_y = info_y + box_height + 40
+table_header_height = 60
+row_height = 50
+# Space kept above the terms baseline inside the footer layer
+footer_top_margin = 40
+
+@lru_cache(maxsize=None)
+def load_font(name, size):
+    """Loads a TrueType font once per process, with the default font as fallback."""
+    from PIL import ImageFont
 
-def create_invoice_image(bill):
-    """
-    Generates a high-quality invoice image for the given bill object.
-    Matches the "Amber/Serif" visual style of the React frontend.
-    """
     try:
-        # --- CONFIGURATION ---
-        width = 1200
-        padding = 80
-        
-        # Colors (RGB)
-        color_white = (255, 255, 255)
-        color_black = (17, 24, 39)       # gray-900
-        color_amber_dark = (146, 64, 14) # text-amber-800
-        color_amber_bg = (255, 251, 235) # bg-amber-50
-        color_amber_border = (254, 243, 199) # border-amber-100/200
-        color_gray_text = (55, 65, 81)   # gray-700
-        color_gray_light = (107, 114, 128)# gray-500
-        color_header_bg = (31, 41, 55)   # gray-800
-        color_header_text = (255, 255, 255)
-        color_row_alt = (249, 250, 251)  # gray-50
-        color_highlight = (251, 191, 36) # text-amber-400
-
-        # Layout Calculations
-        header_height = 350
-        table_header_height = 60
-        row_height = 50
-        footer_height = 400
-        
-        items_height = len(bill.items) * row_height
-        total_height = header_height + table_header_height + items_height + 150 + footer_height
-        
-        # Create Canvas
-        img = Image.new('RGB', (width, total_height), color=color_white)
-        draw = ImageDraw.Draw(img)
+        return ImageFont.truetype(name, size)
+    except:
+        return ImageFont.load_default()
+
+def fonts():
+    # Try to use standard Windows fonts for that "Premium" look
+    return {
+        "serif_large": load_font("timesbd.ttf", 60), # Royal Vastram Title
+        "serif_italic": load_font("timesi.ttf", 26),
+        "sans_bold": load_font("arialbd.ttf", 28),
+        "sans_med": load_font("arial.ttf", 24),
+        "sans_small": load_font("arial.ttf", 20),
+        "sans_xs": load_font("arial.ttf", 18),
+    }
+
+@lru_cache(maxsize=1)
+def find_logo_path():
+    """Resolves the shop logo file once per process. None if not found."""
+    # Locate logo relative to this file: backend/utils/invoice_gen.py -> .../frontend/public/logo.jpg
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    
+    # Possible paths to check
+    possible_paths = [
+        os.path.join(base_dir, "frontend", "public", "logo.jpg"),
+        os.path.join(base_dir, "frontend", "public", "logo.png"),
+        os.path.join(base_dir, "public", "logo.jpg"), # Fallback
+        "C:\\Users\\91974\\OneDrive\\Desktop\\royalvastram\\frontend\\public\\logo.jpg" # Absolute fallback
+    ]
+    
+    logo_path = None
+    for p in possible_paths:
+        if os.path.exists(p):
+            logo_path = p
+            break
+    
+    print(f"DEBUG: Logo Path Resolution: {logo_path}")
+    
+    if not logo_path:
+        print("DEBUG: Logo file not found in any expected location.")
+    return logo_path
+
+@lru_cache(maxsize=1)
+def load_logo():
+    """Opens and resizes the shop logo once per process. None if not found."""
+    from PIL import Image
+
+    logo_path = find_logo_path()
+    if not logo_path:
+        return None
+    try:
+        logo = Image.open(logo_path)
+        # Resize to fit nicely within 180x180 but keep aspect ratio
+        logo.thumbnail((180, 180), Image.Resampling.LANCZOS)
+        logo.load()
+        return logo
+    except Exception as e:
+        print(f"DEBUG: Error loading logo: {e}")
+        return None
+
+@lru_cache(maxsize=1)
+def load_template():
+    """Reads the invoice template data file once per process."""
+    with open(TEMPLATE_PATH, "rb") as f:
+        raw = f.read()
+    template = json.loads(raw)
+    template["fingerprint"] = hashlib.sha256(raw).hexdigest()
+    return template
+
+# --- STATIC LAYERS ---
+# Everything that is identical on every invoice is drawn once per process
+# and pasted onto each new canvas; only the bill-specific parts are drawn per call.
+
+@lru_cache(maxsize=1)
+def header_layer():
+    """Logo, shop name, address, divider and the empty info box with its labels."""
+    from PIL import Image, ImageDraw
+
+    template = load_template()
+    f = fonts()
+    layer = Image.new('RGB', (width, table_y), color=color_white)
+    draw = ImageDraw.Draw(layer)
+
+    # --- 1. HEADER SECTION ---
+    # Logo (if exists)
+    logo = load_logo()
+    if logo is not None:
+        layer.paste(logo, (padding, 40))
+
+    # Text (Centered)
+    draw.text((center_x, 60), template["shop_name"], font=f["serif_large"], fill=color_amber_dark, anchor="ms")
+    line_y = 120
+    for line in template["address_lines"]:
+        draw.text((center_x, line_y), line, font=f["sans_med"], fill=color_gray_text, anchor="ms")
+        line_y += 35
+    draw.text((center_x, 190), template["phone"], font=f["sans_small"], fill=color_gray_light, anchor="ms")
+
+    # Divider Line
+    draw.line((padding + 50, 230, width - padding - 50, 230), fill=color_amber_dark, width=3)
+
+    # --- 2. INFO BOXES ---
+    # Background for Info Section
+    draw.rectangle((padding, info_y, width - padding, info_y + box_height), fill=color_amber_bg, outline=color_amber_border, width=2)
+    draw.text((padding + 40, info_y + 30), "BILLED TO", font=f["sans_xs"], fill=color_amber_dark)
+    draw.text((width - padding - 40, info_y + 30), "INVOICE DETAILS", font=f["sans_xs"], fill=color_amber_dark, anchor="ra")
+
+    return layer
+
+def table_columns(has_item_discount):
+    # Columns Configuration
+    # Default: S.No (L), Item (L), Price (R), Qty (R), Total (R)
+    # With Disc: S.No (L), Item (L), Price (R), Qty (R), Disc (R), Total (R)
+    columns = {"sno": padding + 10, "item": padding + 80}
+    if has_item_discount:
+        columns.update(price=width - padding - 500, qty=width - padding - 350, disc=width - padding - 200, total=width - padding - 20)
+    else:
+        columns.update(price=width - padding - 450, qty=width - padding - 250, total=width - padding - 30)
+    return columns
+
+@lru_cache(maxsize=2)
+def table_header_layer(has_item_discount):
+    """The dark column-title bar, one variant with and one without the discount column."""
+    from PIL import Image, ImageDraw
+
+    f = fonts()
+    cols = table_columns(has_item_discount)
+    layer = Image.new('RGB', (width - 2 * padding + 1, table_header_height + 1), color=color_header_bg)
+    draw = ImageDraw.Draw(layer)
+
+    y_text = table_header_height // 2
+    draw.text((cols["sno"] - padding, y_text), "Item No.", font=f["sans_small"], fill=color_white, anchor="lm")
+    draw.text((cols["item"] - padding, y_text), "ITEM NAME", font=f["sans_small"], fill=color_white, anchor="lm")
+    draw.text((cols["price"] - padding, y_text), "PRICE", font=f["sans_small"], fill=color_white, anchor="rm")
+    draw.text((cols["qty"] - padding, y_text), "QTY", font=f["sans_small"], fill=color_white, anchor="rm")
+    
+    if has_item_discount:
+        draw.text((cols["disc"] - padding, y_text), "DISC", font=f["sans_small"], fill=color_white, anchor="rm")
         
-        # --- FONTS ---
-        # Helper to load fonts with fallback
-        def load_font(name, size):
-            try:
-                return ImageFont.truetype(name, size)
-            except:
-                return ImageFont.load_default()
-
-        # Try to use standard Windows fonts for that "Premium" look
-        font_serif_large = load_font("timesbd.ttf", 60) # Royal Vastram Title
-        font_sans_bold = load_font("arialbd.ttf", 28)
-        font_sans_med = load_font("arial.ttf", 24)
-        font_sans_small = load_font("arial.ttf", 20)
-        font_sans_xs = load_font("arial.ttf", 18)
+    draw.text((cols["total"] - padding, y_text), "TOTAL", font=f["sans_small"], fill=color_white, anchor="rm")
+
+    return layer
+
+def footer_height():
+    # Terms header, one 30px line per term, then the closing message
+    return footer_top_margin + 15 + len(load_template()["terms"]) * 30 + 60 + 40
+
+@lru_cache(maxsize=1)
+def footer_layer():
+    """Terms & conditions and the closing message; its top sits footer_top_margin above the terms baseline."""
+    from PIL import Image, ImageDraw
+
+    template = load_template()
+    f = fonts()
+    layer = Image.new('RGB', (width, footer_height()), color=color_white)
+    draw = ImageDraw.Draw(layer)
+
+    # Terms Header
+    draw.text((padding + 30, footer_top_margin), template["terms_title"], font=f["sans_bold"], fill=color_black, anchor="ls")
+    
+    term_y_cursor = footer_top_margin + 15
+    for term in template["terms"]:
+        draw.text((padding + 40, term_y_cursor), term, font=f["sans_small"], fill=color_gray_text, anchor="ls")
+        term_y_cursor += 30
         
-        # --- 1. HEADER SECTION ---
-        # Logo (if exists)
-        # --- 1. HEADER SECTION ---
-        # Logo (if exists)
+    # Footer Text (Centered)
+    draw.text((center_x, term_y_cursor + 60), template["footer_message"], font=f["serif_italic"], fill=color_amber_dark, anchor="ms")
+
+    return layer
+
+def format_invoice_date(value):
+    dt = value
+    if isinstance(dt, str):
         try:
-            # Locate logo relative to this file: backend/utils/invoice_gen.py -> .../frontend/public/logo.jpg
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            
-            # Possible paths to check
-            possible_paths = [
-                os.path.join(base_dir, "frontend", "public", "logo.jpg"),
-                os.path.join(base_dir, "frontend", "public", "logo.png"),
-                os.path.join(base_dir, "public", "logo.jpg"), # Fallback
-                "C:\\Users\\91974\\OneDrive\\Desktop\\royalvastram\\frontend\\public\\logo.jpg" # Absolute fallback
-            ]
-            
-            logo_path = None
-            for p in possible_paths:
-                if os.path.exists(p):
-                    logo_path = p
-                    break
-            
-            print(f"DEBUG: Logo Path Resolution: {logo_path}")
-            
-            if logo_path and os.path.exists(logo_path):
-                logo = Image.open(logo_path)
-                # Resize to fit nicely within 180x180 but keep aspect ratio
-                logo.thumbnail((180, 180), Image.Resampling.LANCZOS)
-                
-                # Paste
-                img.paste(logo, (padding, 40))
-                print("DEBUG: Logo pasted successfully.")
-            else:
-                print("DEBUG: Logo file not found in any expected location.")
-        except Exception as e:
-            print(f"DEBUG: Error loading logo: {e}")
-
-        # Text (Centered)
-        center_x = width // 2
-        draw.text((center_x, 60), "ROYAL VASTRAM", font=font_serif_large, fill=color_amber_dark, anchor="ms")
-        draw.text((center_x, 120), "#58 Shop no. 2, Mookambika Nilaya, 3rd Main Road, 11th Cross", font=font_sans_med, fill=color_gray_text, anchor="ms")
-        draw.text((center_x, 155), "Rameshnagar, Marathahalli, Bangalore - 560037", font=font_sans_med, fill=color_gray_text, anchor="ms")
-        draw.text((center_x, 190), "Ph: +91 9110611979", font=font_sans_small, fill=color_gray_light, anchor="ms")
-
-        # Divider Line
-        draw.line((padding + 50, 230, width - padding - 50, 230), fill=color_amber_dark, width=3)
-
-        # --- 2. INFO BOXES ---
-        info_y = 260
-        box_height = 160
-        
-        # Background for Info Section
-        draw.rectangle((padding, info_y, width - padding, info_y + box_height), fill=color_amber_bg, outline=color_amber_border, width=2)
-        
-        # Left: Billed To
-        text_x_left = padding + 40
-        draw.text((text_x_left, info_y + 30), "BILLED TO", font=font_sans_xs, fill=color_amber_dark)
-        draw.text((text_x_left, info_y + 60), f"Mr/Mrs {str(bill.customer_name)}", font=font_sans_bold, fill=color_black)
-        draw.text((text_x_left, info_y + 100), str(bill.customer_phone), font=font_sans_med, fill=color_gray_text)
-        
-        # Right: Invoice Details
-        text_x_right = width - padding - 40
-        draw.text((text_x_right, info_y + 30), "INVOICE DETAILS", font=font_sans_xs, fill=color_amber_dark, anchor="ra")
-        draw.text((text_x_right, info_y + 60), f"#{str(bill.id).zfill(6)}", font=font_sans_bold, fill=color_black, anchor="ra")
-        
-        # Format date nicely
-        dt = bill.date
-        if isinstance(dt, str):
-            try:
-                # If ISO string, parse it
-                dt = datetime.datetime.fromisoformat(dt)
-            except:
-                pass
-        
-        date_str = dt.strftime("%B %d, %Y") if hasattr(dt, 'strftime') else str(dt)
-        draw.text((text_x_right, info_y + 100), date_str, font=font_sans_med, fill=color_gray_text, anchor="ra")
+            # If ISO string, parse it
+            dt = datetime.datetime.fromisoformat(dt)
+        except:
+            pass
+    
+    return dt.strftime("%B %d, %Y") if hasattr(dt, 'strftime') else str(dt)
 
-        # --- 3. TABLE ---
-        table_y = info_y + box_height + 40
-        
-        # Header Background
-        draw.rectangle((padding, table_y, width - padding, table_y + table_header_height), fill=color_header_bg)
-        
-        # Columns: Item (L), Price (R), Qty (R), Total (R)
-        # Check if we need a discount column
-        has_item_discount = any((getattr(i, 'discount', 0) or 0) > 0 for i in bill.items)
+def render_key(bill):
+    """Hash of every bill field that appears on the invoice, plus the template in use."""
+    parts = [
+        RENDER_VERSION,
+        load_template()["fingerprint"],
+        str(bill.id),
+        str(bill.customer_name),
+        str(bill.customer_phone),
+        format_invoice_date(bill.date),
+        f"{bill.total_amount:.2f}",
+    ]
+    for item in bill.items:
+        parts.append("|".join([
+            str(item.item_name),
+            f"{item.price:.2f}",
+            str(item.quantity),
+            f"{getattr(item, 'discount', 0) or 0:.2f}",
+            f"{item.item_total:.2f}",
+        ]))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def invoice_path(bill_id):
+    if not os.path.exists(INVOICES_DIR):
+        os.makedirs(INVOICES_DIR)
+    return os.path.join(INVOICES_DIR, f"invoice_{bill_id}.png")
 
-        # Columns Configuration
-        # Default: Item (L), Price (R), Qty (R), Total (R)
-        # With Disc: Item (L), Price (R), Qty (R), Disc (R), Total (R)
+def cached_render_key(path):
+    """The render hash stored in an existing invoice PNG, or None."""
+    if not os.path.exists(path):
+        return None
+    from PIL import Image
+
+    try:
+        # Only the header and text chunks are read, not the pixel data
+        with Image.open(path) as existing:
+            return existing.info.get(RENDER_HASH_KEY)
+    except Exception:
+        return None
+
+def total_lines(bill, items):
+    """(label, value, color, font key) rows of the totals box."""
+    # Calculate Logic
+    gross_subtotal = sum([i.price * i.quantity for i in items])
+    total_discount = gross_subtotal - bill.total_amount
+    
+    # Determine lines to print
+    lines = []
+    lines.append(("Subtotal", f"Rs {gross_subtotal:.2f}", color_gray_text, "sans_med"))
+    if total_discount > 0.01:
+         lines.append(("Discount", f"- Rs {total_discount:.2f}", (220, 38, 38), "sans_med")) # Red color
+    
+    # Grand Total line
+    lines.append(("Grand Total", f"Rs {bill.total_amount:.2f}", color_black, "sans_bold"))
+    return lines
+
+def render_invoice(bill):
+    """
+    Draws the invoice for `bill` and returns it as an RGB image.
+    Static layers are pasted in; only the info text, item rows and totals are drawn.
+    """
+    from PIL import Image, ImageDraw
+
+    f = fonts()
+    items = list(bill.items)
+    footer = footer_layer()
+
+    # Layout Calculations
+    items_height = len(items) * row_height
+    total_section_y = table_y + table_header_height + items_height + 30
+    footer_y = total_section_y + 180
+    total_height = footer_y - footer_top_margin + footer.height
+    
+    # Create Canvas
+    img = Image.new('RGB', (width, total_height), color=color_white)
+    img.paste(header_layer(), (0, 0))
+    img.paste(footer, (0, footer_y - footer_top_margin))
+    draw = ImageDraw.Draw(img)
+
+    # --- 2. INFO BOXES ---
+    # Left: Billed To
+    text_x_left = padding + 40
+    draw.text((text_x_left, info_y + 60), f"Mr/Mrs {str(bill.customer_name)}", font=f["sans_bold"], fill=color_black)
+    draw.text((text_x_left, info_y + 100), str(bill.customer_phone), font=f["sans_med"], fill=color_gray_text)
+    
+    # Right: Invoice Details
+    text_x_right = width - padding - 40
+    draw.text((text_x_right, info_y + 60), f"#{str(bill.id).zfill(6)}", font=f["sans_bold"], fill=color_black, anchor="ra")
+    
+    # Format date nicely
+    date_str = format_invoice_date(bill.date)
+    draw.text((text_x_right, info_y + 100), date_str, font=f["sans_med"], fill=color_gray_text, anchor="ra")
+
+    # --- 3. TABLE ---
+    # Check if we need a discount column
+    has_item_discount = any((getattr(i, 'discount', 0) or 0) > 0 for i in items)
+    cols = table_columns(has_item_discount)
+    img.paste(table_header_layer(has_item_discount), (padding, table_y))
+
+    # Rows
+    current_y = table_y + table_header_height
+    
+    for index, item in enumerate(items):
+        # Alternating Bg
+        if index % 2 != 0:
+            draw.rectangle((padding, current_y, width - padding, current_y + row_height), fill=color_row_alt)
         
-        # Columns Configuration
-        # With S.No: S.No (L), Item (L), Price (R), Qty (R), Total (R)
+        row_mid = current_y + (row_height // 2)
         
-        col_x_sno = padding + 10
-        col_x_item = padding + 80
+        # Truncate item name slightly more if we have discount col
+        max_char = 38 if has_item_discount else 48
         
-        if has_item_discount:
-            col_x_price = width - padding - 500
-            col_x_qty = width - padding - 350
-            col_x_disc = width - padding - 200
-            col_x_total = width - padding - 20
-        else:
-            col_x_price = width - padding - 450
-            col_x_qty = width - padding - 250
-            col_x_total = width - padding - 30
-
-        y_text = table_y + (table_header_height // 2)
-        draw.text((col_x_sno, y_text), "Item No.", font=font_sans_small, fill=color_white, anchor="lm")
-        draw.text((col_x_item, y_text), "ITEM NAME", font=font_sans_small, fill=color_white, anchor="lm")
-        draw.text((col_x_price, y_text), "PRICE", font=font_sans_small, fill=color_white, anchor="rm")
-        draw.text((col_x_qty, y_text), "QTY", font=font_sans_small, fill=color_white, anchor="rm")
+        draw.text((cols["sno"], row_mid), str(index + 1), font=f["sans_med"], fill=color_black, anchor="lm")
+        draw.text((cols["item"], row_mid), str(item.item_name)[:max_char], font=f["sans_med"], fill=color_black, anchor="lm")
+        draw.text((cols["price"], row_mid), f"Rs {item.price:.2f}", font=f["sans_med"], fill=color_black, anchor="rm")
+        draw.text((cols["qty"], row_mid), str(item.quantity), font=f["sans_med"], fill=color_black, anchor="rm")
         
         if has_item_discount:
-            draw.text((col_x_disc, y_text), "DISC", font=font_sans_small, fill=color_white, anchor="rm")
-            
-        draw.text((col_x_total, y_text), "TOTAL", font=font_sans_small, fill=color_white, anchor="rm")
+             disc_val = getattr(item, 'discount', 0) or 0
+             draw.text((cols["disc"], row_mid), f"-{disc_val:.2f}", font=f["sans_med"], fill=color_amber_dark, anchor="rm")
 
-        # Rows
-        current_y = table_y + table_header_height
+        draw.text((cols["total"], row_mid), f"Rs {item.item_total:.2f}", font=f["sans_bold"], fill=color_black, anchor="rm")
         
-        for index, item in enumerate(bill.items):
-            # Alternating Bg
-            if index % 2 != 0:
-                draw.rectangle((padding, current_y, width - padding, current_y + row_height), fill=color_row_alt)
-            
-            row_mid = current_y + (row_height // 2)
-            
-            # Truncate item name slightly more if we have discount col
-            max_char = 38 if has_item_discount else 48
-            
-            draw.text((col_x_sno, row_mid), str(index + 1), font=font_sans_med, fill=color_black, anchor="lm")
-            draw.text((col_x_item, row_mid), str(item.item_name)[:max_char], font=font_sans_med, fill=color_black, anchor="lm")
-            draw.text((col_x_price, row_mid), f"Rs {item.price:.2f}", font=font_sans_med, fill=color_black, anchor="rm")
-            draw.text((col_x_qty, row_mid), str(item.quantity), font=font_sans_med, fill=color_black, anchor="rm")
-            
-            if has_item_discount:
-                 disc_val = getattr(item, 'discount', 0) or 0
-                 draw.text((col_x_disc, row_mid), f"-{disc_val:.2f}", font=font_sans_med, fill=color_amber_dark, anchor="rm")
+        current_y += row_height
 
-            draw.text((col_x_total, row_mid), f"Rs {item.item_total:.2f}", font=font_sans_bold, fill=color_black, anchor="rm")
-            
-            current_y += row_height
+    # --- 4. TOTALS SECTION ---
+    # Total Box (Right Aligned)
+    total_box_width = 500
+    total_box_x = width - padding - total_box_width
+    
+    lines = total_lines(bill, items)
 
-        # --- 4. TOTALS SECTION ---
-        total_section_y = current_y + 30
-        
-        # Amount in Words (Left Side) - REMOVED, moving down
+    # Box Dimensions
+    line_height = 40
+    box_padding = 20
+    box_h = (len(lines) * line_height) + (box_padding * 2)
+    
+    # Draw Box
+    draw.rectangle((total_box_x, total_section_y, width - padding, total_section_y + box_h), fill=color_white, outline=color_black, width=2)
+    
+    # Draw Lines
+    cursor_y = total_section_y + box_padding + 10 # slightly down for first line center
+    
+    for label, value, color, font_key in lines:
+         font = f[font_key]
+         # Draw Label
+         draw.text((total_box_x + 20, cursor_y), label, font=font, fill=color, anchor="lm")
+         # Draw Value
+         draw.text((width - padding - 20, cursor_y), value, font=font, fill=color, anchor="rm")
+         cursor_y += line_height
 
-        # Total Box (Right Aligned)
-        total_box_width = 500
-        total_box_x = width - padding - total_box_width
-        
-        # Calculate Logic
-        gross_subtotal = sum([i.price * i.quantity for i in bill.items])
-        total_discount = gross_subtotal - bill.total_amount
-        
-        # Determine lines to print
-        lines = []
-        lines.append(("Subtotal", f"Rs {gross_subtotal:.2f}", color_gray_text, font_sans_med))
-        if total_discount > 0.01:
-             lines.append(("Discount", f"- Rs {total_discount:.2f}", (220, 38, 38), font_sans_med)) # Red color
-        
-        # Grand Total line
-        lines.append(("Grand Total", f"Rs {bill.total_amount:.2f}", color_black, font_sans_bold))
+    # Amount in Words (Below the Total Box)
+    words = num_to_indian_words(int(round(bill.total_amount)))
+    words_y = total_section_y + box_h + 20
+    draw.text((width - padding, words_y), "Amount in Words:", font=f["sans_small"], fill=color_gray_text, anchor="ra")
+    draw.text((width - padding, words_y + 30), f"{words} Only", font=f["sans_med"], fill=color_black, anchor="ra")
+
+    return img
+
+def create_invoice_image(bill, timings=None, variants=invoice_encode.DEFAULT_VARIANTS):
+    """
+    Generates a high-quality invoice image for the given bill object.
+    Matches the "Amber/Serif" visual style of the React frontend.
+    Returns the existing file untouched if the bill has not changed since it was rendered.
+    The derived files named in `variants` (see invoice_encode.VARIANTS) are
+    written along with it, or brought up to date from the existing file.
+    When a `timings` dict is passed, the seconds spent drawing ("render"),
+    writing the PNG ("encode") and the variants ("variants") are stored in it.
+    """
+    try:
+        abs_path = invoice_path(bill.id)
+        key = render_key(bill)
+        img = None
+        if cached_render_key(abs_path) != key:
+            started = time.perf_counter()
+            img = render_invoice(bill)
+            rendered = time.perf_counter()
+
+            # --- SAVE ---
+            from PIL.PngImagePlugin import PngInfo
+
+            pnginfo = PngInfo()
+            pnginfo.add_text(RENDER_HASH_KEY, key)
+            invoice_encode.write_file(abs_path, invoice_encode.encode(img, "png", pnginfo=pnginfo))
+            if timings is not None:
+                timings["render"] = rendered - started
+                timings["encode"] = time.perf_counter() - rendered
+
+        started = time.perf_counter()
+        stale = [name for name in variants if img is not None or not invoice_encode.is_fresh(abs_path, name)]
+        for name in stale:
+            invoice_encode.write_variant(abs_path, name, img)
+        if stale and timings is not None:
+            timings["variants"] = time.perf_counter() - started
 
-        # Box Dimensions
-        line_height = 40
-        box_padding = 20
-        box_h = (len(lines) * line_height) + (box_padding * 2)
-        
-        # Draw Box
-        draw.rectangle((total_box_x, total_section_y, width - padding, total_section_y + box_h), fill=color_white, outline=color_black, width=2)
-        
-        # Draw Lines
-        cursor_y = total_section_y + box_padding + 10 # slightly down for first line center
-        
-        for label, value, color, font in lines:
-             # Draw Label
-             draw.text((total_box_x + 20, cursor_y), label, font=font, fill=color, anchor="lm")
-             # Draw Value
-             draw.text((width - padding - 20, cursor_y), value, font=font, fill=color, anchor="rm")
-             cursor_y += line_height
-
-        # Amount in Words (Below the Total Box)
-        words = num_to_indian_words(int(round(bill.total_amount)))
-        words_y = total_section_y + box_h + 20
-        draw.text((width - padding, words_y), "Amount in Words:", font=font_sans_small, fill=color_gray_text, anchor="ra")
-        draw.text((width - padding, words_y + 30), f"{words} Only", font=font_sans_med, fill=color_black, anchor="ra")
-
-        # --- 5. FOOTER ---
-        footer_y = total_section_y + 180
-        
-        # Terms Header
-        draw.text((padding + 30, footer_y), "Terms & Conditions", font=font_sans_bold, fill=color_black, anchor="ls")
-        
-        terms = [
-            "1. Goods once sold will not be taken back or exchanged.",
-            "2. No return/exchange on discounted items.",
-            "3. Please check the saree before leaving the shop.",
-            "4. Minor color or weaving variations are not defects.",
-            "5. We are not responsible for damage after purchase.",
-            "6. Disputes subject to Bangalore jurisdiction only"
-        ]
-        
-        term_y_cursor = footer_y + 15
-        for term in terms:
-            draw.text((padding + 40, term_y_cursor), term, font=font_sans_small, fill=color_gray_text, anchor="ls")
-            term_y_cursor += 30
-            
-        # Footer Text (Centered)
-        final_msg = '"Thanks for shopping with us. We hope this saree adds beauty to your special moments"'
-        draw.text((center_x, term_y_cursor + 60), final_msg, font=load_font("timesi.ttf", 26), fill=color_amber_dark, anchor="ms")
-        
-        # --- SAVE ---
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        invoices_dir = os.path.join(base_dir, "invoices")
-        if not os.path.exists(invoices_dir):
-            os.makedirs(invoices_dir)
-            
-        filename = f"invoice_{bill.id}.png"
-        abs_path = os.path.join(invoices_dir, filename)
-        img.save(abs_path, quality=100)
-        
         return abs_path, None
 
     except Exception as e:
@@ -0,0 +1,267 @@
+from utils import invoice_gen as layout
+from utils.invoice_gen import (
+    load_template, load_logo, format_invoice_date, total_lines, table_columns,
+    footer_height, num_to_indian_words, invoice_path
+)
+import os
+
+# Vector PDF version of the invoice. It follows the same layout as
+# invoice_gen.render_invoice, with the 1200px-wide pixel coordinates scaled
+# onto a 600pt page. Text is set in the PDF base fonts, so nothing is
+# rasterized except the logo, which is embedded once per document.
+
+SCALE = 0.5
+PAGE_WIDTH = layout.width * SCALE
+
+# Pillow TrueType fonts -> PDF base-14 fonts, with their pixel sizes.
+# Helvetica sets wider than Arial, so the sans sizes are a step smaller.
+PDF_FONTS = {
+    "serif_large": ("Times-Bold", 60),
+    "serif_italic": ("Times-Italic", 26),
+    "sans_bold": ("Helvetica-Bold", 26),
+    "sans_med": ("Helvetica", 22),
+    "sans_small": ("Helvetica", 18),
+    "sans_xs": ("Helvetica", 16),
+}
+
+# Gap between the terms title and the first term; the PNG's 15px is too
+# tight for the title's descenders at PDF font sizes.
+TERMS_GAP = 30
+
+# Statement summary table
+STATEMENT_ROWS_PER_PAGE = 40
+
+class PdfPage:
+    """Draws on a reportlab canvas using the PNG layout's top-left pixel coordinates."""
+
+    def __init__(self, canvas, height_px):
+        self.c = canvas
+        self.height = height_px * SCALE
+        canvas.setPageSize((PAGE_WIDTH, self.height))
+
+    def _y(self, y):
+        return self.height - y * SCALE
+
+    def _color(self, rgb):
+        return tuple(v / 255 for v in rgb)
+
+    def text(self, xy, value, font_key, fill, anchor="la"):
+        """Same anchors as Pillow: l/m/r horizontally, a/m/s (ascender, middle, baseline) vertically."""
+        x, y = xy
+        name, size_px = PDF_FONTS[font_key]
+        vertical = anchor[1]
+        if vertical == "a":
+            y += size_px * 0.75
+        elif vertical == "m":
+            y += size_px * 0.35
+
+        self.c.setFont(name, size_px * SCALE)
+        self.c.setFillColorRGB(*self._color(fill))
+        x, y = x * SCALE, self._y(y)
+        if anchor[0] == "m":
+            self.c.drawCentredString(x, y, value)
+        elif anchor[0] == "r":
+            self.c.drawRightString(x, y, value)
+        else:
+            self.c.drawString(x, y, value)
+
+    def rectangle(self, box, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = box
+        if fill:
+            self.c.setFillColorRGB(*self._color(fill))
+        if outline:
+            self.c.setStrokeColorRGB(*self._color(outline))
+            self.c.setLineWidth(width * SCALE)
+        self.c.rect(x0 * SCALE, self._y(y1), (x1 - x0) * SCALE, (y1 - y0) * SCALE, fill=1 if fill else 0, stroke=1 if outline else 0)
+
+    def line(self, box, fill, width=1):
+        x0, y0, x1, y1 = box
+        self.c.setStrokeColorRGB(*self._color(fill))
+        self.c.setLineWidth(width * SCALE)
+        self.c.line(x0 * SCALE, self._y(y0), x1 * SCALE, self._y(y1))
+
+    def image(self, img, xy):
+        from reportlab.lib.utils import ImageReader
+
+        x, y = xy
+        w, h = img.size
+        self.c.drawImage(ImageReader(img), x * SCALE, self._y(y + h), w * SCALE, h * SCALE)
+
+def invoice_height(bill):
+    items_height = len(bill.items) * layout.row_height
+    footer_y = layout.table_y + layout.table_header_height + items_height + 30 + 180
+    return footer_y - layout.footer_top_margin + footer_height() + TERMS_GAP - 15
+
+def draw_invoice(canvas, bill):
+    """Draws one invoice as the current page of `canvas`."""
+    template = load_template()
+    items = list(bill.items)
+    page = PdfPage(canvas, invoice_height(bill))
+    width, padding, center_x = layout.width, layout.padding, layout.center_x
+    info_y, box_height, table_y = layout.info_y, layout.box_height, layout.table_y
+
+    # --- 1. HEADER SECTION ---
+    logo = load_logo()
+    if logo is not None:
+        page.image(logo, (padding, 40))
+
+    page.text((center_x, 60), template["shop_name"], "serif_large", layout.color_amber_dark, anchor="ms")
+    line_y = 120
+    for line in template["address_lines"]:
+        page.text((center_x, line_y), line, "sans_med", layout.color_gray_text, anchor="ms")
+        line_y += 35
+    page.text((center_x, 190), template["phone"], "sans_small", layout.color_gray_light, anchor="ms")
+    page.line((padding + 50, 230, width - padding - 50, 230), layout.color_amber_dark, width=3)
+
+    # --- 2. INFO BOXES ---
+    page.rectangle((padding, info_y, width - padding, info_y + box_height), fill=layout.color_amber_bg, outline=layout.color_amber_border, width=2)
+    text_x_left = padding + 40
+    page.text((text_x_left, info_y + 30), "BILLED TO", "sans_xs", layout.color_amber_dark)
+    page.text((text_x_left, info_y + 60), f"Mr/Mrs {str(bill.customer_name)}", "sans_bold", layout.color_black)
+    page.text((text_x_left, info_y + 100), str(bill.customer_phone), "sans_med", layout.color_gray_text)
+
+    text_x_right = width - padding - 40
+    page.text((text_x_right, info_y + 30), "INVOICE DETAILS", "sans_xs", layout.color_amber_dark, anchor="ra")
+    page.text((text_x_right, info_y + 60), f"#{str(bill.id).zfill(6)}", "sans_bold", layout.color_black, anchor="ra")
+    page.text((text_x_right, info_y + 100), format_invoice_date(bill.date), "sans_med", layout.color_gray_text, anchor="ra")
+
+    # --- 3. TABLE ---
+    has_item_discount = any((getattr(i, 'discount', 0) or 0) > 0 for i in items)
+    cols = table_columns(has_item_discount)
+    header_h = layout.table_header_height
+    page.rectangle((padding, table_y, width - padding, table_y + header_h), fill=layout.color_header_bg)
+
+    y_text = table_y + header_h // 2
+    page.text((cols["sno"], y_text), "No.", "sans_small", layout.color_white, anchor="lm")
+    page.text((cols["item"], y_text), "ITEM NAME", "sans_small", layout.color_white, anchor="lm")
+    page.text((cols["price"], y_text), "PRICE", "sans_small", layout.color_white, anchor="rm")
+    page.text((cols["qty"], y_text), "QTY", "sans_small", layout.color_white, anchor="rm")
+    if has_item_discount:
+        page.text((cols["disc"], y_text), "DISC", "sans_small", layout.color_white, anchor="rm")
+    page.text((cols["total"], y_text), "TOTAL", "sans_small", layout.color_white, anchor="rm")
+
+    row_height = layout.row_height
+    current_y = table_y + header_h
+    max_char = 38 if has_item_discount else 48
+    for index, item in enumerate(items):
+        if index % 2 != 0:
+            page.rectangle((padding, current_y, width - padding, current_y + row_height), fill=layout.color_row_alt)
+
+        row_mid = current_y + (row_height // 2)
+        page.text((cols["sno"], row_mid), str(index + 1), "sans_med", layout.color_black, anchor="lm")
+        page.text((cols["item"], row_mid), str(item.item_name)[:max_char], "sans_med", layout.color_black, anchor="lm")
+        page.text((cols["price"], row_mid), f"Rs {item.price:.2f}", "sans_med", layout.color_black, anchor="rm")
+        page.text((cols["qty"], row_mid), str(item.quantity), "sans_med", layout.color_black, anchor="rm")
+        if has_item_discount:
+            disc_val = getattr(item, 'discount', 0) or 0
+            page.text((cols["disc"], row_mid), f"-{disc_val:.2f}", "sans_med", layout.color_amber_dark, anchor="rm")
+        page.text((cols["total"], row_mid), f"Rs {item.item_total:.2f}", "sans_bold", layout.color_black, anchor="rm")
+        current_y += row_height
+
+    # --- 4. TOTALS SECTION ---
+    total_section_y = current_y + 30
+    total_box_x = width - padding - 500
+    lines = total_lines(bill, items)
+    line_height, box_padding = 40, 20
+    box_h = (len(lines) * line_height) + (box_padding * 2)
+    page.rectangle((total_box_x, total_section_y, width - padding, total_section_y + box_h), fill=layout.color_white, outline=layout.color_black, width=2)
+
+    cursor_y = total_section_y + box_padding + 10
+    for label, value, color, font_key in lines:
+        page.text((total_box_x + 20, cursor_y), label, font_key, color, anchor="lm")
+        page.text((width - padding - 20, cursor_y), value, font_key, color, anchor="rm")
+        cursor_y += line_height
+
+    words = num_to_indian_words(int(round(bill.total_amount)))
+    words_y = total_section_y + box_h + 20
+    page.text((width - padding, words_y), "Amount in Words:", "sans_small", layout.color_gray_text, anchor="ra")
+    page.text((width - padding, words_y + 30), f"{words} Only", "sans_med", layout.color_black, anchor="ra")
+
+    # --- 5. FOOTER ---
+    footer_y = total_section_y + 180
+    page.text((padding + 30, footer_y), template["terms_title"], "sans_bold", layout.color_black, anchor="ls")
+    term_y_cursor = footer_y + TERMS_GAP
+    for term in template["terms"]:
+        page.text((padding + 40, term_y_cursor), term, "sans_small", layout.color_gray_text, anchor="ls")
+        term_y_cursor += 30
+    page.text((center_x, term_y_cursor + 60), template["footer_message"], "serif_italic", layout.color_amber_dark, anchor="ms")
+
+    canvas.showPage()
+
+def new_canvas(output, title):
+    from reportlab.pdfgen.canvas import Canvas
+
+    canvas = Canvas(output, pageCompression=1)
+    canvas.setTitle(title)
+    canvas.setAuthor(load_template()["shop_name"])
+    return canvas
+
+def create_invoice_pdf(bill):
+    """
+    Writes invoices/invoice_<id>.pdf for the given bill object and returns its path.
+    Same signature style as create_invoice_image: (path, None), or (None, None) on error.
+    """
+    try:
+        abs_path = os.path.splitext(invoice_path(bill.id))[0] + ".pdf"
+        canvas = new_canvas(abs_path, f"Invoice #{str(bill.id).zfill(6)}")
+        draw_invoice(canvas, bill)
+        canvas.save()
+        return abs_path, None
+    except Exception as e:
+        print(f"Error generating invoice PDF: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, None
+
+def draw_statement_summary(canvas, title, bills):
+    """Summary pages listing every bill in the statement, with a grand total."""
+    template = load_template()
+    width, padding = layout.width, layout.padding
+    header_rows = 4
+    pages = [bills[i:i + STATEMENT_ROWS_PER_PAGE] for i in range(0, len(bills), STATEMENT_ROWS_PER_PAGE)] or [[]]
+    grand_total = sum(b.total_amount or 0 for b in bills)
+
+    for page_no, rows in enumerate(pages, start=1):
+        page = PdfPage(canvas, (header_rows + len(rows) + 4) * 40 + 160)
+        page.text((layout.center_x, 70), template["shop_name"], "serif_large", layout.color_amber_dark, anchor="ms")
+        page.text((layout.center_x, 120), title, "sans_bold", layout.color_black, anchor="ms")
+        page.text((width - padding, 150), f"Page {page_no} of {len(pages)}", "sans_xs", layout.color_gray_light, anchor="ra")
+
+        y = 180
+        page.rectangle((padding, y, width - padding, y + 50), fill=layout.color_header_bg)
+        for x, label, anchor in [(padding + 10, "DATE", "lm"), (padding + 200, "BILL NO.", "lm"), (padding + 400, "CUSTOMER", "lm"),
+                                 (width - padding - 260, "STATUS", "rm"), (width - padding - 10, "AMOUNT", "rm")]:
+            page.text((x, y + 25), label, "sans_small", layout.color_white, anchor=anchor)
+        y += 50
+
+        for index, b in enumerate(rows):
+            if index % 2 != 0:
+                page.rectangle((padding, y, width - padding, y + 40), fill=layout.color_row_alt)
+            mid = y + 20
+            date_val = b.date.strftime("%d-%m-%Y") if hasattr(b.date, "strftime") else str(b.date)
+            page.text((padding + 10, mid), date_val, "sans_small", layout.color_black, anchor="lm")
+            page.text((padding + 200, mid), f"#{str(b.id).zfill(6)}", "sans_small", layout.color_black, anchor="lm")
+            page.text((padding + 400, mid), str(b.customer_name)[:28], "sans_small", layout.color_black, anchor="lm")
+            page.text((width - padding - 260, mid), str(b.status), "sans_small", layout.color_gray_text, anchor="rm")
+            page.text((width - padding - 10, mid), f"Rs {b.total_amount:.2f}", "sans_small", layout.color_black, anchor="rm")
+            y += 40
+
+        if page_no == len(pages):
+            page.line((padding, y + 10, width - padding, y + 10), layout.color_black, width=2)
+            page.text((padding + 10, y + 40), f"{len(bills)} bills", "sans_bold", layout.color_black, anchor="lm")
+            page.text((width - padding - 10, y + 40), f"Rs {grand_total:.2f}", "sans_bold", layout.color_black, anchor="rm")
+
+        canvas.showPage()
+
+def write_statement_pdf(output, title, summary_rows, bills):
+    """
+    Writes a multi-page statement to `output` (path or file object) in one pass:
+    summary pages from `summary_rows` (id, date, customer_name, status,
+    total_amount), then one vector invoice page per bill from `bills`, which
+    may be a lazily fetched iterable so only one bill is held at a time.
+    """
+    canvas = new_canvas(output, title)
+    draw_statement_summary(canvas, title, summary_rows)
+    for bill in bills:
+        draw_invoice(canvas, bill)
+    canvas.save()
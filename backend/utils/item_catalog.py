@@ -0,0 +1,78 @@
+from sqlalchemy import inspect, text, update
+from sqlalchemy.orm import Session
+
+import database
+import models
+
+# Item catalog. Bill items keep their printed name, but also point at an
+# `items` row by integer id, so per-item analytics are range scans on
+# ix_bill_items_item_bill instead of string grouping over bill_items.
+
+BACKFILL_CHUNK_SIZE = 5000
+
+def display_name(name: str) -> str:
+    return " ".join((name or "").split())
+
+def normalize_name(name: str) -> str:
+    """Catalog key: collapsed whitespace, case-insensitive."""
+    return display_name(name).lower()
+
+def intern_items(db, names) -> dict:
+    """
+    Returns {name: item id} for every name, adding names the catalog has not
+    seen yet. Runs in the caller's transaction; a blank name maps to None.
+    """
+    keys = {}
+    for name in names:
+        key = normalize_name(name)
+        if key:
+            keys.setdefault(key, display_name(name))
+    if not keys:
+        return {name: None for name in names}
+
+    ids = dict(
+        db.query(models.Item.normalized_name, models.Item.id).filter(models.Item.normalized_name.in_(list(keys))).all()
+    )
+    missing = [key for key in keys if key not in ids]
+    if missing:
+        # DO NOTHING on conflict: a concurrent insert of the same name is fine, we re-read below
+        stmt = database.dialect_insert(db)(models.Item).on_conflict_do_nothing(index_elements=["normalized_name"])
+        db.execute(stmt, [{"name": keys[key], "normalized_name": key} for key in missing])
+        ids.update(
+            db.query(models.Item.normalized_name, models.Item.id).filter(models.Item.normalized_name.in_(missing)).all()
+        )
+
+    return {name: ids.get(normalize_name(name)) for name in names}
+
+def ensure_item_catalog(engine):
+    """
+    Migrates an existing database to the catalog: adds bill_items.item_id if
+    missing and links every unlinked row to its catalog item. Must run after
+    create_all (which creates `items`) and before indexes are created.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("bill_items")}
+    if "item_id" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE bill_items ADD COLUMN item_id INTEGER REFERENCES items(id)"))
+
+    linked = 0
+    last_id = 0
+    with Session(engine) as db:
+        while True:
+            rows = db.query(models.BillItem.id, models.BillItem.item_name).filter(
+                models.BillItem.item_id.is_(None),
+                models.BillItem.id > last_id
+            ).order_by(models.BillItem.id).limit(BACKFILL_CHUNK_SIZE).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            ids = intern_items(db, [row.item_name for row in rows])
+            updates = [{"id": row.id, "item_id": ids[row.item_name]} for row in rows if ids[row.item_name]]
+            if updates:
+                db.execute(update(models.BillItem), updates)
+            db.commit()
+            linked += len(updates)
+
+    if linked:
+        print(f"Item catalog: linked {linked} existing bill items")
@@ -0,0 +1,47 @@
+from sqlalchemy import delete
+import datetime
+import json
+import os
+import uuid
+
+import database
+import models
+
+# Status of background jobs (bulk invoice renders, retention cleanups) in the
+# `jobs` table. A job runs in one worker process, but its status can be polled
+# from any of them, so each job writes its to_dict() here as it progresses.
+
+# Finished jobs are kept this long for status queries
+JOB_HISTORY_DAYS = float(os.environ.get("JOB_HISTORY_DAYS", 7))
+
+def new_id(prefix: str) -> str:
+    """Job id unique across worker processes and restarts, e.g. r3f9c0a1b2d4e."""
+    return f"{prefix}{uuid.uuid4().hex[:12]}"
+
+def save(kind: str, state: dict, session_factory=None):
+    """Writes `state` (a job's to_dict(), with job_id and status) as the job's current status."""
+    session_factory = session_factory or database.SessionLocal
+    Job = models.Job
+    finished_at = datetime.datetime.fromisoformat(state["finished_at"]) if state.get("finished_at") else None
+    values = {"status": state["status"], "state": json.dumps(state), "finished_at": finished_at}
+
+    db = session_factory()
+    try:
+        stmt = database.dialect_insert(db)(Job).values(id=state["job_id"], kind=kind, **values)
+        db.execute(stmt.on_conflict_do_update(index_elements=["id"], set_=values))
+        if finished_at:
+            cutoff = datetime.datetime.now() - datetime.timedelta(days=JOB_HISTORY_DAYS)
+            db.execute(delete(Job).where(Job.finished_at < cutoff))
+        db.commit()
+    finally:
+        db.close()
+
+def load(kind: str, job_id: str, session_factory=None):
+    """The last saved status of job `job_id` of this kind, or None."""
+    session_factory = session_factory or database.SessionLocal
+    db = session_factory()
+    try:
+        state = db.query(models.Job.state).filter(models.Job.id == job_id, models.Job.kind == kind).scalar()
+    finally:
+        db.close()
+    return json.loads(state) if state else None
@@ -0,0 +1,83 @@
+from sqlalchemy import case, delete, or_, update
+import datetime
+import os
+import socket
+import threading
+
+import database
+import models
+from utils import metrics
+
+# Named leases in the `leases` table. With several worker processes serving
+# the app, work that must happen once per deployment (sending the outbox,
+# the retention cleanup) runs only in the process holding its lease. A holder
+# keeps the lease by re-acquiring it before it expires; if that process dies,
+# another one takes over once the lease has run out.
+
+LEASE_TTL = float(os.environ.get("LEASE_TTL", 120))
+
+_held = set() # names of the leases this process holds
+_held_lock = threading.Lock()
+
+def process_id() -> str:
+    """This process as a lease holder. Not cached, so forked workers get their own."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def acquire(name: str, holder: str = None, ttl: float = LEASE_TTL, session_factory=None) -> bool:
+    """
+    Takes lease `name` for `holder` (default: this process) if it is free or
+    expired, or renews it if `holder` already has it, until now + ttl.
+    Returns whether `holder` holds it.
+    """
+    holder = holder or process_id()
+    session_factory = session_factory or database.SessionLocal
+    Lease = models.Lease
+    now = datetime.datetime.utcnow()
+    expires = now + datetime.timedelta(seconds=ttl)
+
+    db = session_factory()
+    try:
+        taken = db.execute(
+            update(Lease).where(
+                Lease.name == name,
+                or_(Lease.holder == holder, Lease.expires_at < now)
+            ).values(
+                acquired_at=case((Lease.holder == holder, Lease.acquired_at), else_=now),
+                holder=holder,
+                expires_at=expires
+            )
+        ).rowcount
+        if not taken:
+            insert = database.dialect_insert(db)
+            db.execute(
+                insert(Lease).values(name=name, holder=holder, acquired_at=now, expires_at=expires)
+                .on_conflict_do_nothing(index_elements=["name"])
+            )
+            # rowcount is not reliable for ON CONFLICT DO NOTHING across drivers, so read the winner back
+            taken = db.query(Lease.holder).filter(Lease.name == name).scalar() == holder
+        db.commit()
+    finally:
+        db.close()
+
+    with _held_lock:
+        (_held.add if taken else _held.discard)(name)
+    return bool(taken)
+
+def release(name: str, holder: str = None, session_factory=None):
+    """Gives up lease `name` if `holder` (default: this process) has it."""
+    holder = holder or process_id()
+    session_factory = session_factory or database.SessionLocal
+    db = session_factory()
+    try:
+        db.execute(delete(models.Lease).where(models.Lease.name == name, models.Lease.holder == holder))
+        db.commit()
+    finally:
+        db.close()
+    with _held_lock:
+        _held.discard(name)
+
+def held() -> dict:
+    with _held_lock:
+        return {(name,): 1 for name in _held}
+
+metrics.gauge("leases_held", "Leases held by this worker process (1 per lease name).", held, ("name",))
@@ -0,0 +1,431 @@
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+import datetime
+import os
+import threading
+import time
+
+import database
+import models
+from utils import leases
+from utils import metrics
+
+# Outbound customer messaging. Requests only insert a row into the `outbox`
+# table; a single OutboxWorker thread drains it through a pluggable
+# transport, so API latency never depends on message delivery. With several
+# worker processes, only the one holding the "outbox" lease sends. A row
+# being sent records its sender, which renews the lease and its claim right
+# before sending and does not send if either has been lost; a new leader only
+# retries rows whose claim has gone unrenewed for a lease's lifetime.
+
+# Transport used by the worker: "whatsapp_web" (desktop automation) or "fake"
+MESSAGE_TRANSPORT = os.environ.get("MESSAGE_TRANSPORT", "whatsapp_web")
+
+# Minimum seconds between two sends
+OUTBOX_SEND_INTERVAL = float(os.environ.get("OUTBOX_SEND_INTERVAL", 5))
+
+# Retry with exponential backoff: base * 2^(attempt - 1), capped
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_BASE = float(os.environ.get("OUTBOX_RETRY_BASE", 30))
+OUTBOX_RETRY_MAX = float(os.environ.get("OUTBOX_RETRY_MAX", 3600))
+
+# How often the worker polls when it is not woken by an enqueue. Also how
+# often the other worker processes check whether the outbox lease is free,
+# so it must stay well below LEASE_TTL.
+OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", 30))
+
+OUTBOX_LEASE = "outbox"
+
+def invoice_message(bill) -> str:
+    return f"Dear Mr/Mrs {bill.customer_name}, here is your invoice for Rs {bill.total_amount}. Thanks for shopping with us. We hope this saree adds beauty to your special moments (Bill ID: {bill.id})"
+
+# --- TRANSPORTS ---
+
+class Transport:
+    """Delivers one message. Must raise on failure so the outbox can retry."""
+    name = "base"
+
+    def send(self, phone: str, message: str, image_path: str = None):
+        raise NotImplementedError
+
+class FakeTransport(Transport):
+    """Records messages in memory instead of sending them. For tests and local development."""
+    name = "fake"
+
+    def __init__(self):
+        self.sent = []
+        self.fail_next = 0
+
+    def send(self, phone: str, message: str, image_path: str = None):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RuntimeError("Fake transport failure")
+        self.sent.append({"phone": phone, "message": message, "image_path": image_path})
+
+class WhatsAppWebTransport(Transport):
+    """
+    Sends through WhatsApp Web on the shop PC by driving the browser:
+    the invoice is put on the clipboard, pasted into the chat and sent.
+    Windows only (pyautogui, win32clipboard, PowerShell).
+    """
+    name = "whatsapp_web"
+
+    def focus_whatsapp_window(self):
+        """
+        Attempts to bring the WhatsApp Web browser window to the foreground using PowerShell.
+        Checks for common browser processes with 'WhatsApp' in the title.
+        """
+        import subprocess
+
+        try:
+            print("Attempting to focus WhatsApp window...")
+            ps_script = """
+            $w = New-Object -ComObject WScript.Shell
+            $proc = Get-Process | Where-Object { $_.MainWindowTitle -like '*WhatsApp*' } | Select-Object -First 1
+            if ($proc) {
+                $w.AppActivate($proc.Id)
+                Write-Output "FOCUSED_PID:$($proc.Id)"
+            } else {
+                Write-Output "WhatsApp window not found"
+            }
+            """
+            result = subprocess.run(["powershell", "-Command", ps_script], capture_output=True, text=True)
+            output = result.stdout.strip()
+            print(f"Focus Result: {output}")
+
+            if "FOCUSED_PID" in output:
+                time.sleep(1) # Allow transition
+                return True
+            return False
+        except Exception as e:
+            print(f"Focus Script Error: {e}")
+            return False
+
+    def send(self, phone: str, message: str, image_path: str = None):
+        import webbrowser
+        import pyautogui
+        import win32clipboard
+        from PIL import Image
+        from io import BytesIO
+        from urllib.parse import quote
+
+        # Phone must have country code. Standardizing to +91 if missing
+        phone = phone.strip()
+        if not phone.startswith("+"):
+            phone = "+91" + phone
+
+        # Clean phone (remove + for whatsapp url usually expects digits, but + works too mostly.
+        # Standard: https://web.whatsapp.com/send?phone=919611...
+        phone_digits = phone.replace("+", "").replace(" ", "")
+
+        if not image_path or not os.path.exists(image_path):
+            raise RuntimeError("No invoice image to send")
+
+        # 1. Copy Image to Clipboard (Reliable Method)
+        # Failing here aborts the send: the message must carry the invoice
+        image = Image.open(os.path.abspath(image_path))
+        output = BytesIO()
+        image.convert("RGB").save(output, "BMP")
+        data = output.getvalue()[14:]
+        output.close()
+
+        win32clipboard.OpenClipboard()
+        try:
+            win32clipboard.EmptyClipboard()
+            win32clipboard.SetClipboardData(win32clipboard.CF_DIB, data)
+        finally:
+            win32clipboard.CloseClipboard()
+        print("Image copied to clipboard.")
+
+        # 2. Open WhatsApp Web
+        # Encode message
+        encoded_message = quote(message)
+        url = f"https://web.whatsapp.com/send?phone={phone_digits}&text={encoded_message}"
+
+        print(f"Opening WhatsApp for {phone}...")
+        webbrowser.open(url)
+
+        # 3. Wait for Load (Critical Step)
+        # 20 seconds to be safe for network
+        time.sleep(20)
+
+        # 4. Paste Image
+        print("Pasting image...")
+
+        # FORCE FOCUS BEFORE PASTING
+        self.focus_whatsapp_window()
+
+        # Click to ensure focus on the message box
+        # We assume the chat box is focused by default on load, but a click helps.
+        # Clicking center of screen usually hits the chat window or background (safe)
+        try:
+            width, height = pyautogui.size()
+            pyautogui.click(width / 2, height / 2)
+        except:
+            pass
+
+        time.sleep(1)
+        pyautogui.hotkey('ctrl', 'v')
+
+        # 5. Wait for Image Preview
+        time.sleep(3)
+
+        # 6. Send
+        print("Sending...")
+        pyautogui.press('enter')
+
+        # 7. Close Tab (Safely)
+        time.sleep(8)
+
+        print("Attempting to close WhatsApp tab...")
+        # Verify focus AGAIN before closing
+        if self.focus_whatsapp_window():
+            print("WhatsApp verified in focus. Closing tab...")
+            pyautogui.hotkey('ctrl', 'w')
+        else:
+            print("WARNING: Could not verify WhatsApp focus. SKIPPING CLOSE to protect other tabs.")
+
+TRANSPORTS = {
+    WhatsAppWebTransport.name: WhatsAppWebTransport,
+    FakeTransport.name: FakeTransport,
+}
+
+def get_transport(name: str = MESSAGE_TRANSPORT) -> Transport:
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown message transport: {name}")
+    return TRANSPORTS[name]()
+
+# --- OUTBOX ---
+
+def enqueue(db, bill, channel: str = "whatsapp"):
+    """
+    Adds the invoice message for `bill` to the outbox inside the caller's
+    transaction and returns the row. If the bill already has a message on
+    this channel, that row is returned instead; a failed one is re-armed.
+    """
+    existing = db.query(models.OutboundMessage).filter(
+        models.OutboundMessage.bill_id == bill.id,
+        models.OutboundMessage.channel == channel
+    ).first()
+    if existing is not None:
+        if existing.status == "failed":
+            existing.status = "pending"
+            existing.attempts = 0
+            existing.next_attempt_at = datetime.datetime.utcnow()
+        return existing
+
+    message = models.OutboundMessage(
+        bill_id=bill.id,
+        channel=channel,
+        phone=bill.customer_phone,
+        message=invoice_message(bill),
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.datetime.utcnow()
+    )
+    try:
+        # Savepoint, so losing a race on the unique key keeps the caller's transaction
+        with db.begin_nested():
+            db.add(message)
+    except IntegrityError:
+        return db.query(models.OutboundMessage).filter(
+            models.OutboundMessage.bill_id == bill.id,
+            models.OutboundMessage.channel == channel
+        ).one()
+    return message
+
+def retry_delay(attempts: int) -> float:
+    return min(OUTBOX_RETRY_BASE * (2 ** (attempts - 1)), OUTBOX_RETRY_MAX)
+
+class OutboxWorker:
+    """
+    Single background thread that drains due outbox rows one at a time,
+    at most one send per OUTBOX_SEND_INTERVAL seconds. Every process starts
+    one, but only the holder of the outbox lease sends; the others wait to
+    take over if it goes away.
+    """
+
+    def __init__(self, transport: Transport = None, session_factory=None):
+        self.transport = transport
+        self.session_factory = session_factory or database.SessionLocal
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._leader = False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if self.transport is None:
+            self.transport = get_transport()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._leader:
+            self._leader = False
+            try:
+                leases.release(OUTBOX_LEASE, session_factory=self.session_factory)
+            except Exception as e:
+                print(f"Outbox Worker Error: {e}")
+
+    def _lead(self) -> bool:
+        """Takes or renews the outbox lease; while held, retries rows a dead or stuck sender left in "sending"."""
+        leader = leases.acquire(OUTBOX_LEASE, session_factory=self.session_factory)
+        if leader:
+            Message = models.OutboundMessage
+            # This thread sends nothing while it is here, so no live claim of this process is stale
+            stale = datetime.datetime.utcnow() - datetime.timedelta(seconds=leases.LEASE_TTL)
+            db = self.session_factory()
+            try:
+                db.query(Message).filter(
+                    Message.status == "sending",
+                    or_(Message.claimed_at.is_(None), Message.claimed_at < stale)
+                ).update({"status": "pending", "claimed_by": None, "claimed_at": None}, synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+        self._leader = leader
+        return leader
+
+    def _keep_claim(self, message_id: int) -> bool:
+        """
+        Renews the outbox lease and this process's claim on the row right before
+        it is sent. Returns False, and hands the row back to the new leader,
+        when the lease has gone to another process; False too when the row is
+        no longer this process's claim. Either way it must not be sent from here.
+        """
+        Message = models.OutboundMessage
+        ours = (Message.id == message_id, Message.status == "sending", Message.claimed_by == leases.process_id())
+        leader = leases.acquire(OUTBOX_LEASE, session_factory=self.session_factory)
+        db = self.session_factory()
+        try:
+            if leader:
+                kept = db.query(Message).filter(*ours).update(
+                    {"claimed_at": datetime.datetime.utcnow()}, synchronize_session=False
+                )
+            else:
+                kept = 0
+                db.query(Message).filter(*ours).update(
+                    {"status": "pending", "claimed_by": None, "claimed_at": None}, synchronize_session=False
+                )
+            db.commit()
+        finally:
+            db.close()
+        self._leader = leader
+        return bool(kept)
+
+    def notify(self):
+        """Wakes the worker after an enqueue instead of waiting for the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self._lead() and self.process_next()
+            except Exception as e:
+                print(f"Outbox Worker Error: {e}")
+                sent = False
+
+            if sent:
+                self._stop.wait(OUTBOX_SEND_INTERVAL)
+            else:
+                self._wake.wait(OUTBOX_POLL_INTERVAL)
+                self._wake.clear()
+
+    def _claim(self, db):
+        now = datetime.datetime.utcnow()
+        message = db.query(models.OutboundMessage).filter(
+            models.OutboundMessage.status == "pending",
+            models.OutboundMessage.next_attempt_at <= now
+        ).order_by(models.OutboundMessage.next_attempt_at, models.OutboundMessage.id).first()
+        if message is None:
+            return None
+        # Conditional, so a message is only ever claimed once even if two senders overlap
+        claimed = db.query(models.OutboundMessage).filter(
+            models.OutboundMessage.id == message.id,
+            models.OutboundMessage.status == "pending"
+        ).update(
+            {
+                "status": "sending",
+                "attempts": models.OutboundMessage.attempts + 1,
+                "claimed_by": leases.process_id(),
+                "claimed_at": now,
+            },
+            synchronize_session=False
+        )
+        db.commit()
+        if not claimed:
+            return None
+        db.refresh(message)
+        return message
+
+    def process_next(self) -> bool:
+        """Sends the next due message, if any. Returns True when one was attempted."""
+        from sqlalchemy.orm import selectinload
+        from utils.render_pool import render_service, bill_to_data
+
+        db = self.session_factory()
+        try:
+            message = self._claim(db)
+            if message is None:
+                return False
+
+            try:
+                bill = db.query(models.Bill).options(selectinload(models.Bill.items)).filter(
+                    models.Bill.id == message.bill_id
+                ).first()
+                if bill is None:
+                    raise RuntimeError("Bill no longer exists")
+                image_path = render_service.render(bill_to_data(bill))
+                # The render may have waited a long time for a free slot
+                if not self._keep_claim(message.id):
+                    print(f"Outbox message {message.id} not sent: another process has taken over sending it")
+                    return False
+                self.transport.send(message.phone, message.message, image_path)
+            except Exception as e:
+                print(f"Outbox Send Error (message {message.id}, attempt {message.attempts}): {e}")
+                message.last_error = str(e)
+                if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    message.status = "failed"
+                else:
+                    message.status = "pending"
+                    message.next_attempt_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=retry_delay(message.attempts))
+            else:
+                # Renewed before recording the send, so no other process takes over in between
+                leases.acquire(OUTBOX_LEASE, session_factory=self.session_factory)
+                message.status = "sent"
+                message.sent_at = datetime.datetime.utcnow()
+                message.last_error = None
+            message.claimed_by = None
+            message.claimed_at = None
+            message_id = message.id
+            try:
+                db.commit()
+            except StaleDataError:
+                # The row went while sending, with its bill (archived or cleaned up)
+                db.rollback()
+                print(f"Outbox message {message_id} was deleted while it was being sent")
+            return True
+        finally:
+            db.close()
+
+outbox_worker = OutboxWorker()
+
+def outbox_depth() -> dict:
+    from sqlalchemy import func
+
+    db = database.SessionLocal()
+    try:
+        Message = models.OutboundMessage
+        return {(status,): count for status, count in db.query(Message.status, func.count(Message.id)).group_by(Message.status)}
+    finally:
+        db.close()
+
+metrics.gauge("outbox_messages", "Outbox messages per status; pending is the delivery queue depth.", outbox_depth, ("status",))
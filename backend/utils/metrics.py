@@ -0,0 +1,229 @@
+from bisect import bisect_left
+import os
+import threading
+import time
+
+# Process-local metrics, served by GET /metrics in the Prometheus text format.
+# Counters and histograms are plain dicts behind a lock per metric, updated
+# inline on the hot path (a perf_counter pair, a bisect and a dict update);
+# gauges are callbacks evaluated only when /metrics is scraped.
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_BUCKETS = (0.0002, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {} # labels -> [count per bucket..., count above the last bucket, sum]
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[index] += 1
+            row[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: list(row) for labels, row in self._values.items()}
+        for labels, row in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(row[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read, labelnames=()):
+        """`read()` returns a number, or a {label values tuple: number} dict when labelnames are given."""
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.read = read
+
+    def samples(self):
+        try:
+            value = self.read()
+        except Exception as e:
+            print(f"Metrics Error ({self.name}): {e}")
+            return
+        values = value if self.labelnames else {(): value}
+        for labels, number in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(number)}"
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, read, labelnames=()) -> Gauge:
+        with self._lock:
+            # Re-registering replaces the callback (e.g. a service recreated in a test or benchmark)
+            metric = self._metrics[name] = Gauge(name, help, read, labelnames)
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+counter = registry.counter
+histogram = registry.histogram
+gauge = registry.gauge
+
+# --- HTTP ---
+
+http_request_seconds = histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte, per route.", ("method", "route")
+)
+http_requests = counter("http_requests_total", "Requests answered, per route and status code.", ("method", "route", "status"))
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request by its route template (e.g. /bills/{bill_id})."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot blow up the series count
+            template = getattr(route, "path", None) or "unmatched"
+            http_request_seconds.observe(time.perf_counter() - started, scope["method"], template)
+            http_requests.inc(scope["method"], template, str(status))
+
+# --- DATABASE ---
+
+sql_statement_seconds = histogram(
+    "db_statement_duration_seconds",
+    "Time spent executing SQL statements (includes SQLite busy waits), per engine and statement kind.",
+    ("engine", "kind"),
+    SQL_BUCKETS
+)
+sql_errors = counter("db_statement_errors_total", "SQL statements that raised, per engine.", ("engine",))
+pool_wait_seconds = histogram(
+    "db_pool_wait_seconds",
+    "Time to get a connection from the pool, including opening a new one.",
+    ("engine",),
+    SQL_BUCKETS
+)
+
+SQL_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "BEGIN", "CREATE", "ALTER", "DROP"}
+
+def statement_kind(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    kind = head[0].upper() if head else ""
+    return kind if kind in SQL_KINDS else "OTHER"
+
+def instrument_engine(engine, label: str):
+    """Times every statement run on a (sync) Engine through its cursor events."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        sql_statement_seconds.observe(time.perf_counter() - started, label, statement_kind(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        stack = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+        sql_errors.inc(label)
+
+def timed_pool(pool_class, label: str):
+    """Subclass of `pool_class` whose connect() records the wait in db_pool_wait_seconds."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return pool_class.connect(self)
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - started, label)
+
+    return type(f"Timed{pool_class.__name__}", (pool_class,), {"connect": connect})
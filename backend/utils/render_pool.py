@@ -0,0 +1,299 @@
+from concurrent.futures import ProcessPoolExecutor, Future, CancelledError
+from collections import OrderedDict
+from types import SimpleNamespace
+import datetime
+import os
+import threading
+import time
+
+from utils import metrics
+
+# Invoice rendering runs in a pool of worker processes so that Pillow work
+# never competes with request handling for the API process's threads/GIL.
+# Work is handed over as plain dicts (no ORM objects cross the process boundary).
+
+# Every worker process serving the app has its own pool, so by default the
+# CPUs are shared out between them (WEB_CONCURRENCY, as in database.py)
+WEB_CONCURRENCY = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+RENDER_WORKERS = int(os.environ.get("INVOICE_RENDER_WORKERS", 0)) or max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)
+
+# Renders submitted to the pool but not yet finished; beyond this, single
+# requests are rejected and bulk jobs wait for a free slot.
+RENDER_QUEUE_SIZE = int(os.environ.get("INVOICE_RENDER_QUEUE_SIZE", 64))
+
+# Finished jobs kept around for status queries (in this process; any process
+# can read the jobs that are published to the jobs table)
+MAX_TRACKED_JOBS = 500
+
+# Seconds between writes of a published job's progress to the jobs table
+JOB_SAVE_INTERVAL = float(os.environ.get("RENDER_JOB_SAVE_INTERVAL", 2))
+
+JOB_KIND = "render"
+
+render_seconds = metrics.histogram(
+    "invoice_render_duration_seconds",
+    "Invoice render time per stage: render (drawing), encode (writing the PNG), variants (thumbnail and other formats), total (submit to done, including the wait for a worker).",
+    ("stage",)
+)
+renders = metrics.counter("invoice_renders_total", "Invoice renders finished, by result (rendered, cached, failed).", ("result",))
+
+class RenderQueueFull(Exception):
+    pass
+
+def bill_to_data(bill) -> dict:
+    """Snapshot of the bill fields the invoice needs, safe to pickle to a worker."""
+    date = bill.date
+    return {
+        "id": bill.id,
+        "customer_name": bill.customer_name,
+        "customer_phone": bill.customer_phone,
+        "date": date.isoformat() if hasattr(date, "isoformat") else date,
+        "total_amount": bill.total_amount,
+        "items": [
+            {
+                "item_name": item.item_name,
+                "price": item.price,
+                "quantity": item.quantity,
+                "discount": getattr(item, "discount", 0) or 0,
+                "item_total": item.item_total,
+            }
+            for item in bill.items
+        ],
+    }
+
+def data_to_bill(data: dict):
+    """Attribute-style view of bill_to_data output, as create_invoice_image expects."""
+    date = data["date"]
+    if isinstance(date, str):
+        date = datetime.datetime.fromisoformat(date)
+    return SimpleNamespace(
+        id=data["id"],
+        customer_name=data["customer_name"],
+        customer_phone=data["customer_phone"],
+        date=date,
+        total_amount=data["total_amount"],
+        items=[SimpleNamespace(**item) for item in data["items"]],
+    )
+
+def render_bill_data(data: dict, variants: tuple = ()) -> tuple:
+    """
+    Runs inside a worker process. Returns (invoice path, stage timings) or
+    raises; the timings are empty when the existing files were still current.
+    `variants` are written on top of the default ones (the thumbnail).
+    """
+    from utils import invoice_encode
+    from utils.invoice_gen import create_invoice_image
+
+    timings = {}
+    variants = tuple(dict.fromkeys(invoice_encode.DEFAULT_VARIANTS + tuple(variants)))
+    path, _ = create_invoice_image(data_to_bill(data), timings, variants)
+    if not path:
+        raise RuntimeError(f"Invoice rendering failed for bill {data['id']}")
+    return path, timings
+
+class RenderJob:
+    def __init__(self, job_id: str, total: int = 0):
+        self.id = job_id
+        self.status = "queued"
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.errors = {}
+        self.created_at = datetime.datetime.now()
+        self.finished_at = None
+        self._feeding = False
+        self._done = threading.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+class RenderService:
+    """
+    ProcessPoolExecutor-backed invoice renderer with a bounded number of
+    in-flight renders and queryable job status.
+    """
+
+    def __init__(self, workers: int = RENDER_WORKERS, queue_size: int = RENDER_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app does not spawn processes
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _new_job(self, total: int) -> RenderJob:
+        from utils import jobs
+
+        with self._lock:
+            job = RenderJob(jobs.new_id("r"), total)
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.finished_at is None:
+                    break
+                self._jobs.popitem(last=False)
+            return job
+
+    def _submit(self, job: RenderJob, data: dict, variants: tuple = ()) -> Future:
+        """Hands `data` to the pool; the returned future resolves to the invoice path."""
+        with self._lock:
+            self._pending += 1
+            job.status = "running"
+        result = Future()
+        result.set_running_or_notify_cancel()
+        submitted = time.perf_counter()
+        try:
+            future = self._pool().submit(render_bill_data, data, variants)
+        except Exception as e:
+            self._slots.release()
+            with self._lock:
+                self._pending -= 1
+                job.failed += 1
+                job.errors[data["id"]] = str(e)
+                self._finish_if_done(job)
+            raise
+        future.add_done_callback(lambda f, bill_id=data["id"]: self._on_done(job, bill_id, f, result, submitted))
+        return result
+
+    def _on_done(self, job: RenderJob, bill_id: int, future, result: Future, submitted: float):
+        self._slots.release()
+        error = CancelledError() if future.cancelled() else future.exception()
+        with self._lock:
+            self._pending -= 1
+            if error is None:
+                job.completed += 1
+            else:
+                job.failed += 1
+                job.errors[bill_id] = str(error)
+            self._finish_if_done(job)
+
+        if error is not None:
+            renders.inc("failed")
+            result.set_exception(error)
+            return
+        path, timings = future.result()
+        render_seconds.observe(time.perf_counter() - submitted, "total")
+        for stage, seconds in timings.items():
+            render_seconds.observe(seconds, stage)
+        renders.inc("rendered" if timings else "cached")
+        result.set_result(path)
+
+    def _finish_if_done(self, job: RenderJob):
+        if not job._feeding and job.completed + job.failed >= job.total:
+            job.status = "failed" if job.failed and not job.completed else "done"
+            job.finished_at = datetime.datetime.now()
+            job._done.set()
+
+    def submit(self, data: dict, variants: tuple = ()):
+        """
+        Queues one bill for rendering (plus the named invoice_encode variants) without blocking.
+        Returns (job, future); raises RenderQueueFull when the pool is saturated.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise RenderQueueFull()
+        job = self._new_job(1)
+        return job, self._submit(job, data, variants)
+
+    def submit_many(self, bills) -> RenderJob:
+        """
+        Renders every bill yielded by `bills` (an iterable of bill_to_data dicts,
+        consumed lazily on a feeder thread). The feeder blocks while the pool
+        is saturated, so a large range never floods memory or the queue.
+        """
+        job = self._new_job(0)
+        job._feeding = True
+        self.publish(job)
+
+        def feed():
+            try:
+                for data in bills:
+                    self._slots.acquire()
+                    with self._lock:
+                        job.total += 1
+                    self._submit(job, data)
+            except Exception as e:
+                print(f"Render Feeder Error: {e}")
+                with self._lock:
+                    job.errors["feeder"] = str(e)
+            finally:
+                with self._lock:
+                    job._feeding = False
+                    self._finish_if_done(job)
+
+        threading.Thread(target=feed, name=f"render-feeder-{job.id}", daemon=True).start()
+        return job
+
+    def render(self, data: dict, timeout: float = None) -> str:
+        """Renders one bill in the pool and waits for its path (blocking for a free slot)."""
+        self._slots.acquire()
+        job = self._new_job(1)
+        return self._submit(job, data).result(timeout=timeout)
+
+    def publish(self, job: RenderJob):
+        """
+        Writes the job's status to the jobs table now and every
+        JOB_SAVE_INTERVAL seconds until it has finished, so it can be polled
+        from any worker process. The writes happen on a thread of the job's
+        own, never in the pool's result callbacks.
+        """
+        from utils import jobs
+
+        def save() -> bool:
+            with self._lock:
+                state = job.to_dict()
+            try:
+                jobs.save(JOB_KIND, state)
+            except Exception as e:
+                print(f"Render Job Status Error ({job.id}): {e}")
+            return state["finished_at"] is not None
+
+        if save():
+            return
+
+        def loop():
+            while not job._done.wait(JOB_SAVE_INTERVAL):
+                save()
+            save()
+
+        threading.Thread(target=loop, name=f"render-status-{job.id}", daemon=True).start()
+
+    def get_job(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return job.to_dict()
+        # Running in another worker process, or no longer kept in this one
+        from utils import jobs
+
+        return jobs.load(JOB_KIND, job_id)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+render_service = RenderService()
+
+metrics.gauge("invoice_render_queue_depth", "Invoice renders submitted to the pool and not yet finished.", lambda: render_service.pending)
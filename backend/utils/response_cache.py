@@ -0,0 +1,198 @@
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from pydantic_core import to_jsonable_python
+import hashlib
+import orjson
+import os
+import tempfile
+import threading
+import time
+
+import database
+from utils import metrics
+
+# In-process cache of serialized JSON responses for the read-heavy bill
+# endpoints. Entries are keyed by path + normalized query string and tagged
+# with the generation they were computed under; every write to bills bumps
+# the generation, which invalidates all entries at once. Responses carry an
+# ETag of their body, so a client revalidating with If-None-Match gets a 304.
+#
+# Each worker process has its own cache. So that a write in one worker also
+# invalidates the others, bump() sets the modification time of a stamp file
+# they share, and entries cached under an older stamp count as stale (one
+# stat() per lookup). Workers on different hosts need a shared path here.
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 256))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 60))
+RESPONSE_CACHE_STAMP = os.environ.get("RESPONSE_CACHE_STAMP") or os.path.join(
+    tempfile.gettempdir(),
+    f"billing_cache_{hashlib.sha256(database.SQLALCHEMY_DATABASE_URL.encode()).hexdigest()[:16]}.stamp"
+)
+
+# Response headers set by endpoints that must be replayed from the cache
+CACHED_HEADERS = ("X-Next-Cursor",)
+
+@lru_cache(maxsize=None)
+def adapter_for(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+def dumps(data) -> bytes:
+    """
+    JSON bytes of plain data (dicts, lists, datetimes, ...) via orjson. Types
+    orjson doesn't know fall back to pydantic's encoding, so the output
+    matches what FastAPI's default encoder would have produced.
+    """
+    return orjson.dumps(data, default=to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
+
+def json_response(data, **kwargs) -> Response:
+    return Response(content=dumps(data), media_type="application/json", **kwargs)
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers", "generation", "expires")
+
+    def __init__(self, body: bytes, headers: dict, generation: tuple, expires: float):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.headers = headers
+        self.generation = generation
+        self.expires = expires
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+class ResponseCache:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL, stamp_path: str = RESPONSE_CACHE_STAMP):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stamp_path = stamp_path
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @property
+    def generation(self) -> tuple:
+        """(local generation, shared stamp): entries computed under any other value are stale."""
+        return self._generation, self._stamp()
+
+    def _stamp(self) -> int:
+        try:
+            return os.stat(self.stamp_path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def bump(self):
+        """Invalidates every cached response, in all worker processes. Call after a write to bills has committed."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+        now = time.time_ns()
+        try:
+            with open(self.stamp_path, "a"):
+                pass
+            os.utime(self.stamp_path, ns=(now, now))
+        except OSError as e:
+            print(f"Response Cache Error: {e}")
+
+    def key(self, request: Request) -> str:
+        params = sorted((name, value) for name, value in request.query_params.multi_items() if value != "")
+        return f"{request.url.path}?{urlencode(params)}"
+
+    def _get(self, key: str):
+        stamp = self._stamp()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.generation == (self._generation, stamp) and entry.expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, result, response: Response, response_model, generation: tuple) -> CachedResponse:
+        if isinstance(result, Response):
+            raise TypeError("Cached endpoints must return data, not a Response")
+        if response_model is not None:
+            adapter = adapter_for(response_model)
+            body = adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+        else:
+            # Plain data, e.g. the bill dicts from utils/bill_rows.py
+            body = dumps(result)
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        entry = CachedResponse(body, headers, generation, time.monotonic() + self.ttl)
+        stamp = self._stamp()
+        with self._lock:
+            # A write that committed while this was computed makes it stale: serve it once, don't keep it
+            if generation == (self._generation, stamp):
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _respond(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **entry.headers}
+        if etag_matches(request, entry.etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def respond(self, request: Request, compute, response_model=None) -> Response:
+        """
+        Serves the cached response for this request, or calls compute(response)
+        and caches its serialized result: validated through `response_model`
+        when given, otherwise dumped as is with orjson. `response` collects headers such as
+        X-Next-Cursor that should be cached along with the body.
+        """
+        key = self.key(request)
+        entry = self._get(key)
+        if entry is None:
+            generation = self.generation
+            response = Response()
+            entry = self._store(key, compute(response), response, response_model, generation)
+        return self._respond(request, entry)
+
+    async def respond_async(self, request: Request, compute, response_model=None) -> Response:
+        """respond() for async handlers: compute(response) returns an awaitable."""
+        key = self.key(request)
+        entry = self._get(key)
+        if entry is None:
+            generation = self.generation
+            response = Response()
+            entry = self._store(key, await compute(response), response, response_model, generation)
+        return self._respond(request, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+response_cache = ResponseCache()
+
+metrics.gauge("response_cache_entries", "Responses currently cached.", lambda: response_cache.stats()["entries"])
+metrics.gauge(
+    "response_cache_lookups", "Response cache lookups since start, by outcome (hit, miss, not_modified).",
+    lambda: {(outcome,): response_cache.stats()[key] for outcome, key in (("hit", "hits"), ("miss", "misses"), ("not_modified", "not_modified"))},
+    ("outcome",)
+)
@@ -0,0 +1,224 @@
+from sqlalchemy import and_, select
+import datetime
+import os
+import re
+import threading
+
+import database
+import models
+from utils import jobs
+from utils import leases
+from utils import metrics
+from utils import rollups
+from utils.invoice_gen import INVOICES_DIR
+from utils.response_cache import response_cache
+
+# Retention cleanup. Old bills are deleted in id-ordered chunks with bulk
+# DELETEs (items and outbox rows first, then the bills), each chunk in its own
+# short transaction, so the write lock is released between chunks and memory
+# stays flat. Invoice files go in one sweep of the invoices directory at the end.
+# A lease keeps it to one cleanup at a time across all worker processes, and
+# job status goes to the jobs table so any of them can answer a poll.
+
+CLEANUP_CHUNK_SIZE = int(os.environ.get("CLEANUP_CHUNK_SIZE", 500))
+
+# Scheduled cleanup: keep this many days of bills, checking every N hours. Off when unset.
+CLEANUP_RETENTION_DAYS = int(os.environ.get("CLEANUP_RETENTION_DAYS", 0))
+CLEANUP_INTERVAL_HOURS = float(os.environ.get("CLEANUP_INTERVAL_HOURS", 24))
+
+# Held while a cleanup runs, and by the worker whose schedule fired for the
+# current interval (so the other workers' schedules skip it)
+CLEANUP_LEASE = "cleanup"
+CLEANUP_SCHEDULE_LEASE = "cleanup-schedule"
+
+JOB_KIND = "cleanup"
+
+# invoice_<id>.png, invoice_<id>.pdf and any variant such as invoice_<id>_thumb.webp
+INVOICE_FILE_RE = re.compile(r"^invoice_(\d+)(?:_[a-z]+)?\.[a-z]+$")
+
+def cutoff_for(retention_days: int) -> datetime.datetime:
+    return datetime.datetime.now() - datetime.timedelta(days=retention_days)
+
+class CleanupJob:
+    def __init__(self, job_id: str, cutoff: datetime.datetime, dry_run: bool = False):
+        self.id = job_id
+        self.cutoff = cutoff
+        self.dry_run = dry_run
+        self.status = "queued"
+        self.total_bills = 0
+        self.deleted_bills = 0
+        self.deleted_items = 0
+        self.deleted_images = 0
+        self.chunks = 0
+        self.error = None
+        self.created_at = datetime.datetime.now()
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "dry_run": self.dry_run,
+            "cutoff": self.cutoff.isoformat(),
+            "total_bills": self.total_bills,
+            "deleted_bills": self.deleted_bills,
+            "deleted_items": self.deleted_items,
+            "deleted_images": self.deleted_images,
+            "chunks": self.chunks,
+            "progress": round(self.deleted_bills / self.total_bills, 3) if self.total_bills else 1.0,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def save(self, session_factory=None):
+        """Writes the status to the jobs table. A failed write is only logged, the cleanup goes on."""
+        try:
+            jobs.save(JOB_KIND, self.to_dict(), session_factory)
+        except Exception as e:
+            print(f"Cleanup Job Status Error ({self.id}): {e}")
+
+def sweep_invoice_files(bill_ids: set, dry_run: bool = False) -> int:
+    """Removes (or, for a dry run, counts) invoice files of the given bills in one directory scan."""
+    if not bill_ids or not os.path.isdir(INVOICES_DIR):
+        return 0
+    removed = 0
+    with os.scandir(INVOICES_DIR) as entries:
+        for entry in entries:
+            match = INVOICE_FILE_RE.match(entry.name)
+            if not match or int(match.group(1)) not in bill_ids:
+                continue
+            if dry_run:
+                removed += 1
+                continue
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError as e:
+                print(f"Error deleting {entry.name}: {e}")
+    return removed
+
+def run_cleanup(job: CleanupJob, session_factory=None, chunk_size: int = CLEANUP_CHUNK_SIZE) -> CleanupJob:
+    """Runs `job` to completion on the calling thread, updating its counters as it goes."""
+    session_factory = session_factory or database.SessionLocal
+    Bill, BillItem, Message = models.Bill, models.BillItem, models.OutboundMessage
+    # Bills whose message the outbox worker is sending right now are left for the next cleanup
+    sending = select(Message.bill_id).where(Message.status == "sending")
+    old = and_(Bill.date < job.cutoff, Bill.id.not_in(sending))
+
+    holder = None
+    if not job.dry_run:
+        holder = f"{leases.process_id()}/{job.id}"
+        if not leases.acquire(CLEANUP_LEASE, holder, session_factory=session_factory):
+            job.status = "skipped"
+            job.error = "Another cleanup is already running"
+            job.finished_at = datetime.datetime.now()
+            job.save(session_factory)
+            return job
+
+    job.status = "running"
+    deleted_ids = set()
+    db = session_factory()
+    try:
+        job.total_bills = db.query(Bill.id).filter(old).count()
+        job.save(session_factory)
+        last_id = 0
+        while True:
+            ids = [row.id for row in db.query(Bill.id).filter(old, Bill.id > last_id).order_by(Bill.id).limit(chunk_size)]
+            if not ids:
+                break
+            last_id = ids[-1]
+            deleted_ids.update(ids)
+
+            # Ids are not in date order (bills can be back-dated), so the range keeps the date test
+            in_chunk = and_(Bill.id >= ids[0], Bill.id <= ids[-1], old)
+            chunk_ids = select(Bill.id).where(in_chunk)
+            if job.dry_run:
+                job.deleted_items += db.query(BillItem.id).filter(BillItem.bill_id.in_(chunk_ids)).count()
+            else:
+                rollups.record_query(db, in_chunk, sign=-1)
+                job.deleted_items += db.query(BillItem).filter(BillItem.bill_id.in_(chunk_ids)).delete(synchronize_session=False)
+                db.query(Message).filter(Message.bill_id.in_(chunk_ids)).delete(synchronize_session=False)
+                db.query(Bill).filter(in_chunk).delete(synchronize_session=False)
+                db.commit()
+                response_cache.bump()
+                # Renewed per chunk, so a long cleanup keeps it
+                if not leases.acquire(CLEANUP_LEASE, holder, session_factory=session_factory):
+                    raise RuntimeError("Lost the cleanup lease to another process")
+            job.deleted_bills += len(ids)
+            job.chunks += 1
+            job.save(session_factory)
+
+        job.deleted_images = sweep_invoice_files(deleted_ids, job.dry_run)
+        job.status = "done"
+    except Exception as e:
+        db.rollback()
+        print(f"Cleanup Error: {e}")
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        db.close()
+        if holder:
+            leases.release(CLEANUP_LEASE, holder, session_factory=session_factory)
+        job.finished_at = datetime.datetime.now()
+        job.save(session_factory)
+    return job
+
+class CleanupService:
+    """Runs cleanup jobs on background threads, optionally on a schedule."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = None
+        self._stop = threading.Event()
+        self._scheduler = None
+
+    def new_job(self, retention_days: int, dry_run: bool = False) -> CleanupJob:
+        job = CleanupJob(jobs.new_id("c"), cutoff_for(retention_days), dry_run)
+        job.save()
+        return job
+
+    def start(self, retention_days: int) -> CleanupJob:
+        """Starts a cleanup on a background thread; only one runs at a time."""
+        with self._lock:
+            if self._running and self._running.finished_at is None:
+                return self._running
+        job = self.new_job(retention_days)
+        with self._lock:
+            self._running = job
+        threading.Thread(target=run_cleanup, args=(job,), name=f"cleanup-{job.id}", daemon=True).start()
+        return job
+
+    def get_job(self, job_id: str):
+        # From the table, since the job may be running in another worker process
+        return jobs.load(JOB_KIND, job_id)
+
+    def start_schedule(self, retention_days: int = CLEANUP_RETENTION_DAYS, interval_hours: float = CLEANUP_INTERVAL_HOURS):
+        if retention_days <= 0 or (self._scheduler and self._scheduler.is_alive()):
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval_hours * 3600):
+                try:
+                    # Expires just before the next tick, so one worker's schedule runs per interval
+                    if not leases.acquire(CLEANUP_SCHEDULE_LEASE, ttl=interval_hours * 3600 * 0.9):
+                        continue
+                    job = self.start(retention_days)
+                    print(f"Scheduled cleanup started: job {job.id}, keeping {retention_days} days")
+                except Exception as e:
+                    print(f"Cleanup Scheduler Error: {e}")
+
+        self._scheduler = threading.Thread(target=loop, name="cleanup-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def stop_schedule(self):
+        self._stop.set()
+
+cleanup_service = CleanupService()
+
+def cleanup_running() -> int:
+    job = cleanup_service._running
+    return int(job is not None and job.finished_at is None)
+
+metrics.gauge("cleanup_job_running", "1 while a retention cleanup job is running.", cleanup_running)
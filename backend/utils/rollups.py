@@ -0,0 +1,214 @@
+from collections import defaultdict
+import datetime
+import sys
+
+from sqlalchemy import and_, or_, func, true
+
+import database
+import models
+
+# Server-side sales aggregates. Every write to bills also applies its delta
+# to sales_rollup / item_sales_rollup, at day and month grain, so stats for
+# any date range read a bounded number of rollup rows instead of scanning
+# bills and bill_items.
+
+GRAINS = ("day", "month")
+
+def period_start(grain: str, value) -> datetime.date:
+    day = value.date() if isinstance(value, datetime.datetime) else value
+    return day if grain == "day" else day.replace(day=1)
+
+def _upsert(db, model, keys, values, rows):
+    """Adds `values` of every row onto the existing rollup row, creating it if missing."""
+    stmt = database.dialect_insert(db)(model)
+    columns = model.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: columns[name] + stmt.excluded[name] for name in values}
+    )
+    db.execute(stmt, rows)
+
+class RollupDelta:
+    """Collects changes in memory so each rollup row is written once per transaction."""
+
+    def __init__(self):
+        self.sales = defaultdict(lambda: [0, 0.0, 0.0])
+        self.items = defaultdict(lambda: [0, 0, 0.0])
+        self.removes = False
+
+    def add_bill(self, date, status, payment_mode, total_amount, discount, sign: int = 1):
+        for grain in GRAINS:
+            row = self.sales[(grain, period_start(grain, date), status or "", payment_mode or "")]
+            row[0] += sign
+            row[1] += sign * (total_amount or 0)
+            row[2] += sign * (discount or 0)
+        self.removes = self.removes or sign < 0
+
+    def add_item(self, date, item_name, quantity, item_total, sign: int = 1):
+        for grain in GRAINS:
+            row = self.items[(grain, period_start(grain, date), item_name or "")]
+            row[0] += sign
+            row[1] += sign * (quantity or 0)
+            row[2] += sign * (item_total or 0)
+        self.removes = self.removes or sign < 0
+
+    def apply(self, db):
+        if self.sales:
+            _upsert(db, models.SalesRollup, ["grain", "period", "status", "payment_mode"], ["bill_count", "revenue", "discount"], [
+                {"grain": g, "period": p, "status": s, "payment_mode": m, "bill_count": c, "revenue": r, "discount": d}
+                for (g, p, s, m), (c, r, d) in self.sales.items()
+            ])
+        if self.items:
+            _upsert(db, models.ItemSalesRollup, ["grain", "period", "item_name"], ["line_count", "quantity", "revenue"], [
+                {"grain": g, "period": p, "item_name": name, "line_count": c, "quantity": q, "revenue": r}
+                for (g, p, name), (c, q, r) in self.items.items()
+            ])
+        if self.removes:
+            # Drop rows whose bills are all gone rather than keeping zero (or float-residue) totals
+            db.query(models.SalesRollup).filter(models.SalesRollup.bill_count <= 0).delete(synchronize_session=False)
+            db.query(models.ItemSalesRollup).filter(models.ItemSalesRollup.line_count <= 0).delete(synchronize_session=False)
+
+def record_bills(db, bills, sign: int = 1, items: bool = True):
+    """
+    Applies bill-like objects (with date, status, payment_mode, total_amount,
+    discount and items) to the rollups inside the caller's transaction.
+    Use sign=-1 to take them out again.
+    """
+    delta = RollupDelta()
+    for bill in bills:
+        delta.add_bill(bill.date, bill.status, bill.payment_mode, bill.total_amount, bill.discount, sign)
+        if items:
+            for item in bill.items:
+                delta.add_item(bill.date, item.item_name, item.quantity, item.item_total, sign)
+    delta.apply(db)
+
+def record_query(db, condition, sign: int = 1, chunk_size: int = 1000):
+    """
+    Applies every bill matching `condition` (a filter on models.Bill) to the
+    rollups. Reads plain column tuples in chunks, so it suits bulk deletes
+    and rebuilds over the whole table.
+    """
+    delta = RollupDelta()
+    bill_rows = db.query(
+        models.Bill.date, models.Bill.status, models.Bill.payment_mode, models.Bill.total_amount, models.Bill.discount
+    ).filter(condition).yield_per(chunk_size)
+    for row in bill_rows:
+        delta.add_bill(*row, sign=sign)
+
+    item_rows = db.query(
+        models.Bill.date, models.BillItem.item_name, models.BillItem.quantity, models.BillItem.item_total
+    ).join(models.BillItem.bill).filter(condition).yield_per(chunk_size)
+    for row in item_rows:
+        delta.add_item(*row, sign=sign)
+
+    delta.apply(db)
+
+def rebuild(db):
+    """Recomputes both rollup tables from bills and bill_items. Caller commits."""
+    db.query(models.SalesRollup).delete(synchronize_session=False)
+    db.query(models.ItemSalesRollup).delete(synchronize_session=False)
+    record_query(db, true())
+
+def ensure_rollups(engine):
+    """Backfills the rollups on startup when they are empty but bills exist (first run after upgrade)."""
+    from sqlalchemy.orm import Session
+
+    with Session(engine) as db:
+        if db.query(models.SalesRollup.grain).first() is None and db.query(models.Bill.id).first() is not None:
+            print("Building sales rollups from existing bills...")
+            rebuild(db)
+            db.commit()
+
+# --- QUERIES ---
+
+def _next_month(day: datetime.date) -> datetime.date:
+    return datetime.date(day.year + 1, 1, 1) if day.month == 12 else datetime.date(day.year, day.month + 1, 1)
+
+def range_condition(model, start: datetime.date = None, end: datetime.date = None):
+    """
+    Rollup rows covering the inclusive day range [start, end]: whole months
+    come from month rows, the partial months at either edge from day rows.
+    Open bounds extend to everything recorded.
+    """
+    end_excl = end + datetime.timedelta(days=1) if end else None
+    first_full = None if start is None else (start if start.day == 1 else _next_month(start))
+    last_full_end = None if end_excl is None else end_excl.replace(day=1)
+
+    def between(grain, lower, upper):
+        clauses = [model.grain == grain]
+        if lower is not None:
+            clauses.append(model.period >= lower)
+        if upper is not None:
+            clauses.append(model.period < upper)
+        return and_(*clauses)
+
+    if first_full is not None and last_full_end is not None and first_full >= last_full_end:
+        # No whole month in the range
+        return between("day", start, end_excl)
+
+    parts = [between("month", first_full, last_full_end)]
+    if start is not None and start < first_full:
+        parts.append(between("day", start, first_full))
+    if end_excl is not None and last_full_end < end_excl:
+        parts.append(between("day", last_full_end, end_excl))
+    return or_(*parts)
+
+def summarize(db, start: datetime.date = None, end: datetime.date = None, top: int = 5) -> dict:
+    """Revenue, bill count, average ticket, breakdowns and top items for [start, end]."""
+    sales = models.SalesRollup
+    rows = db.query(
+        sales.status, sales.payment_mode,
+        func.sum(sales.bill_count), func.sum(sales.revenue), func.sum(sales.discount)
+    ).filter(range_condition(sales, start, end)).group_by(sales.status, sales.payment_mode).all()
+
+    bill_count = 0
+    revenue = 0.0
+    discount = 0.0
+    by_status = defaultdict(lambda: {"bill_count": 0, "revenue": 0.0})
+    by_payment_mode = defaultdict(lambda: {"bill_count": 0, "revenue": 0.0})
+    for status, payment_mode, count, total, disc in rows:
+        bill_count += count
+        revenue += total
+        discount += disc
+        for group in (by_status[status], by_payment_mode[payment_mode or "Unspecified"]):
+            group["bill_count"] += count
+            group["revenue"] = round(group["revenue"] + total, 2)
+
+    items = models.ItemSalesRollup
+    top_items = db.query(
+        items.item_name, func.sum(items.quantity), func.sum(items.revenue)
+    ).filter(range_condition(items, start, end)).group_by(items.item_name).order_by(
+        func.sum(items.revenue).desc(), items.item_name
+    ).limit(top).all()
+
+    return {
+        "start_date": start.isoformat() if start else None,
+        "end_date": end.isoformat() if end else None,
+        "revenue": round(revenue, 2),
+        "bill_count": bill_count,
+        "average_ticket": round(revenue / bill_count, 2) if bill_count else 0.0,
+        "discount": round(discount, 2),
+        "by_status": dict(by_status),
+        "by_payment_mode": dict(by_payment_mode),
+        "top_items": [
+            {"item_name": name, "quantity": quantity, "revenue": round(total, 2)}
+            for name, quantity, total in top_items
+        ],
+    }
+
+if __name__ == "__main__":
+    # python -m utils.rollups rebuild   (run from backend/)
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m utils.rollups rebuild")
+        sys.exit(1)
+
+    import migrations
+
+    migrations.check(database.engine)
+    db = database.SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+        print(f"Rebuilt sales rollups: {db.query(models.SalesRollup).count()} rows, {db.query(models.ItemSalesRollup).count()} item rows")
+    finally:
+        db.close()
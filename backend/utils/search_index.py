@@ -0,0 +1,119 @@
+from sqlalchemy import text, column
+
+# SQLite FTS5 trigram index over customer name and phone.
+# It is an external-content table on `bills`, kept in sync by triggers,
+# so substring searches no longer scan the whole bills table.
+
+FTS_TABLE = "bills_fts"
+
+# Trigram tokens are 3 characters; shorter terms cannot use the index
+MIN_TERM_LENGTH = 3
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        customer_name, customer_phone,
+        content='bills', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS bills_fts_ai AFTER INSERT ON bills BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, customer_name, customer_phone)
+        VALUES (new.id, new.customer_name, new.customer_phone);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS bills_fts_ad AFTER DELETE ON bills BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, customer_name, customer_phone)
+        VALUES ('delete', old.id, old.customer_name, old.customer_phone);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS bills_fts_au AFTER UPDATE OF customer_name, customer_phone ON bills BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, customer_name, customer_phone)
+        VALUES ('delete', old.id, old.customer_name, old.customer_phone);
+        INSERT INTO {FTS_TABLE}(rowid, customer_name, customer_phone)
+        VALUES (new.id, new.customer_name, new.customer_phone);
+    END
+    """,
+]
+
+_available = False
+
+def ensure_search_index(engine) -> bool:
+    """
+    Creates the FTS table and its sync triggers if missing, and backfills
+    it from existing bills the first time. Returns False when the database
+    is not SQLite or its build lacks FTS5/trigram, in which case callers
+    fall back to ILIKE.
+    """
+    global _available
+    if engine.dialect.name != "sqlite":
+        _available = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first()
+            for statement in _DDL:
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        _available = True
+    except Exception as e:
+        print(f"Search index unavailable, falling back to ILIKE: {e}")
+        _available = False
+
+    return _available
+
+def detect(engine) -> bool:
+    """
+    Checks whether the migrations created the FTS table, without changing the
+    schema. Called on app startup, since ensure_search_index runs in the
+    migrate command's process.
+    """
+    global _available
+    if engine.dialect.name != "sqlite":
+        _available = False
+        return False
+
+    with engine.connect() as conn:
+        _available = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first() is not None
+    return _available
+
+def can_search(term: str) -> bool:
+    return _available and len(term) >= MIN_TERM_LENGTH
+
+def match_expression(term: str, column_name: str = None) -> str:
+    # Quote as a single FTS5 string so user input is never parsed as query syntax
+    phrase = '"' + term.replace('"', '""') + '"'
+    # Without a column filter the phrase may match in any indexed column
+    return f"{column_name} : {phrase}" if column_name else phrase
+
+def matching_ids(term: str):
+    """Subquery of bill ids whose customer name contains `term` (the customer_name filter; phones are not matched)."""
+    return text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_term").bindparams(
+        fts_term=match_expression(term, "customer_name")
+    ).columns(column("rowid"))
+
+def ranked_ids(db, term: str, limit: int):
+    """
+    Bill ids matching `term`, best first: names starting with the term,
+    then bm25 rank, then newest bill.
+    """
+    rows = db.execute(
+        text(
+            f"SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE} JOIN bills ON bills.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :fts_term "
+            f"ORDER BY ({FTS_TABLE}.customer_name LIKE :prefix) DESC, {FTS_TABLE}.rank, bills.date DESC "
+            f"LIMIT :limit"
+        ),
+        {"fts_term": match_expression(term), "prefix": term.replace("%", "").replace("_", "") + "%", "limit": limit}
+    )
+    return [row[0] for row in rows]
@@ -29,18 +29,20 @@ const Dashboard = () => {
         const fetchStats = async () => {
             try {
                 const today = new Date();
+                const pad = (n) => String(n).padStart(2, '0');
+                const todayStr = `${today.getFullYear()}-${pad(today.getMonth() + 1)}-${pad(today.getDate())}`;
+
+                // Totals come pre-aggregated from the server instead of summing every bill here
                 const [daily, monthly, yearly] = await Promise.all([
-                    api.get(`/bills/filter?day=${today.getDate()}&month=${today.getMonth() + 1}&year=${today.getFullYear()}`),
-                    api.get(`/bills/filter?month=${today.getMonth() + 1}&year=${today.getFullYear()}`),
-                    api.get(`/bills/filter?year=${today.getFullYear()}`)
+                    api.get('/bills/stats', { params: { start_date: todayStr, end_date: todayStr } }),
+                    api.get('/bills/stats', { params: { month: today.getMonth() + 1, year: today.getFullYear() } }),
+                    api.get('/bills/stats', { params: { year: today.getFullYear() } })
                 ]);
 
-                const sumTotal = (bills) => bills.data.reduce((acc, curr) => acc + curr.total_amount, 0);
-
                 setStats({
-                    today: sumTotal(daily),
-                    month: sumTotal(monthly),
-                    year: sumTotal(yearly)
+                    today: daily.data.revenue,
+                    month: monthly.data.revenue,
+                    year: yearly.data.revenue
                 });
             } catch (error) {
                 console.error("Failed to fetch stats", error);
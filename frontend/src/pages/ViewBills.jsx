@@ -15,9 +15,14 @@ const ViewBills = () => {
     const [startDate, setStartDate] = useState('');
     const [endDate, setEndDate] = useState('');
 
+    // Cursor of the next page (X-Next-Cursor), null when every matching bill is shown
+    const [nextCursor, setNextCursor] = useState(null);
+
     useEffect(() => {
-        fetchBills();
-    }, [filterType, startDate, endDate]);
+        // Searching happens on the server, so wait for a pause in typing before asking
+        const timer = setTimeout(() => fetchBills(), searchTerm ? 300 : 0);
+        return () => clearTimeout(timer);
+    }, [filterType, startDate, endDate, searchTerm]);
 
     const getFilterParams = () => {
         const params = {};
@@ -44,20 +49,24 @@ const ViewBills = () => {
         return params;
     };
 
-    const fetchBills = async () => {
+    const fetchBills = async (cursor = null) => {
         setLoading(true);
         try {
-            // If filter is 'all', utilize the main /bills endpoint which is simple and robust
-            if (filterType === 'all' && !searchTerm) {
-                const response = await api.get('/bills/');
-                setBills(response.data);
+            const term = searchTerm.trim();
+            let response;
+            if (term && filterType === 'all') {
+                // Best matches on customer name or phone across every bill
+                response = await api.get('/bills/search', { params: { q: term, limit: 100 } });
             } else {
                 const params = getFilterParams();
-                // Add search term to params if backend supported it, but backend uses separate customer_name param
-                // For now, client side search is implemented, so we just fetch based on date filters
-                const response = await api.get('/bills/filter', { params });
-                setBills(response.data);
+                if (term) params.customer_name = term;
+                if (cursor) params.cursor = cursor;
+                const hasFilters = Object.keys(params).some(key => key !== 'cursor');
+                // If filter is 'all', utilize the main /bills endpoint which is simple and robust
+                response = await api.get(hasFilters ? '/bills/filter' : '/bills/', { params });
             }
+            setBills(previous => cursor ? [...previous, ...response.data] : response.data);
+            setNextCursor(response.headers['x-next-cursor'] || null);
         } catch (error) {
             console.error('Failed to fetch bills', error);
         } finally {
@@ -70,7 +79,7 @@ const ViewBills = () => {
         try {
             const params = getFilterParams();
             const response = await api.get('/bills/export', {
-                params,
+                params: { ...params, format: 'csv' },
                 responseType: 'blob'
             });
             const url = window.URL.createObjectURL(new Blob([response.data]));
@@ -88,13 +97,6 @@ const ViewBills = () => {
         }
     };
 
-    const filteredBills = bills.filter(bill => {
-        const term = searchTerm.toLowerCase();
-        return bill.customer_name.toLowerCase().includes(term) ||
-            bill.customer_phone.includes(term) ||
-            String(bill.id).includes(term);
-    });
-
     const handleFilterTypeChange = (e) => {
         const type = e.target.value;
         setFilterType(type);
@@ -115,7 +117,7 @@ const ViewBills = () => {
                         <Search className="absolute left-3 top-1/2 -translate-y-1/2 w-4 h-4 text-gray-400" />
                         <input
                             type="text"
-                            placeholder="Search customer..."
+                            placeholder="Search name or phone..."
                             value={searchTerm}
                             onChange={(e) => setSearchTerm(e.target.value)}
                             className="w-full pl-10 pr-4 py-2 rounded-lg border border-gray-300 focus:ring-2 focus:ring-indigo-500"
@@ -190,7 +192,7 @@ const ViewBills = () => {
                         </tr>
                     </thead>
                     <tbody className="divide-y divide-gray-200">
-                        {filteredBills.map((bill) => (
+                        {bills.map((bill) => (
                             <tr key={bill.id} className="hover:bg-gray-50 transition-colors">
                                 <td className="px-6 py-4 font-medium text-gray-900">#{bill.id}</td>
                                 <td className="px-6 py-4 text-gray-500">
@@ -245,7 +247,7 @@ const ViewBills = () => {
                                 </td>
                             </tr>
                         )}
-                        {!loading && filteredBills.length === 0 && (
+                        {!loading && bills.length === 0 && (
                             <tr>
                                 <td colSpan="7" className="px-6 py-8 text-center text-gray-500">
                                     No bills found.
@@ -254,6 +256,16 @@ const ViewBills = () => {
                         )}
                     </tbody>
                 </table>
+                {nextCursor && !loading && (
+                    <div className="px-6 py-4 border-t border-gray-200 text-center">
+                        <button
+                            onClick={() => fetchBills(nextCursor)}
+                            className="text-indigo-600 hover:text-indigo-800 text-sm font-medium"
+                        >
+                            Load more
+                        </button>
+                    </div>
+                )}
             </div>
 
         </div >
@@ -1,7 +1,7 @@
 @echo off
 echo Starting Billing Management System...
 
-start cmd /k "cd backend && call venv\Scripts\activate && uvicorn main:app --reload"
+start cmd /k "cd backend && call venv\Scripts\activate && python -m migrations && uvicorn main:app --reload"
 start cmd /k "cd frontend && npm run dev"
 
 echo Servers started!
@@ -75,6 +75,14 @@ if !errorlevel! neq 0 (
 
 echo    > Installing dependencies...
 pip install -q -r requirements.txt
+
+echo    > Updating database...
+python -m migrations
+if !errorlevel! neq 0 (
+    echo [ERROR] Database update failed.
+    pause
+    exit /b
+)
 cd ..
 echo.
 
@@ -90,7 +98,7 @@ echo.
 
 :: 4. Launch
 echo [4/5] Launching...
-start "Backend" cmd /k "cd backend && call venv\Scripts\activate && uvicorn main:app --reload"
+start "Backend" cmd /k "cd backend && call venv\Scripts\activate && uvicorn main:app"
 timeout /t 2 >nul
 start "Frontend" cmd /k "cd frontend && npm run dev"
 